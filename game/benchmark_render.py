@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import numpy as np
+
+# render time per frame of the old full redraw (fill, field lines, font.render and flip every frame) vs
+# Renderer (pre-rendered field, cached texts, dirty rect updates), same scene of moving players and ball.
+# python benchmark_render.py [--dummy]  (--dummy: SDL dummy video driver, no window)
+if "--dummy" in sys.argv:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+from renderer import Renderer, GREEN, WHITE, GOAL_WIDTH, GOAL_HEIGHT
+
+WIDTH, HEIGHT = 800, 600
+BLUE, RED = (0, 0, 255), (255, 0, 0)
+N_FRAMES = 2000
+
+pygame.init()
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+rng = np.random.default_rng(0)
+# positions of the two players and the ball, a goal every 200 frames
+paths = rng.integers(50, 550, (N_FRAMES, 3, 2))
+
+
+def full_redraw(font, frame):
+    screen.fill(GREEN)
+    pygame.draw.line(screen, WHITE, (WIDTH // 2, 0), (WIDTH // 2, HEIGHT), 2)
+    pygame.draw.rect(screen, WHITE, (0, HEIGHT // 2 - GOAL_HEIGHT // 2, GOAL_WIDTH, GOAL_HEIGHT))
+    pygame.draw.rect(screen, WHITE, (WIDTH - GOAL_WIDTH, HEIGHT // 2 - GOAL_HEIGHT // 2, GOAL_WIDTH, GOAL_HEIGHT))
+    (px, py), (ex, ey), (bx, by) = paths[frame]
+    pygame.draw.rect(screen, BLUE, (px, py, 30, 50))
+    pygame.draw.rect(screen, RED, (ex, ey, 30, 50))
+    pygame.draw.circle(screen, WHITE, (bx, by), 15)
+    screen.blit(font.render(f"YOU: {frame // 200}", True, BLUE), (20, 20))
+    screen.blit(font.render(f"AI: {frame // 400}", True, RED), (WIDTH - 150, 20))
+    pygame.display.flip()
+
+
+def renderer_frame(renderer, frame):
+    renderer.begin_frame()
+    (px, py), (ex, ey), (bx, by) = paths[frame]
+    renderer.draw_rect(BLUE, (px, py, 30, 50))
+    renderer.draw_rect(RED, (ex, ey, 30, 50))
+    renderer.draw_circle(WHITE, (bx, by), 15)
+    renderer.draw_text(f"YOU: {frame // 200}", BLUE, (20, 20))
+    renderer.draw_text(f"AI: {frame // 400}", RED, (WIDTH - 150, 20))
+    renderer.end_frame()
+
+
+font = pygame.font.Font(None, 36)
+renderer = Renderer(screen, font)
+for name, draw, target in (("full redraw", full_redraw, font), ("renderer", renderer_frame, renderer)):
+    start = time.perf_counter()
+    for frame in range(N_FRAMES):
+        pygame.event.pump()
+        draw(target, frame)
+    print(f"{name}: {(time.perf_counter() - start) / N_FRAMES * 1e6:.1f} us per frame")
+pygame.quit()
@@ -1,12 +1,15 @@
 import pygame
 import sys
-import random
 import math
+import argparse
 import numpy as np
-from stable_baselines3 import PPO
+from renderer import Renderer
+from timestep import FixedTimestep
 
-# load the model
-model = PPO.load("../rf/ppo_football_logs/best_model.zip")
+# numpy_policy.py of the training code: the exported .npz of a model runs without torch
+sys.path.append("../rf")
+from numpy_policy import PolicyLoader
+from replay import ReplayRecorder, EVENT_LEFT_GOAL, EVENT_RIGHT_GOAL, EVENT_LEFT_KICK, EVENT_RIGHT_KICK, EVENT_MATCH_START
 
 # initialize pygame
 pygame.init()
@@ -31,10 +34,31 @@ RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 BLACK = (0, 0, 0)
 
+# the simulation runs at TICK_RATE ticks per second of game time, frames are drawn at up to FPS
+TICK_RATE = 60
+FPS = 60
+
+# command line options: --speed runs the game faster (or slower), --render-every N simulates as fast
+# as the CPU allows and draws a frame after every N ticks, --record FILE saves every tick to a replay file
+parser = argparse.ArgumentParser(description="football game")
+parser.add_argument("--speed", type=float, default=1.0, help="game speed, e.g. 10 for ten times faster")
+parser.add_argument("--render-every", type=int, default=None,
+                    help="unbounded simulation speed, draw a frame every N ticks")
+parser.add_argument("--record", default=None, help="record the game to this replay file")
+args = parser.parse_args()
+
+# random generator, set SEED to an int to reproduce a run
+SEED = None
+rng = np.random.default_rng(SEED)
+
 # create screen
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Football Game")
-clock = pygame.time.Clock()
+timestep = FixedTimestep(TICK_RATE, FPS, args.speed, args.render_every)
+
+# load the model on a background thread once the window is open,
+# the enemy plays rule-based (move to ball) until it is ready
+model_loader = PolicyLoader("../rf/ppo_football_logs/best_model.zip")
 
 # game objects
 class Player:
@@ -42,6 +66,8 @@ class Player:
         self.rect = pygame.Rect(x, y, PLAYER_WIDTH, PLAYER_HEIGHT)
         self.color = color
         self.speed = PLAYER_SPEED
+        # position before the last tick, frames are drawn in between
+        self.prev_topleft = self.rect.topleft
 
     def move(self, dx, dy):
         # make sure player doesn't move outside the screen
@@ -67,8 +93,15 @@ class Player:
 
         self.rect = new_rect
 
-    def draw(self):
-        pygame.draw.rect(screen, self.color, self.rect)
+    def save_position(self):
+        self.prev_topleft = self.rect.topleft
+
+    def draw(self, alpha=1.0):
+        # alpha: 0 at the position before the last tick, 1 at the current one
+        (prev_x, prev_y), (x, y) = self.prev_topleft, self.rect.topleft
+        rect = self.rect.copy()
+        rect.topleft = (round(prev_x + (x - prev_x) * alpha), round(prev_y + (y - prev_y) * alpha))
+        renderer.draw_rect(self.color, rect)
 
     def kick(self, ball):
         # check if player touches ball
@@ -89,18 +122,23 @@ class Player:
                 ball.vx = (ball.vx / speed) * MAX_BALL_SPEED
                 ball.vy = (ball.vy / speed) * MAX_BALL_SPEED
 
+            return True
+        return False
+
 class Ball:
     def __init__(self):
         self.reset()
 
     def reset(self):
         # the ball appears at random in the middle area
-        self.x = random.randint(WIDTH // 4, 3 * WIDTH // 4)
-        self.y = random.randint(HEIGHT // 4, 3 * HEIGHT // 4)
+        self.x = int(rng.integers(WIDTH // 4, 3 * WIDTH // 4, endpoint=True))
+        self.y = int(rng.integers(HEIGHT // 4, 3 * HEIGHT // 4, endpoint=True))
+        # a new ball is not drawn on its way from the goal
+        self.save_position()
 
         # random initial velocity
-        angle = random.uniform(0, 2 * math.pi)
-        speed = random.uniform(MIN_BALL_SPEED, MIN_BALL_SPEED + 2)
+        angle = rng.uniform(0, 2 * math.pi)
+        speed = rng.uniform(MIN_BALL_SPEED, MIN_BALL_SPEED + 2)
         self.vx = math.cos(angle) * speed
         self.vy = math.sin(angle) * speed
 
@@ -136,8 +174,13 @@ class Ball:
             self.vx = (self.vx / speed) * MIN_BALL_SPEED
             self.vy = (self.vy / speed) * MIN_BALL_SPEED
 
-    def draw(self):
-        pygame.draw.circle(screen, WHITE, (int(self.x), int(self.y)), BALL_RADIUS)
+    def save_position(self):
+        self.prev_x, self.prev_y = self.x, self.y
+
+    def draw(self, alpha=1.0):
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        renderer.draw_circle(WHITE, (int(x), int(y)), BALL_RADIUS)
 
     def check_goals(self):
         # check left goal (player's goal)
@@ -149,32 +192,37 @@ class Ball:
         return None
 
 class EnemyAI:
-    def __init__(self, enemy, model=model):
+    def __init__(self, enemy, model_loader=model_loader):
         self.enemy = enemy
-        self.model = model
+        self.model_loader = model_loader
+        self.state = np.zeros(12, dtype=np.float32)
+        # action of the last update, -1 when it moved rule-based
+        self.action = -1
 
     def get_state(self, ball, player):
-        return np.array([
-            # player position
-            player.rect.centerx / WIDTH,
-            player.rect.centery / HEIGHT,
-
-            # enemy position
-            enemy.rect.centerx / WIDTH,
-            enemy.rect.centery / HEIGHT,
-
-            # ball state
-            ball.x / WIDTH,
-            ball.y / HEIGHT,
-            ball.vx / MAX_BALL_SPEED,
-            ball.vy / MAX_BALL_SPEED,
-
-            # relative position of ball to player and enemy
-            (ball.x - enemy.rect.centerx) / WIDTH,
-            (ball.y - enemy.rect.centery) / HEIGHT,
-            (ball.x - player.rect.centerx) / WIDTH,
-            (ball.y - player.rect.centery) / HEIGHT,
-            ], dtype=np.float32)
+        # written into the preallocated state buffer, no new array per frame
+        state = self.state
+
+        # player position
+        state[0] = player.rect.centerx / WIDTH
+        state[1] = player.rect.centery / HEIGHT
+
+        # enemy position
+        state[2] = enemy.rect.centerx / WIDTH
+        state[3] = enemy.rect.centery / HEIGHT
+
+        # ball state
+        state[4] = ball.x / WIDTH
+        state[5] = ball.y / HEIGHT
+        state[6] = ball.vx / MAX_BALL_SPEED
+        state[7] = ball.vy / MAX_BALL_SPEED
+
+        # relative position of ball to player and enemy
+        state[8] = (ball.x - enemy.rect.centerx) / WIDTH
+        state[9] = (ball.y - enemy.rect.centery) / HEIGHT
+        state[10] = (ball.x - player.rect.centerx) / WIDTH
+        state[11] = (ball.y - player.rect.centery) / HEIGHT
+        return state
 
     def move_to_ball(self, ball):
         # move to ball
@@ -188,22 +236,29 @@ class EnemyAI:
         self.enemy.move(dx, dy)
 
     def update(self, ball, player):
-        state = self.get_state(ball, player)
-        action, _ = self.model.predict(state, deterministic=True)
-        # enemy actions
-        if action in [0, 1, 2, 3]:
-            dx, dy = 0, 0
-            if action == 0: dy = -1
-            elif action == 1: dy = 1
-            elif action == 2: dx = -1
-            elif action == 3: dx = 1
-            self.enemy.move(dx, dy)
-        elif action == 4:
+        # rule-based until the model is loaded
+        model = self.model_loader.policy
+        if model is None:
             self.move_to_ball(ball)
+            self.action = -1
+        else:
+            state = self.get_state(ball, player)
+            action, _ = model.predict(state, deterministic=True)
+            self.action = int(action)
+            # enemy actions
+            if action in [0, 1, 2, 3]:
+                dx, dy = 0, 0
+                if action == 0: dy = -1
+                elif action == 1: dy = 1
+                elif action == 2: dx = -1
+                elif action == 3: dx = 1
+                self.enemy.move(dx, dy)
+            elif action == 4:
+                self.move_to_ball(ball)
 
         # randomly change direction (simulate wall impact behavior)
-        if random.random() < 0.02:  # 2% chance to change direction
-            self.enemy.move(random.uniform(-1, 1), random.uniform(-1, 1))
+        if rng.random() < 0.02:  # 2% chance to change direction
+            self.enemy.move(rng.uniform(-1, 1), rng.uniform(-1, 1))
 
 
 # create game objects
@@ -215,7 +270,15 @@ ball = Ball()
 # count scores
 player_score = 0
 enemy_score = 0
-font = pygame.font.Font(None, 36)
+# pre-rendered field, cached score texts, only changed rects are updated
+renderer = Renderer(screen)
+
+# every tick is recorded with --record, the first frame is the state before the first tick
+recorder = None
+if args.record:
+    recorder = ReplayRecorder(args.record, frame_rate=TICK_RATE, seed=SEED, source="game_ppo")
+    recorder.record(ball.x, ball.y, ball.vx, ball.vy, *player.rect.topleft, *enemy.rect.topleft,
+                    events=EVENT_MATCH_START)
 
 # game main loop
 running = True
@@ -224,6 +287,9 @@ while running:
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
+        elif event.type == pygame.WINDOWEXPOSED:
+            # the window content may be gone, send the whole screen again
+            renderer.invalidate()
 
     # player keyboard input
     keys = pygame.key.get_pressed()
@@ -236,49 +302,55 @@ while running:
         dy = -1
     if keys[pygame.K_DOWN]:
         dy = 1
-    player.move(dx, dy)
-
-    # update game objects
-    ball.update()
-    enemy_ai.update(ball, player)
 
-    # kicking detection
-    player.kick(ball)
-    enemy.kick(ball)
-
-    # check goal
-    goal = ball.check_goals()
-    if goal:
-        if goal == "player":
-            player_score += 1
-        else:
-            enemy_score += 1
-        ball.reset()
-
-    # draw background
-    screen.fill(GREEN)
-
-    # draw center line
-    pygame.draw.line(screen, WHITE, (WIDTH // 2, 0), (WIDTH // 2, HEIGHT), 2)
+    # simulate the ticks due until this frame
+    for _ in range(timestep.ticks()):
+        for game_object in (player, enemy, ball):
+            game_object.save_position()
+        player.move(dx, dy)
+
+        # update game objects
+        ball.update()
+        enemy_ai.update(ball, player)
+
+        # kicking detection
+        player_kicked = player.kick(ball)
+        enemy_kicked = enemy.kick(ball)
+
+        # check goal
+        goal = ball.check_goals()
+
+        # the tick is recorded before a goal resets the ball
+        if recorder is not None:
+            events = (EVENT_LEFT_KICK if player_kicked else 0) | (EVENT_RIGHT_KICK if enemy_kicked else 0)
+            if goal:
+                events |= EVENT_LEFT_GOAL if goal == "player" else EVENT_RIGHT_GOAL
+            recorder.record(ball.x, ball.y, ball.vx, ball.vy, *player.rect.topleft, *enemy.rect.topleft,
+                            -1, enemy_ai.action, events)
+
+        if goal:
+            if goal == "player":
+                player_score += 1
+            else:
+                enemy_score += 1
+            ball.reset()
 
-    # draw goal
-    pygame.draw.rect(screen, WHITE, (0, HEIGHT // 2 - GOAL_HEIGHT // 2, GOAL_WIDTH, GOAL_HEIGHT))
-    pygame.draw.rect(screen, WHITE, (WIDTH - GOAL_WIDTH, HEIGHT // 2 - GOAL_HEIGHT // 2, GOAL_WIDTH, GOAL_HEIGHT))
+    # restore the field where the last frame drew
+    renderer.begin_frame()
 
     # draw game objects
-    player.draw()
-    enemy.draw()
-    ball.draw()
+    player.draw(timestep.alpha)
+    enemy.draw(timestep.alpha)
+    ball.draw(timestep.alpha)
 
     # draw scores
-    player_text = font.render(f"YOU: {player_score}", True, BLUE)
-    enemy_text = font.render(f"AI: {enemy_score}", True, RED)
-    screen.blit(player_text, (20, 20))
-    screen.blit(enemy_text, (WIDTH - 150, 20))
+    renderer.draw_text(f"YOU: {player_score}", BLUE, (20, 20))
+    renderer.draw_text(f"AI: {enemy_score}", RED, (WIDTH - 150, 20))
 
     # update game scene
-    pygame.display.flip()
-    clock.tick(60)
+    renderer.end_frame()
 
+if recorder is not None:
+    recorder.close()
 pygame.quit()
 sys.exit()
\ No newline at end of file
@@ -1,7 +1,14 @@
 import pygame
 import sys
-import random
 import math
+import argparse
+import numpy as np
+from renderer import Renderer
+from timestep import FixedTimestep
+
+# replay.py of the training code records the game
+sys.path.append("../rf")
+from replay import ReplayRecorder, EVENT_LEFT_GOAL, EVENT_RIGHT_GOAL, EVENT_LEFT_KICK, EVENT_RIGHT_KICK, EVENT_MATCH_START
 
 # initialize pygame
 pygame.init()
@@ -26,10 +33,27 @@ RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 BLACK = (0, 0, 0)
 
+# the simulation runs at TICK_RATE ticks per second of game time, frames are drawn at up to FPS
+TICK_RATE = 60
+FPS = 60
+
+# command line options: --speed runs the game faster (or slower), --render-every N simulates as fast
+# as the CPU allows and draws a frame after every N ticks, --record FILE saves every tick to a replay file
+parser = argparse.ArgumentParser(description="football game")
+parser.add_argument("--speed", type=float, default=1.0, help="game speed, e.g. 10 for ten times faster")
+parser.add_argument("--render-every", type=int, default=None,
+                    help="unbounded simulation speed, draw a frame every N ticks")
+parser.add_argument("--record", default=None, help="record the game to this replay file")
+args = parser.parse_args()
+
+# random generator, set SEED to an int to reproduce a run
+SEED = None
+rng = np.random.default_rng(SEED)
+
 # create screen
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Football Game")
-clock = pygame.time.Clock()
+timestep = FixedTimestep(TICK_RATE, FPS, args.speed, args.render_every)
 
 # game objects
 class Player:
@@ -37,6 +61,8 @@ class Player:
         self.rect = pygame.Rect(x, y, PLAYER_WIDTH, PLAYER_HEIGHT)
         self.color = color
         self.speed = PLAYER_SPEED
+        # position before the last tick, frames are drawn in between
+        self.prev_topleft = self.rect.topleft
 
     def move(self, dx, dy):
         # make sure player doesn't move outside the screen
@@ -62,8 +88,15 @@ class Player:
 
         self.rect = new_rect
 
-    def draw(self):
-        pygame.draw.rect(screen, self.color, self.rect)
+    def save_position(self):
+        self.prev_topleft = self.rect.topleft
+
+    def draw(self, alpha=1.0):
+        # alpha: 0 at the position before the last tick, 1 at the current one
+        (prev_x, prev_y), (x, y) = self.prev_topleft, self.rect.topleft
+        rect = self.rect.copy()
+        rect.topleft = (round(prev_x + (x - prev_x) * alpha), round(prev_y + (y - prev_y) * alpha))
+        renderer.draw_rect(self.color, rect)
 
     def kick(self, ball):
         # check if player touches ball
@@ -84,18 +117,23 @@ class Player:
                 ball.vx = (ball.vx / speed) * MAX_BALL_SPEED
                 ball.vy = (ball.vy / speed) * MAX_BALL_SPEED
 
+            return True
+        return False
+
 class Ball:
     def __init__(self):
         self.reset()
 
     def reset(self):
         # the ball appears at random in the middle area
-        self.x = random.randint(WIDTH // 4, 3 * WIDTH // 4)
-        self.y = random.randint(HEIGHT // 4, 3 * HEIGHT // 4)
+        self.x = int(rng.integers(WIDTH // 4, 3 * WIDTH // 4, endpoint=True))
+        self.y = int(rng.integers(HEIGHT // 4, 3 * HEIGHT // 4, endpoint=True))
+        # a new ball is not drawn on its way from the goal
+        self.save_position()
 
         # random initial velocity
-        angle = random.uniform(0, 2 * math.pi)
-        speed = random.uniform(MIN_BALL_SPEED, MIN_BALL_SPEED + 2)
+        angle = rng.uniform(0, 2 * math.pi)
+        speed = rng.uniform(MIN_BALL_SPEED, MIN_BALL_SPEED + 2)
         self.vx = math.cos(angle) * speed
         self.vy = math.sin(angle) * speed
 
@@ -131,8 +169,13 @@ class Ball:
             self.vx = (self.vx / speed) * MIN_BALL_SPEED
             self.vy = (self.vy / speed) * MIN_BALL_SPEED
 
-    def draw(self):
-        pygame.draw.circle(screen, WHITE, (int(self.x), int(self.y)), BALL_RADIUS)
+    def save_position(self):
+        self.prev_x, self.prev_y = self.x, self.y
+
+    def draw(self, alpha=1.0):
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        renderer.draw_circle(WHITE, (int(x), int(y)), BALL_RADIUS)
 
     def check_goals(self):
         # check left goal (player's goal)
@@ -161,8 +204,8 @@ class EnemyAI:
         self.enemy.move(dx, dy)
 
         # randomly change direction (simulate wall impact behavior)
-        if random.random() < 0.02:  # 2% chance to change direction
-            self.enemy.move(random.uniform(-1, 1), random.uniform(-1, 1))
+        if rng.random() < 0.02:  # 2% chance to change direction
+            self.enemy.move(rng.uniform(-1, 1), rng.uniform(-1, 1))
 
 
 # create game objects
@@ -174,7 +217,15 @@ ball = Ball()
 # count scores
 player_score = 0
 enemy_score = 0
-font = pygame.font.Font(None, 36)
+# pre-rendered field, cached score texts, only changed rects are updated
+renderer = Renderer(screen)
+
+# every tick is recorded with --record, the first frame is the state before the first tick
+recorder = None
+if args.record:
+    recorder = ReplayRecorder(args.record, frame_rate=TICK_RATE, seed=SEED, source="game_rule_based")
+    recorder.record(ball.x, ball.y, ball.vx, ball.vy, *player.rect.topleft, *enemy.rect.topleft,
+                    events=EVENT_MATCH_START)
 
 # game main loop
 running = True
@@ -183,6 +234,9 @@ while running:
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
+        elif event.type == pygame.WINDOWEXPOSED:
+            # the window content may be gone, send the whole screen again
+            renderer.invalidate()
 
     # player keyboard input
     keys = pygame.key.get_pressed()
@@ -195,49 +249,55 @@ while running:
         dy = -1
     if keys[pygame.K_DOWN]:
         dy = 1
-    player.move(dx, dy)
-
-    # update game objects
-    ball.update()
-    enemy_ai.update(ball)
-
-    # kicking detection
-    player.kick(ball)
-    enemy.kick(ball)
 
-    # check goal
-    goal = ball.check_goals()
-    if goal:
-        if goal == "player":
-            player_score += 1
-        else:
-            enemy_score += 1
-        ball.reset()
-
-    # draw background
-    screen.fill(GREEN)
-
-    # draw center line
-    pygame.draw.line(screen, WHITE, (WIDTH // 2, 0), (WIDTH // 2, HEIGHT), 2)
+    # simulate the ticks due until this frame
+    for _ in range(timestep.ticks()):
+        for game_object in (player, enemy, ball):
+            game_object.save_position()
+        player.move(dx, dy)
+
+        # update game objects
+        ball.update()
+        enemy_ai.update(ball)
+
+        # kicking detection
+        player_kicked = player.kick(ball)
+        enemy_kicked = enemy.kick(ball)
+
+        # check goal
+        goal = ball.check_goals()
+
+        # the tick is recorded before a goal resets the ball
+        if recorder is not None:
+            events = (EVENT_LEFT_KICK if player_kicked else 0) | (EVENT_RIGHT_KICK if enemy_kicked else 0)
+            if goal:
+                events |= EVENT_LEFT_GOAL if goal == "player" else EVENT_RIGHT_GOAL
+            recorder.record(ball.x, ball.y, ball.vx, ball.vy, *player.rect.topleft, *enemy.rect.topleft,
+                            -1, -1, events)
+
+        if goal:
+            if goal == "player":
+                player_score += 1
+            else:
+                enemy_score += 1
+            ball.reset()
 
-    # draw goal
-    pygame.draw.rect(screen, WHITE, (0, HEIGHT // 2 - GOAL_HEIGHT // 2, GOAL_WIDTH, GOAL_HEIGHT))
-    pygame.draw.rect(screen, WHITE, (WIDTH - GOAL_WIDTH, HEIGHT // 2 - GOAL_HEIGHT // 2, GOAL_WIDTH, GOAL_HEIGHT))
+    # restore the field where the last frame drew
+    renderer.begin_frame()
 
     # draw game objects
-    player.draw()
-    enemy.draw()
-    ball.draw()
+    player.draw(timestep.alpha)
+    enemy.draw(timestep.alpha)
+    ball.draw(timestep.alpha)
 
     # draw scores
-    player_text = font.render(f"YOU: {player_score}", True, BLUE)
-    enemy_text = font.render(f"AI: {enemy_score}", True, RED)
-    screen.blit(player_text, (20, 20))
-    screen.blit(enemy_text, (WIDTH - 150, 20))
+    renderer.draw_text(f"YOU: {player_score}", BLUE, (20, 20))
+    renderer.draw_text(f"AI: {enemy_score}", RED, (WIDTH - 150, 20))
 
     # update game scene
-    pygame.display.flip()
-    clock.tick(60)
+    renderer.end_frame()
 
+if recorder is not None:
+    recorder.close()
 pygame.quit()
 sys.exit()
\ No newline at end of file
@@ -0,0 +1,75 @@
+import pygame
+
+# shared drawing of the games and test scripts: the field (grass, center line, goals) is rendered once
+# into a background surface, text surfaces are cached by string and color, and only the rectangles
+# that changed since the last frame are restored and sent to the display (pygame.display.update(rects)
+# instead of a full flip)
+GREEN = (0, 128, 0)
+WHITE = (255, 255, 255)
+GOAL_WIDTH, GOAL_HEIGHT = 20, 150
+
+# texts like "Match 12/100" are rendered again for every new value, old ones are dropped past this
+TEXT_CACHE_SIZE = 256
+
+
+class Renderer:
+    def __init__(self, screen, font=None):
+        self.screen = screen
+        self.font = font or pygame.font.Font(None, 36)
+        self.background = self._draw_field(screen.get_size())
+        self._texts = {}
+        # rectangles drawn in the previous / current frame
+        self._previous = []
+        self._current = []
+        self._full_update = True
+
+    def _draw_field(self, size):
+        width, height = size
+        background = pygame.Surface(size).convert()
+        background.fill(GREEN)
+        # center line
+        pygame.draw.line(background, WHITE, (width // 2, 0), (width // 2, height), 2)
+        # goals
+        pygame.draw.rect(background, WHITE, (0, height // 2 - GOAL_HEIGHT // 2, GOAL_WIDTH, GOAL_HEIGHT))
+        pygame.draw.rect(background, WHITE, (width - GOAL_WIDTH, height // 2 - GOAL_HEIGHT // 2, GOAL_WIDTH, GOAL_HEIGHT))
+        return background
+
+    def begin_frame(self):
+        # the field comes back where the last frame drew something
+        if self._full_update:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            for rect in self._previous:
+                self.screen.blit(self.background, rect, rect)
+        self._current = []
+
+    def draw_rect(self, color, rect):
+        self._current.append(pygame.draw.rect(self.screen, color, rect))
+
+    def draw_circle(self, color, center, radius):
+        self._current.append(pygame.draw.circle(self.screen, color, center, radius))
+
+    def text(self, string, color):
+        key = (string, color)
+        surface = self._texts.get(key)
+        if surface is None:
+            if len(self._texts) >= TEXT_CACHE_SIZE:
+                self._texts.clear()
+            surface = self._texts[key] = self.font.render(string, True, color)
+        return surface
+
+    def draw_text(self, string, color, position):
+        self._current.append(self.screen.blit(self.text(string, color), position))
+
+    def end_frame(self):
+        # what was drawn now, and what was drawn before (now showing the field again)
+        if self._full_update:
+            pygame.display.flip()
+            self._full_update = False
+        else:
+            pygame.display.update(self._previous + self._current)
+        self._previous = self._current
+
+    def invalidate(self):
+        # redraw and send the whole screen with the next frame (e.g. after the window was exposed)
+        self._full_update = True
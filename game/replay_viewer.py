@@ -0,0 +1,151 @@
+import argparse
+import sys
+import numpy as np
+import pygame
+from renderer import Renderer
+from timestep import FixedTimestep
+
+# replay.py of the training code reads the recordings
+sys.path.append("../rf")
+from replay import ReplayReader, EVENT_LEFT_GOAL, EVENT_RIGHT_GOAL, EVENT_MATCH_START, EVENT_GOALS
+
+# plays a replay file (the games with --record, tournament.py --record-dir) with the game renderer.
+# keys: space pause, up / down faster / slower, right / left (held) scrub forward / backward,
+# n / p next / previous goal, home back to the start. a click or drag on the bar at the bottom jumps there
+# python replay_viewer.py FILE [--speed 4] [--match N]
+
+FPS = 60
+SPEEDS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+# frames moved per drawn frame while an arrow key is held
+SCRUB_FRAMES = 8
+# a goal is shown from this many seconds before it
+GOAL_LEAD_SECONDS = 2
+BAR_HEIGHT = 6
+
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+WHITE = (255, 255, 255)
+YELLOW = (255, 255, 0)
+
+parser = argparse.ArgumentParser(description="replay viewer")
+parser.add_argument("path", help="replay file")
+parser.add_argument("--speed", type=float, default=1.0, help="playback speed, e.g. 4 for four times faster")
+parser.add_argument("--match", type=int, default=0, help="start at this match of the recording")
+args = parser.parse_args()
+
+reader = ReplayReader(args.path)
+header = reader.header
+if len(reader) == 0:
+    sys.exit(f"{args.path} has no frames")
+WIDTH, HEIGHT = header["width"], header["height"]
+PLAYER_WIDTH, PLAYER_HEIGHT = header["player_size"]
+BALL_RADIUS = header["ball_radius"]
+events = reader.frames["events"]
+# frames of the goals of each side, for the score up to the shown frame
+left_goals = np.flatnonzero(events & EVENT_LEFT_GOAL)
+right_goals = np.flatnonzero(events & EVENT_RIGHT_GOAL)
+
+pygame.init()
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+pygame.display.set_caption(f"Replay: {args.path}")
+renderer = Renderer(screen)
+timestep = FixedTimestep(header["frame_rate"], FPS, args.speed)
+
+
+def jump(frame):
+    # new stream from frame (clamped to the recording), drawn until the next tick
+    global stream, current, previous
+    reader.seek(min(max(frame, 0), len(reader) - 1))
+    stream = reader.stream()
+    current = previous = next(stream)
+
+
+def shown_frame():
+    # the stream's position is the frame after the one drawn
+    return reader.position - 1
+
+
+def interpolate(a, b, alpha):
+    return a + (b - a) * alpha
+
+
+jump(reader.match_starts[min(args.match, len(reader.match_starts) - 1)] if reader.match_starts.size else 0)
+speed_index = min(range(len(SPEEDS)), key=lambda i: abs(SPEEDS[i] - args.speed))
+paused = False
+dragging = False
+
+running = True
+while running:
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            running = False
+        elif event.type == pygame.WINDOWEXPOSED:
+            renderer.invalidate()
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                running = False
+            elif event.key == pygame.K_SPACE:
+                paused = not paused
+            elif event.key in (pygame.K_UP, pygame.K_DOWN):
+                speed_index = min(max(speed_index + (1 if event.key == pygame.K_UP else -1), 0), len(SPEEDS) - 1)
+                timestep.speed = SPEEDS[speed_index]
+            elif event.key in (pygame.K_n, pygame.K_p) and reader.goals.size:
+                # the goal after the one GOAL_LEAD_SECONDS ahead of the shown frame, or the one before it
+                # (a second of slack: p right after a jump goes back to the previous goal)
+                lead = int(GOAL_LEAD_SECONDS * header["frame_rate"])
+                ahead = shown_frame() + lead
+                if event.key == pygame.K_n:
+                    goal = reader.goal_index(ahead + 1)
+                else:
+                    goal = reader.goal_index(ahead - header["frame_rate"]) - 1
+                if 0 <= goal < len(reader.goals):
+                    jump(reader.goals[goal] - lead)
+            elif event.key == pygame.K_HOME:
+                jump(0)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and event.pos[1] >= HEIGHT - 4 * BAR_HEIGHT:
+            dragging = True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            dragging = False
+    if dragging:
+        jump(int(pygame.mouse.get_pos()[0] / WIDTH * len(reader)))
+
+    # held arrow keys scrub, paused or not
+    keys = pygame.key.get_pressed()
+    n_ticks = timestep.ticks()
+    if keys[pygame.K_RIGHT]:
+        n_ticks = SCRUB_FRAMES
+    elif keys[pygame.K_LEFT]:
+        jump(shown_frame() - SCRUB_FRAMES)
+        n_ticks = 0
+    elif paused:
+        n_ticks = 0
+    for _ in range(n_ticks):
+        frame = next(stream, None)
+        if frame is None:
+            # end of the recording, wait on the last frame
+            paused = True
+            break
+        previous, current = current, frame
+
+    # no motion drawn across a reset (new match) or a goal (the games reset the ball)
+    alpha = timestep.alpha if n_ticks and not paused else 1.0
+    if current["events"] & EVENT_MATCH_START or previous["events"] & EVENT_GOALS:
+        alpha = 1.0
+
+    renderer.begin_frame()
+    for color, x, y in ((BLUE, "left_x", "left_y"), (RED, "right_x", "right_y")):
+        renderer.draw_rect(color, (round(interpolate(previous[x], current[x], alpha)),
+                                   round(interpolate(previous[y], current[y], alpha)), PLAYER_WIDTH, PLAYER_HEIGHT))
+    renderer.draw_circle(WHITE, (int(interpolate(previous["ball_x"], current["ball_x"], alpha)),
+                                 int(interpolate(previous["ball_y"], current["ball_y"], alpha))), BALL_RADIUS)
+
+    # score up to the shown frame, its position in the recording
+    shown = shown_frame()
+    score = f"{np.searchsorted(left_goals, shown, 'right')} : {np.searchsorted(right_goals, shown, 'right')}"
+    renderer.draw_text(score, WHITE, (WIDTH // 2 - 30, 20))
+    status = "paused" if paused else f"x{SPEEDS[speed_index]:g}"
+    renderer.draw_text(f"{shown + 1}/{len(reader)} {status}", YELLOW, (20, 20))
+    renderer.draw_rect(YELLOW, (0, HEIGHT - BAR_HEIGHT, max(1, WIDTH * (shown + 1) // len(reader)), BAR_HEIGHT))
+    renderer.end_frame()
+
+pygame.quit()
@@ -0,0 +1,33 @@
+import pygame
+
+# fixed timestep pacing of the game loops: the simulation advances in ticks of 1 / tick_rate game
+# seconds, independent of how often (and how late) frames are rendered. a frame shows the state between
+# the last two ticks (alpha), so motion stays smooth when ticks and frames do not line up
+class FixedTimestep:
+    def __init__(self, tick_rate=60, fps=60, speed=1.0, render_every=None, max_frame_time=0.25):
+        # speed: game seconds per wall second (10: a match at ten times the speed, frames stay at fps).
+        # render_every: unbounded simulation speed, a frame after every render_every ticks without waiting.
+        # max_frame_time: wall seconds of a stalled frame that are caught up at most, after a longer stall
+        # the game slows down instead of running ever more ticks per frame
+        self.dt = 1.0 / tick_rate
+        self.fps = fps
+        self.speed = speed
+        self.render_every = render_every
+        self.max_frame_time = max_frame_time
+        self.clock = pygame.time.Clock()
+        self.accumulator = 0.0
+        self.alpha = 1.0
+
+    def ticks(self):
+        # waits for the next frame, returns the number of ticks to simulate before drawing it
+        if self.render_every:
+            # only measures the frame time (clock.get_fps)
+            self.clock.tick()
+            return self.render_every
+        elapsed = self.clock.tick(self.fps) / 1000.0
+        self.accumulator += min(elapsed, self.max_frame_time) * self.speed
+        n_ticks = int(self.accumulator / self.dt)
+        self.accumulator -= n_ticks * self.dt
+        # share of the next tick that already elapsed
+        self.alpha = self.accumulator / self.dt
+        return n_ticks
@@ -0,0 +1,133 @@
+import io
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+
+from football_vec_env import FootballVecEnv
+
+
+def evaluate_snapshot(model_bytes, n_eval_episodes, obs_layout="12d", max_steps=3000, deterministic=True, seed=None):
+    # runs in a pool worker
+    import torch
+    torch.set_num_threads(1)
+    model = PPO.load(io.BytesIO(model_bytes), device="cpu")
+    return evaluate_model(model, n_eval_episodes, obs_layout, max_steps, deterministic, seed)
+
+
+def evaluate_model(model, n_eval_episodes, obs_layout="12d", max_steps=3000, deterministic=True, seed=None):
+    # all evaluation episodes at once, one match of a FootballVecEnv each
+    env = FootballVecEnv(n_eval_episodes, max_steps=max_steps, obs_layout=obs_layout, seed=seed)
+
+    obs = env.reset()
+    episode_rewards = np.zeros(n_eval_episodes)
+    episode_lengths = np.zeros(n_eval_episodes, dtype=np.int64)
+    running = np.ones(n_eval_episodes, dtype=bool)
+    while running.any():
+        actions, _ = model.predict(obs, deterministic=deterministic)
+        obs, rewards, dones, _ = env.step(actions)
+        # matches restart automatically, only their first episode counts
+        episode_rewards += rewards * running
+        episode_lengths += running
+        running &= ~dones
+    env.close()
+    return episode_rewards, episode_lengths
+
+
+class AsyncEvalCallback(BaseCallback):
+    # EvalCallback that does not stop the learner: every eval_freq calls the model is saved to memory and
+    # evaluated in a worker process, results are logged (and the best snapshot saved) once they arrive
+    def __init__(self, eval_freq, n_eval_episodes=5, best_model_save_path=None, log_path=None, obs_layout="12d",
+                 max_steps=3000, n_workers=1, max_pending=None, deterministic=True, verbose=1):
+        super().__init__(verbose=verbose)
+        self.eval_freq = eval_freq
+        self.n_eval_episodes = n_eval_episodes
+        self.best_model_save_path = best_model_save_path
+        self.log_path = os.path.join(log_path, "evaluations") if log_path is not None else None
+        self.obs_layout = obs_layout
+        self.max_steps = max_steps
+        self.n_workers = n_workers
+        # snapshots waiting for a worker, further ones are skipped instead of queueing up
+        self.max_pending = max_pending or 2 * n_workers
+        self.deterministic = deterministic
+
+        self.best_mean_reward = -np.inf
+        self.last_mean_reward = -np.inf
+        self.evaluations_timesteps = []
+        self.evaluations_results = []
+        self.evaluations_length = []
+        self._executor = None
+        self._pending = []
+
+    def _init_callback(self):
+        if self.best_model_save_path is not None:
+            os.makedirs(self.best_model_save_path, exist_ok=True)
+        if self.log_path is not None:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        # spawn: the workers must not inherit the torch state of the learner
+        self._executor = ProcessPoolExecutor(max_workers=self.n_workers, mp_context=mp.get_context("spawn"))
+
+    def _on_step(self):
+        if self.eval_freq > 0 and self.n_calls % self.eval_freq == 0:
+            self._submit()
+        self._collect(wait=False)
+        return True
+
+    def _on_training_end(self):
+        self._collect(wait=True)
+        self._executor.shutdown()
+
+    def _submit(self):
+        if len(self._pending) >= self.max_pending:
+            if self.verbose >= 1:
+                print(f"Async eval: {len(self._pending)} snapshots pending, skipping the one at {self.num_timesteps} timesteps")
+            return
+        buffer = io.BytesIO()
+        self.model.save(buffer)
+        model_bytes = buffer.getvalue()
+        future = self._executor.submit(
+            evaluate_snapshot, model_bytes, self.n_eval_episodes, self.obs_layout, self.max_steps, self.deterministic
+        )
+        self._pending.append((self.num_timesteps, model_bytes, future))
+
+    def _collect(self, wait):
+        # results are handled in submission order, so the logged timesteps stay monotonic
+        while self._pending and (wait or self._pending[0][2].done()):
+            timesteps, model_bytes, future = self._pending.pop(0)
+            episode_rewards, episode_lengths = future.result()
+            self._on_result(timesteps, model_bytes, episode_rewards, episode_lengths)
+
+    def _on_result(self, timesteps, model_bytes, episode_rewards, episode_lengths):
+        mean_reward, std_reward = float(np.mean(episode_rewards)), float(np.std(episode_rewards))
+        mean_ep_length, std_ep_length = float(np.mean(episode_lengths)), float(np.std(episode_lengths))
+        self.last_mean_reward = mean_reward
+
+        if self.log_path is not None:
+            self.evaluations_timesteps.append(timesteps)
+            self.evaluations_results.append(episode_rewards)
+            self.evaluations_length.append(episode_lengths)
+            np.savez(
+                self.log_path,
+                timesteps=self.evaluations_timesteps,
+                results=self.evaluations_results,
+                ep_lengths=self.evaluations_length,
+            )
+
+        if self.verbose >= 1:
+            print(f"Eval num_timesteps={timesteps}, episode_reward={mean_reward:.2f} +/- {std_reward:.2f}")
+            print(f"Episode length: {mean_ep_length:.2f} +/- {std_ep_length:.2f}")
+        self.logger.record("eval/mean_reward", mean_reward)
+        self.logger.record("eval/mean_ep_length", mean_ep_length)
+        self.logger.record("eval/timesteps", timesteps)
+        self.logger.dump(timesteps)
+
+        if mean_reward > self.best_mean_reward:
+            if self.verbose >= 1:
+                print("New best mean reward!")
+            if self.best_model_save_path is not None:
+                with open(os.path.join(self.best_model_save_path, "best_model.zip"), "wb") as f:
+                    f.write(model_bytes)
+            self.best_mean_reward = mean_reward
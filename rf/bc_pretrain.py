@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import time
+import torch
+import torch.nn.functional as F
+from stable_baselines3 import PPO
+
+from trajectory_dataset import ShardLoader
+
+# behaviour cloning warm start: the actor of a PPO MlpPolicy (features extractor, policy_net of the
+# mlp_extractor and action_net) is fitted to the actions of a demonstration dataset of
+# trajectory_dataset.py, cross entropy on the action logits, batches streamed by ShardLoader.
+# PPO.learn then continues from the pretrained policy, the value head and PPO's optimizer are untouched
+#
+# python bc_pretrain.py --dataset datasets/rule --out ppo_football_logs/bc_model.zip  ->  pretrained model
+# train_ppo.py --bc-dataset datasets/rule  ->  warm started training
+
+
+def actor_logits(policy, obs):
+    features = policy.extract_features(obs, policy.pi_features_extractor)
+    return policy.action_net(policy.mlp_extractor.forward_actor(features))
+
+
+def actor_parameters(policy):
+    # parameters the actions depend on (a shared features extractor is a plain Flatten in MlpPolicy)
+    modules = (policy.pi_features_extractor, policy.mlp_extractor.policy_net, policy.action_net)
+    return [param for module in modules for param in module.parameters()]
+
+
+def pretrain_policy(model, dataset, epochs=5, batch_size=1024, learning_rate=1e-3, seed=None, verbose=1):
+    # fits model.policy's actor to the dataset (a dataset directory), returns [(loss, accuracy)] per epoch
+    with open(os.path.join(dataset, "manifest.json")) as f:
+        manifest = json.load(f)
+    obs_shape = model.observation_space.shape
+    if (manifest["obs_dim"],) != obs_shape:
+        raise ValueError(f"{dataset} has observations of shape ({manifest['obs_dim']},) (obs_layout "
+                         f"{manifest['obs_layout']!r}), the model takes {obs_shape}")
+
+    policy = model.policy
+    device = policy.device
+    optimizer = torch.optim.Adam(actor_parameters(policy), lr=learning_rate)
+    loader = ShardLoader(dataset, batch_size=batch_size, seed=seed)
+    history = []
+    policy.set_training_mode(True)
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        total_loss, correct, n = 0.0, 0, 0
+        for batch in loader:
+            obs = torch.as_tensor(batch["obs"], device=device)
+            actions = torch.as_tensor(batch["action"], dtype=torch.long, device=device)
+            logits = actor_logits(policy, obs)
+            loss = F.cross_entropy(logits, actions)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(actions)
+            correct += (logits.argmax(1) == actions).sum().item()
+            n += len(actions)
+        history.append((total_loss / n, correct / n))
+        if verbose >= 1:
+            print(f"BC epoch {epoch + 1}/{epochs}: loss {total_loss / n:.4f}, accuracy {correct / n:.3f} "
+                  f"({n} transitions, {time.perf_counter() - start:.1f}s)")
+    policy.set_training_mode(False)
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="behaviour cloning pretraining of a PPO MlpPolicy")
+    parser.add_argument("--dataset", required=True, help="dataset directory of trajectory_dataset.py")
+    parser.add_argument("--out", required=True, help="pretrained model (.zip), a starting point for PPO.load")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    from football_vec_env import FootballVecEnv
+    with open(os.path.join(args.dataset, "manifest.json")) as f:
+        obs_layout = json.load(f)["obs_layout"]
+    model = PPO("MlpPolicy", FootballVecEnv(1, obs_layout=obs_layout), seed=args.seed, device="cpu")
+    pretrain_policy(model, args.dataset, args.epochs, args.batch_size, args.lr, args.seed)
+    model.save(args.out)
+    print(f"pretrained model saved at {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import os
+import time
+import numpy as np
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+
+from async_eval import evaluate_model
+from bc_pretrain import pretrain_policy
+from train_common import make_train_env
+from trajectory_dataset import generate_dataset
+
+# PPO from random weights against PPO warm started by behaviour cloning (bc_pretrain.py) on a dataset
+# of the rule-based AI: env steps and wall clock until the evaluation reward reaches --target. the
+# evaluations run in this process on fixed seeds, their time is not counted. the warm start's wall
+# clock includes the pretraining (not the dataset generation, a dataset is reused across runs)
+# python benchmark_bc.py [--timesteps 300000] [--target 150] [--seeds 0 1 2]
+N_ENVS = 16
+EVAL_SEED = 1000
+
+
+class TargetRewardCallback(BaseCallback):
+    # evaluates every eval_freq env steps, stops training once the mean reward reaches target.
+    # history: (env steps, training seconds, mean reward)
+    def __init__(self, eval_freq, n_eval_episodes, target, clock_offset=0.0):
+        super().__init__()
+        self.eval_freq = eval_freq
+        self.n_eval_episodes = n_eval_episodes
+        self.target = target
+        self.clock_offset = clock_offset
+        self.history = []
+        self.reached = None
+        self._next_eval = 0
+        self._eval_time = 0.0
+
+    def _on_training_start(self):
+        self._start = time.perf_counter()
+        self._evaluate()
+
+    def _on_step(self):
+        if self.num_timesteps >= self._next_eval:
+            return self._evaluate()
+        return True
+
+    def _evaluate(self):
+        start = time.perf_counter()
+        seconds = start - self._start - self._eval_time + self.clock_offset
+        rewards, _ = evaluate_model(self.model, self.n_eval_episodes, seed=EVAL_SEED)
+        self.history.append((self.num_timesteps, seconds, float(np.mean(rewards))))
+        self._eval_time += time.perf_counter() - start
+        self._next_eval = self.num_timesteps + self.eval_freq
+        if self.reached is None and self.history[-1][2] >= self.target:
+            self.reached = self.history[-1]
+        return self.reached is None
+
+
+def run(seed, args, warm):
+    env = make_train_env("batched", N_ENVS, seed=seed)
+    # hyperparameters of train_ppo.py
+    model = PPO("MlpPolicy", env, verbose=0, learning_rate=1e-4, n_steps=max(2048 // N_ENVS, 1), batch_size=128,
+                n_epochs=10, gamma=0.99, gae_lambda=0.95, clip_range=0.2, ent_coef=0.005, seed=seed, device="cpu")
+    pretrain_seconds = 0.0
+    if warm:
+        start = time.perf_counter()
+        pretrain_policy(model, args.dataset, epochs=args.bc_epochs, seed=seed, verbose=0)
+        pretrain_seconds = time.perf_counter() - start
+    callback = TargetRewardCallback(args.eval_freq, args.eval_episodes, args.target, pretrain_seconds)
+    model.learn(total_timesteps=args.timesteps, callback=callback)
+    env.close()
+    return pretrain_seconds, callback
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PPO with and without behaviour cloning warm start")
+    parser.add_argument("--dataset", default="datasets/rule", help="demonstrations (generated if missing)")
+    parser.add_argument("--transitions", type=int, default=1_000_000, help="transitions of a generated dataset")
+    parser.add_argument("--bc-epochs", type=int, default=5)
+    parser.add_argument("--timesteps", type=int, default=300_000, help="PPO budget per run")
+    parser.add_argument("--target", type=float, default=150.0, help="mean evaluation reward to reach")
+    parser.add_argument("--eval-freq", type=int, default=10_000, help="env steps between evaluations")
+    parser.add_argument("--eval-episodes", type=int, default=10)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.dataset, "manifest.json")):
+        start = time.perf_counter()
+        generate_dataset(args.dataset, "rule", args.transitions, seed=0)
+        print(f"dataset of {args.transitions} transitions generated in {time.perf_counter() - start:.1f}s")
+
+    for warm in (False, True):
+        name = "BC warm start" if warm else "random init"
+        reached = []
+        for seed in args.seeds:
+            pretrain_seconds, callback = run(seed, args, warm)
+            steps, seconds, reward = zip(*callback.history)
+            print(f"{name}, seed {seed}: reward {reward[0]:.1f} at 0 steps, best {max(reward):.1f}, "
+                  + (f"target reached after {callback.reached[0]} env steps, {callback.reached[1]:.1f}s"
+                     if callback.reached else f"target not reached in {steps[-1]} env steps ({seconds[-1]:.1f}s)")
+                  + (f" (pretraining {pretrain_seconds:.1f}s)" if warm else ""))
+            reached.append(callback.reached)
+        done = [r for r in reached if r is not None]
+        if done:
+            print(f"{name}: target {args.target:g} reached in {len(done)}/{len(reached)} runs, median "
+                  f"{np.median([r[0] for r in done]):.0f} env steps, {np.median([r[1] for r in done]):.1f}s")
+        else:
+            print(f"{name}: target {args.target:g} not reached")
+
+
+if __name__ == "__main__":
+    main()
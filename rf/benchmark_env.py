@@ -0,0 +1,151 @@
+import time
+import tracemalloc
+import numpy as np
+from football_env_ppo import FootballEnv
+from football_vec_env import FootballVecEnv
+from football_kernel import NUMBA_AVAILABLE
+
+# env steps per second: single FootballEnv vs FootballVecEnv with N matches,
+# and trajectory parity of the compiled step kernel against the reference step
+N_STEPS = 20000
+N_ENVS = 256
+SEED = 0
+
+
+def run_single(backend, actions):
+    env = FootballEnv(backend=backend)
+    obs, _ = env.reset(seed=SEED)
+    trajectory = [obs]
+    start = time.perf_counter()
+    for action in actions:
+        obs, reward, terminated, truncated, _ = env.step(action)
+        trajectory.append((obs, reward, terminated, truncated))
+        if terminated or truncated:
+            obs, _ = env.reset()
+            trajectory.append(obs)
+    return N_STEPS / (time.perf_counter() - start), trajectory
+
+
+def run_vec(backend, actions):
+    vec_env = FootballVecEnv(N_ENVS, seed=SEED, backend=backend)
+    vec_env.reset()
+    vec_env.step(actions[0])  # compile the kernel outside of the timing
+    start = time.perf_counter()
+    for action in actions:
+        vec_env.step(action)
+    return len(actions) * N_ENVS / (time.perf_counter() - start)
+
+
+rng = np.random.default_rng(SEED)
+actions = rng.integers(0, 5, N_STEPS)
+vec_actions = rng.integers(0, 5, (max(1, N_STEPS * 5 // N_ENVS), N_ENVS))
+
+run_single("numba", actions[:10])  # compile the kernel outside of the timing
+single_sps, reference = run_single("python", actions)
+kernel_sps, compiled = run_single("numba", actions)
+vec_sps = run_vec("numpy", vec_actions)
+vec_kernel_sps = run_vec("numba", vec_actions)
+
+print(f"numba installed: {NUMBA_AVAILABLE}")
+print(f"FootballEnv: {single_sps:,.0f} steps/sec")
+print(f"FootballEnv (numba backend): {kernel_sps:,.0f} steps/sec ({kernel_sps / single_sps:.1f}x)")
+print(f"FootballVecEnv (N={N_ENVS}): {vec_sps:,.0f} steps/sec ({vec_sps / single_sps:.1f}x)")
+print(f"FootballVecEnv (N={N_ENVS}, numba backend): {vec_kernel_sps:,.0f} steps/sec ({vec_kernel_sps / single_sps:.1f}x)")
+
+# same episodes and same values up to float rounding: compiled math.hypot is the C library one,
+# which can differ from python's math.hypot in the last bit
+same_episodes = len(reference) == len(compiled)
+max_diff = 0.0
+for ref, out in zip(reference, compiled):
+    if isinstance(ref, tuple):
+        same_episodes &= ref[2:] == out[2:]
+        max_diff = max(max_diff, np.abs(ref[0] - out[0]).max(), abs(ref[1] - out[1]))
+    else:
+        max_diff = max(max_diff, np.abs(ref - out).max())
+print(f"numba backend parity: same episodes {same_episodes}, max abs difference {max_diff:.2e}")
+
+# idle enemy (kick without touching the ball): step() every step vs fast_forward() between events
+env = FootballEnv()
+env.reset(seed=SEED)
+start = time.perf_counter()
+for _ in range(N_STEPS):
+    _, _, terminated, truncated, _ = env.step(4)
+    if terminated or truncated:
+        env.reset()
+step_time = time.perf_counter() - start
+
+env.reset(seed=SEED)
+simulated, n_calls = 0, 0
+start = time.perf_counter()
+while simulated < N_STEPS:
+    _, _, _, truncated, info = env.fast_forward(max_steps=N_STEPS - simulated)
+    simulated += info["skipped_steps"]
+    n_calls += 1
+    if truncated:
+        env.reset()
+        continue
+    if simulated < N_STEPS:
+        _, _, terminated, truncated, _ = env.step(4)
+        simulated += 1
+        n_calls += 1
+        if terminated or truncated:
+            env.reset()
+fast_forward_time = time.perf_counter() - start
+print(f"fast_forward: {N_STEPS / n_calls:.1f} env steps per call, {step_time / fast_forward_time:.1f}x faster than step()")
+
+# heap allocations left behind per step (tracemalloc): with obs_views the observation buffer is reused,
+# so the net memory after 1x and 2x the steps has to stay flat
+def net_allocated(env, actions):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before
+
+
+for backend in ("python", "numba"):
+    env = FootballEnv(backend=backend, obs_views=True)
+    env.reset(seed=SEED)
+    net_allocated(env, actions[:1000])  # warm up the noise / ball reset blocks and the kernel buffers
+    short, long = net_allocated(env, actions[:N_STEPS // 2]), net_allocated(env, actions)
+    print(f"FootballEnv ({backend} backend, obs_views): net bytes after {N_STEPS // 2} steps {short}, after {N_STEPS} steps {long}")
+    assert long <= short + 4096, "allocations grow with the number of steps"
+
+
+# phase profile of a step (start_profiling), and the cost of the timers: profiled against plain steps in
+# alternating blocks. stop_profiling puts the plain step back, so an env that is not profiled pays nothing
+def run_block(step, actions, reset):
+    start = time.perf_counter()
+    for action in actions:
+        if step(action)[2]:
+            reset()
+    return time.perf_counter() - start
+
+
+def print_profile(name, profile):
+    print(f"{name} phases: " + ", ".join(f"{phase} {stats['mean_ns'] / 1000:.2f} us ({stats['share']:.0%})"
+                                        for phase, stats in profile.items()))
+
+
+plain, profiled = FootballEnv(), FootballEnv()
+plain.reset(seed=SEED)
+profiled.reset(seed=SEED)
+profiled.start_profiling()
+block = actions[:2000].tolist()
+ratios = [run_block(profiled.step, block, profiled.reset) / run_block(plain.step, block, plain.reset) for _ in range(50)]
+print_profile("FootballEnv", profiled.get_profile())
+print(f"FootballEnv profiling overhead: {np.median(ratios) - 1:+.1%} per step")
+profiled.stop_profiling()
+assert profiled.step.__func__ is FootballEnv.step
+
+vec_env = FootballVecEnv(N_ENVS, seed=SEED)
+vec_env.reset()
+vec_env.start_profiling()
+for action in vec_actions[:1000]:
+    vec_env.step(action)
+print_profile(f"FootballVecEnv (N={N_ENVS})", vec_env.get_profile())
+vec_env.stop_profiling()
@@ -0,0 +1,94 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import torch
+from stable_baselines3 import PPO
+from football_env_ppo import OBS_LAYOUTS
+from football_vec_env import FootballVecEnv
+from numpy_policy import NumpyPolicy, export_policy
+from onnx_policy import ONNXRUNTIME_AVAILABLE, GRAPH_OPTIMIZATION_LEVELS, OnnxPolicy, export_onnx
+
+# NumpyPolicy and OnnxPolicy (when onnxruntime is installed) against the sb3 model they were exported from:
+# agreement of the deterministic actions on observations of random play, and predict() latency from
+# single observations up to batches of 4096
+# python benchmark_policy.py [model.zip] [--intra-op-threads N] [--optimization-level all]
+N_ENVS = 64
+N_STEPS = 500
+N_CALLS = 2000
+BATCH_SIZES = (1, 4, 16, 64, 256, 1024, 4096)
+SEED = 0
+# an export has to give the model's actions and its log-probabilities up to float32 rounding
+LOGIT_TOLERANCE = 1e-5
+
+
+def log_softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    return logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+
+
+parser = argparse.ArgumentParser(description="NumPy / onnxruntime policies vs the stable-baselines3 model")
+parser.add_argument("model_path", nargs="?", default="ppo_football_logs/best_model.zip")
+parser.add_argument("--intra-op-threads", type=int, default=1, help="onnxruntime threads per call (0: one per core)")
+parser.add_argument("--optimization-level", choices=GRAPH_OPTIMIZATION_LEVELS, default="all",
+                    help="onnxruntime graph optimization level")
+args = parser.parse_args()
+
+# same thread budget for torch and onnxruntime
+torch.set_num_threads(args.intra_op_threads or os.cpu_count())
+model = PPO.load(args.model_path, device="cpu")
+policies = {"sb3": model}
+with tempfile.TemporaryDirectory() as tmp:
+    npz_path = export_policy(args.model_path, os.path.join(tmp, "policy.npz"))
+    policies["numpy"] = NumpyPolicy(npz_path)
+    sizes = f"{os.path.getsize(args.model_path) / 1024:.1f} KiB zip, {os.path.getsize(npz_path) / 1024:.1f} KiB npz"
+    if ONNXRUNTIME_AVAILABLE:
+        onnx_path = export_onnx(args.model_path, os.path.join(tmp, "policy.onnx"))
+        policies["onnx"] = OnnxPolicy(onnx_path, intra_op_threads=args.intra_op_threads,
+                                      optimization_level=args.optimization_level)
+        sizes += f", {os.path.getsize(onnx_path) / 1024:.1f} KiB onnx"
+    else:
+        print("onnxruntime is not installed, skipping OnnxPolicy")
+print(f"{args.model_path}: {sizes}")
+
+# observations of random play in the layout the model was trained on
+obs_dim = model.observation_space.shape[0]
+obs_layout = next(name for name, features in OBS_LAYOUTS.items() if len(features) == obs_dim)
+env = FootballVecEnv(N_ENVS, obs_layout=obs_layout, seed=SEED)
+rng = np.random.default_rng(SEED)
+observations = [env.reset()]
+for _ in range(N_STEPS):
+    observations.append(env.step(rng.integers(0, 5, N_ENVS))[0])
+observations = np.concatenate(observations)
+
+expected, _ = model.predict(observations, deterministic=True)
+with torch.no_grad():
+    # sb3 normalizes its logits to log-probabilities
+    expected_logits = model.policy.get_distribution(torch.as_tensor(observations)).distribution.logits.numpy()
+for name, policy in policies.items():
+    if name == "sb3":
+        continue
+    actions, _ = policy.predict(observations, deterministic=True)
+    logits = log_softmax(policy.action_logits(observations))
+    agreement = np.mean(actions == expected)
+    logit_diff = np.abs(logits - expected_logits).max()
+    print(f"{name}: actions agree on {agreement:.4%} of {len(observations)} observations, "
+          f"max log-prob difference {logit_diff:.2e}")
+    assert agreement == 1.0, f"{name}: actions differ from model.predict(deterministic=True)"
+    assert logit_diff <= LOGIT_TOLERANCE, f"{name}: log-probabilities differ by {logit_diff:.2e} > {LOGIT_TOLERANCE:g}"
+    single = [policy.predict(obs, deterministic=True)[0] for obs in observations[:N_CALLS]]
+    assert np.array_equal(single, actions[:N_CALLS]), f"{name}: single and batched predictions differ"
+
+print("---------- predict() latency (us per call) ----------")
+print("batch  " + "".join(f"{name:>12}" for name in policies))
+for batch_size in BATCH_SIZES:
+    batch = observations[:batch_size] if batch_size > 1 else observations[0]
+    n_calls = max(N_CALLS // batch_size, 20)
+    times = []
+    for policy in policies.values():
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            policy.predict(batch, deterministic=True)
+        times.append((time.perf_counter() - start) / n_calls * 1e6)
+    print(f"{batch_size:5d}  " + "".join(f"{t:12.1f}" for t in times))
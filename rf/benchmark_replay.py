@@ -0,0 +1,91 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from football_env_ppo import FootballEnv
+from replay import read_replay, EVENT_MATCH_START, EVENT_LEFT_GOAL, EVENT_RIGHT_GOAL
+
+# cost of recording replays (FootballEnv.start_recording) per env step, and a round trip check: the
+# frames re-simulated from the action log hold the states the env went through. the two envs step in
+# alternating blocks and the medians of the block times are compared, single runs vary more than the
+# recording costs.
+# with --model the actions come from the policy (a decision per step as in the games and matches)
+# python benchmark_replay.py [--model ppo_football_logs/best_model.zip]
+N_BLOCKS = 200
+BLOCK_STEPS = 2000
+SEED = 0
+
+
+def run_block(env, actions, policy=None):
+    obs = env._get_obs()
+    start = time.perf_counter()
+    for action in actions:
+        if policy is not None:
+            action, _ = policy.predict(obs, deterministic=True)
+        obs, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            obs, _ = env.reset()
+    return time.perf_counter() - start
+
+
+parser = argparse.ArgumentParser(description="replay recording overhead per env step")
+parser.add_argument("--model", default=None, help="also measure steps with decisions of this policy")
+args = parser.parse_args()
+
+policies = [("random actions", None)]
+if args.model:
+    from numpy_policy import load_policy
+    policies.append((f"decisions of {args.model}", load_policy(args.model, device="cpu")))
+
+rng = np.random.default_rng(SEED)
+actions = rng.integers(0, 5, BLOCK_STEPS).tolist()
+with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, "benchmark.replay")
+    for (name, policy), backend in [(policy, backend) for policy in policies for backend in ("python", "numba")]:
+        plain, recorded = FootballEnv(backend=backend), FootballEnv(backend=backend)
+        recorded.start_recording(path)
+        plain.reset(seed=SEED)
+        recorded.reset(seed=SEED)
+        n_blocks = N_BLOCKS if policy is None else N_BLOCKS // 10
+        times = []
+        for i in range(n_blocks):
+            # the env stepped first changes every block, the second of two runs tends to be faster
+            if i % 2:
+                recorded_time = run_block(recorded, actions, policy)
+                times.append((run_block(plain, actions, policy), recorded_time))
+            else:
+                times.append((run_block(plain, actions, policy), run_block(recorded, actions, policy)))
+        times = np.array(times)
+        recorded.stop_recording()
+        step_us = np.median(times, axis=0) / BLOCK_STEPS * 1e6
+        overhead = np.median(times[:, 1] / times[:, 0]) - 1
+        print(f"{name}, {backend} backend: {step_us[0]:.2f} us per step, {step_us[1]:.2f} us recording "
+              f"({overhead:+.1%} median of the block ratios)")
+
+    # round trip: frames re-simulated from the action log of a short recording against the states of the
+    # same steps, with matches reset without seed and fast_forward calls (a frame after each) in between
+    env = FootballEnv()
+    env.start_recording(path, note="round trip")
+    env.reset(seed=SEED)
+    states, recorded_actions, goals = [], [], 0
+    for i, action in enumerate(actions):
+        if i % 50 == 49:
+            _, _, terminated, truncated, _ = env.fast_forward(max_steps=100)
+            action = 4
+        else:
+            _, _, terminated, truncated, _ = env.step(action)
+        states.append((env.ball.x, env.ball.y, env.ball.vx, env.ball.vy, env.player.x, env.player.y, env.enemy.x, env.enemy.y))
+        recorded_actions.append(action)
+        goals += terminated
+        if terminated or truncated:
+            env.reset()
+    env.stop_recording()
+    header, frames = read_replay(path)
+    stepped = frames[(frames["events"] & EVENT_MATCH_START) == 0]
+    expected = np.array(states, dtype=np.float32)
+    columns = ("ball_x", "ball_y", "ball_vx", "ball_vy", "left_x", "left_y", "right_x", "right_y")
+    recorded_states = np.stack([stepped[name] for name in columns], axis=1)
+    recorded_goals = np.count_nonzero(frames["events"] & (EVENT_LEFT_GOAL | EVENT_RIGHT_GOAL))
+    print(f"round trip: {len(frames)} frames from a {header['records']} byte log, states match {np.array_equal(recorded_states, expected)}, "
+          f"goals {recorded_goals} / {goals}, actions match {np.array_equal(stepped['right_action'], recorded_actions)}")
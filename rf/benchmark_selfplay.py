@@ -0,0 +1,72 @@
+import argparse
+import time
+import torch
+from stable_baselines3 import PPO
+
+from football_vec_env import FootballVecEnv
+from numpy_policy import NumpyPolicy, export_policy
+from selfplay_vec_env import SelfPlayVecEnv
+
+# cost of the opponent pool of SelfPlayVecEnv: time of the opponents' actions (mirrored observations and
+# one batched predict per checkpoint) against the time of a training step, i.e. an env step plus the
+# learner's forward pass as in PPO's rollout collection. checkpoints as .npz (NumpyPolicy, the model is
+# exported first) and as torch models. the pool holds copies of one model, the cost does not depend on
+# the weights
+# python benchmark_selfplay.py [--model ppo_football_logs/best_model.zip] [--n-envs 64] [--pool 8]
+N_STEPS = 2000
+SEED = 0
+
+
+def time_steps(env, policy, n_steps):
+    # (seconds per env step, per learner forward, per opponent action computation)
+    obs = env.reset()
+    env_time = forward_time = 0.0
+    for _ in range(n_steps):
+        start = time.perf_counter()
+        with torch.no_grad():
+            actions, _, _ = policy(torch.as_tensor(obs))
+        actions = actions.numpy()
+        middle = time.perf_counter()
+        obs, _, _, _ = env.step(actions)
+        end = time.perf_counter()
+        forward_time += middle - start
+        env_time += end - middle
+
+    opponent_time = 0.0
+    if isinstance(env, SelfPlayVecEnv) and len(env._checkpoint_matches):
+        start = time.perf_counter()
+        for _ in range(n_steps):
+            env._opponent_actions()
+        opponent_time = time.perf_counter() - start
+    return env_time / n_steps, forward_time / n_steps, opponent_time / n_steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="opponent inference cost of self-play")
+    parser.add_argument("--model", default="ppo_football_logs/best_model.zip")
+    parser.add_argument("--n-envs", type=int, default=64)
+    parser.add_argument("--pool", type=int, default=8, help="checkpoints in the opponent pool")
+    parser.add_argument("--chaser-prob", type=float, default=0.2)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    learner = PPO.load(args.model, device="cpu").policy
+    # the .npz export itself, load_policy would fall back to torch without an up to date one
+    opponents = {"npz": NumpyPolicy(export_policy(args.model)), "torch": PPO.load(args.model, device="cpu")}
+    print(f"{args.n_envs} envs, {args.pool} checkpoints, chaser in {args.chaser_prob:.0%} of the matches")
+
+    env_us, forward_us, _ = time_steps(FootballVecEnv(args.n_envs, seed=SEED), learner, N_STEPS)
+    print(f"no self-play: env step {env_us * 1e6:.0f} us, learner forward {forward_us * 1e6:.0f} us")
+    for name, opponent in opponents.items():
+        env = SelfPlayVecEnv(args.n_envs, pool_size=args.pool, chaser_prob=args.chaser_prob, seed=SEED)
+        for i in range(args.pool):
+            env.add_opponent(opponent, f"{name} {i}")
+        env_s, forward_s, opponent_s = time_steps(env, learner, N_STEPS)
+        share = opponent_s / (env_s + forward_s)
+        print(f"{name} checkpoints: env step {env_s * 1e6:.0f} us (opponents {opponent_s * 1e6:.0f} us), learner "
+              f"forward {forward_s * 1e6:.0f} us, opponents {share:.1%} of the training step, "
+              f"{opponent_s / env_s:.1%} of the env step")
+
+
+if __name__ == "__main__":
+    main()
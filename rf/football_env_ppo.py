@@ -2,8 +2,8 @@ import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
 import math
-import random
-import pygame
+from time import perf_counter_ns
+from replay import ActionRecorder
 
 # global constants
 WIDTH, HEIGHT = 800, 600
@@ -18,38 +18,129 @@ KICK_FORCE = 5
 PLAYER_SPEED = 5
 ENEMY_SPEED = 3
 
+# steps of free ball flight computed at once by FootballEnv.fast_forward
+FAST_FORWARD_CHUNK = 256
+
+# random draws of FootballEnv are made in blocks and refilled when they run out
+NOISE_BLOCK = 1024
+BALL_RESET_BLOCK = 64
+
+# random moves of the chasing player: NO_NOISE, or an index of NOISE_DIRECTIONS
+NO_NOISE = -1
+NOISE_DIRECTIONS = [(1,0), (-1,0), (0,1), (0,-1)]
+
+# version of the match simulation (step, reset, fast_forward and the order of the random draws). replay
+# action logs are re-simulated and refuse other physics: bump it on any change that plays a logged match
+# differently, the constants are compared on their own (physics_signature)
+PHYSICS_VERSION = 1
+
+# phases of a step timed by start_profiling(): enemy action, chasing player, ball, goal check, reward, observation
+PROFILE_PHASES = ("action", "update_player", "ball_update", "check_goal", "calculate_reward", "get_obs")
+
+# observation features, normalized by the field size (distances by the field diagonal)
+FIELD_DIAGONAL = math.hypot(WIDTH, HEIGHT)
+OBS_FEATURES = (
+    # player / enemy position
+    "player_x", "player_y", "enemy_x", "enemy_y",
+    # ball state
+    "ball_x", "ball_y", "ball_vx", "ball_vy",
+    # relative position of ball to enemy and player
+    "ball_enemy_dx", "ball_enemy_dy", "ball_player_dx", "ball_player_dy",
+    # distances of the ball to the enemy and to the goal it attacks (left) / defends (right)
+    "ball_enemy_dist", "ball_goal_dist", "ball_own_goal_dist",
+)
+
+# named layouts, FootballEnv(obs_layout=...) also takes a custom list of OBS_FEATURES
+OBS_LAYOUTS = {
+    "12d": OBS_FEATURES[:12],
+    "8d": OBS_FEATURES[:8],
+}
+
+
+def obs_layout_columns(obs_layout):
+    # column index map of a layout: OBS_FEATURES index -> observation column, -1 if not requested
+    features = OBS_LAYOUTS[obs_layout] if isinstance(obs_layout, str) else tuple(obs_layout)
+    unknown = [name for name in features if name not in OBS_FEATURES]
+    if unknown or not features or len(set(features)) != len(features):
+        raise ValueError(f"obs_layout must be one of {list(OBS_LAYOUTS)} or a list of distinct OBS_FEATURES, got {obs_layout!r}")
+    columns = [-1] * len(OBS_FEATURES)
+    for column, name in enumerate(features):
+        columns[OBS_FEATURES.index(name)] = column
+    return tuple(columns)
+
+
+def profile_report(total_ns, calls):
+    # get_profile() of the envs: {phase: {"calls", "total_ns", "mean_ns", "share"}}, share of the profiled time
+    profiled_ns = sum(total_ns) or 1
+    return {phase: {"calls": n, "total_ns": ns, "mean_ns": ns / n if n else 0.0, "share": ns / profiled_ns}
+            for phase, ns, n in zip(PROFILE_PHASES, total_ns, calls)}
+
+
+def physics_signature():
+    # what a match played from its seed and actions depends on, stored with action logs
+    return {"version": PHYSICS_VERSION, "field": [WIDTH, HEIGHT], "player_size": [PLAYER_WIDTH, PLAYER_HEIGHT],
+            "ball_radius": BALL_RADIUS, "goal_size": [GOAL_WIDTH, GOAL_HEIGHT],
+            "ball_speed": [MIN_BALL_SPEED, MAX_BALL_SPEED], "friction": FRICTION, "kick_force": KICK_FORCE,
+            "player_speed": PLAYER_SPEED, "enemy_speed": ENEMY_SPEED, "noise_block": NOISE_BLOCK,
+            "ball_reset_block": BALL_RESET_BLOCK, "noise_directions": NOISE_DIRECTIONS}
+
+
+def spawn_seeds(seed, n):
+    # independent seeds for n envs / workers from one root seed
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(n)]
+
 
 class Player:
+    # plain int rect (left/top) instead of pygame.Rect, so training does not need pygame
+    __slots__ = ("x", "y", "is_enemy")
+
     def __init__(self, x, y, is_enemy=False):
-        self.rect = pygame.Rect(x, y, PLAYER_WIDTH, PLAYER_HEIGHT)
+        self.x = x
+        self.y = y
         self.is_enemy = is_enemy
 
+    @property
+    def centerx(self):
+        return self.x + PLAYER_WIDTH // 2
+
+    @property
+    def centery(self):
+        return self.y + PLAYER_HEIGHT // 2
+
+    def set_center(self, cx, cy):
+        self.x = cx - PLAYER_WIDTH // 2
+        self.y = cy - PLAYER_HEIGHT // 2
+
     def move(self, dx, dy):
-        new_rect = self.rect.move(dx * (ENEMY_SPEED if self.is_enemy else PLAYER_SPEED),
-                                  dy * (ENEMY_SPEED if self.is_enemy else PLAYER_SPEED))
+        speed = ENEMY_SPEED if self.is_enemy else PLAYER_SPEED
+        # offsets are truncated to int like pygame.Rect.move
+        x = self.x + int(dx * speed)
+        y = self.y + int(dy * speed)
 
         # player cannot go out of bounds, and cannot cross the center line
         if self.is_enemy:
-            new_rect.left = max(WIDTH//2, new_rect.left)
-            new_rect.right = min(WIDTH, new_rect.right)
+            x = min(max(WIDTH//2, x), WIDTH - PLAYER_WIDTH)
         else:
-            new_rect.left = max(0, new_rect.left)
-            new_rect.right = min(WIDTH//2, new_rect.right)
+            x = min(max(0, x), WIDTH//2 - PLAYER_WIDTH)
 
-        new_rect.top = max(0, new_rect.top)
-        new_rect.bottom = min(HEIGHT, new_rect.bottom)
-        self.rect = new_rect
+        self.x = x
+        self.y = min(max(0, y), HEIGHT - PLAYER_HEIGHT)
+
+    def to_rect(self):
+        # adapter for rendering with pygame, only imported when it is needed
+        import pygame
+        return pygame.Rect(self.x, self.y, PLAYER_WIDTH, PLAYER_HEIGHT)
 
 class Ball:
-    def __init__(self):
-        self.reset()
+    __slots__ = ("x", "y", "vx", "vy")
 
-    def reset(self):
-        self.x = random.randint(WIDTH//4, 3*WIDTH//4)
-        self.y = random.randint(HEIGHT//4, 3*HEIGHT//4)
+    def __init__(self):
+        self.reset(WIDTH//2, HEIGHT//2, 0.0, 0.0)
 
-        angle = random.uniform(0, 2*math.pi)
-        speed = random.uniform(MIN_BALL_SPEED, MIN_BALL_SPEED+2)
+    def reset(self, x, y, angle, speed):
+        # the random position and velocity are drawn by FootballEnv
+        self.x = x
+        self.y = y
         self.vx = math.cos(angle) * speed
         self.vy = math.sin(angle) * speed
 
@@ -60,10 +151,10 @@ class Ball:
         # ball speed decreases when colliding with bounds
         if self.x - BALL_RADIUS < 0 or self.x + BALL_RADIUS > WIDTH:
             self.vx *= -0.8
-            self.x = np.clip(self.x, BALL_RADIUS, WIDTH-BALL_RADIUS)
+            self.x = min(max(self.x, BALL_RADIUS), WIDTH-BALL_RADIUS)
         if self.y - BALL_RADIUS < 0 or self.y + BALL_RADIUS > HEIGHT:
             self.vy *= -0.8
-            self.y = np.clip(self.y, BALL_RADIUS, HEIGHT-BALL_RADIUS)
+            self.y = min(max(self.y, BALL_RADIUS), HEIGHT-BALL_RADIUS)
 
         # friction
         self.vx *= FRICTION
@@ -76,18 +167,26 @@ class Ball:
             self.vy = (self.vy/speed) * MIN_BALL_SPEED
 
 class FootballEnv(gym.Env):
-    def __init__(self, max_steps=3000):
+    def __init__(self, max_steps=3000, backend="python", obs_layout="12d", obs_views=False, obs_buffer=None):
         super().__init__()
 
+        # "python": reference step below, "numba": compiled step kernel (plain python without numba)
+        assert backend in ("python", "numba"), "backend must be 'python' or 'numba'"
+        self.backend = backend
+        if backend == "numba":
+            self._init_kernel()
+
         self.MAX_STEP = max_steps
         self.current_step = 0
 
         # discrete action space: 0: up, 1: down, 2: left, 3: right, 4: kick
         self.action_space = spaces.Discrete(5)
 
-        # observation space: 12-dimensional vector
+        # observation space: "12d", "8d" or a custom list of OBS_FEATURES, only those are computed
+        self.obs_columns = obs_layout_columns(obs_layout)
+        obs_dim = sum(column >= 0 for column in self.obs_columns)
         self.observation_space = spaces.Box(
-            low=-1.0, high=1.0, shape=(12,), dtype=np.float32
+            low=-1.0, high=1.0, shape=(obs_dim,), dtype=np.float32
         )
 
         # initialize game objects
@@ -95,42 +194,127 @@ class FootballEnv(gym.Env):
         self.enemy = Player(3 * WIDTH//4, HEIGHT//2, is_enemy=True)
         self.ball = Ball()
 
+        # generator the pre-drawn random blocks come from
+        self._block_rng = None
+
+        # observations are written into one preallocated buffer (or a row of a caller's batch buffer).
+        # obs_views=True returns that buffer itself instead of a copy: no allocation per step, but the
+        # returned array is overwritten by the next step / reset
+        self.obs_views = obs_views
+        self.set_obs_buffer(np.zeros(obs_dim, dtype=np.float32) if obs_buffer is None else obs_buffer)
+
+        # action log of start_recording, steps are logged from its first reset on
+        self._recorder = None
+        self._recording = False
+
+        # phase timers of start_profiling, in PROFILE_PHASES order
+        self._profiling = False
+        self._profile_ns = [0] * len(PROFILE_PHASES)
+        self._profile_steps = 0
+
+    def set_obs_buffer(self, out):
+        # out: float32 C-contiguous array of the observation shape, e.g. batch_obs[i]
+        if out.dtype != np.float32 or out.shape != self.observation_space.shape or not out.flags.c_contiguous:
+            raise ValueError(f"obs buffer must be a C-contiguous float32 array of shape {self.observation_space.shape}")
+        self._obs = out
+        # item assignment through a memoryview is much cheaper than through the ndarray
+        self._obs_view = memoryview(out)
+
+    def _refill_noise(self):
+        # the player moves randomly 10% of the time (u < 0.1, and then u * 40 picks the direction)
+        u = self.np_random.random(NOISE_BLOCK)
+        self._noise = np.where(u < 0.1, (u * 40).astype(np.intp) & 3, NO_NOISE).tolist()
+        self._noise_index = 0
+
+    def _refill_ball_resets(self):
+        # the ball appears at random in the middle area, with a random initial velocity
+        rng = self.np_random
+        self._ball_resets = list(zip(
+            rng.integers(WIDTH//4, 3*WIDTH//4, BALL_RESET_BLOCK, endpoint=True).tolist(),
+            rng.integers(HEIGHT//4, 3*HEIGHT//4, BALL_RESET_BLOCK, endpoint=True).tolist(),
+            rng.uniform(0, 2*math.pi, BALL_RESET_BLOCK).tolist(),
+            rng.uniform(MIN_BALL_SPEED, MIN_BALL_SPEED+2, BALL_RESET_BLOCK).tolist(),
+        ))
+        self._ball_reset_index = 0
+
+    def _next_noise(self):
+        if self._noise_index == NOISE_BLOCK:
+            self._refill_noise()
+        noise = self._noise[self._noise_index]
+        self._noise_index += 1
+        return noise
+
+    def _next_ball_reset(self):
+        if self._ball_reset_index == BALL_RESET_BLOCK:
+            self._refill_ball_resets()
+        sample = self._ball_resets[self._ball_reset_index]
+        self._ball_reset_index += 1
+        return sample
+
     def _get_obs(self):
-        # observation space
-        return np.array([
-            # player position (normalized to [0,1])
-            self.player.rect.centerx / WIDTH,
-            self.player.rect.centery / HEIGHT,
-
-            # enemy position (normalized to [0,1])
-            self.enemy.rect.centerx / WIDTH,
-            self.enemy.rect.centery / HEIGHT,
-
-            # ball state
-            self.ball.x / WIDTH,
-            self.ball.y / HEIGHT,
-            self.ball.vx / MAX_BALL_SPEED,
-            self.ball.vy / MAX_BALL_SPEED,
-
-            # relative position of ball to players and enemy
-            (self.ball.x - self.enemy.rect.centerx) / WIDTH,
-            (self.ball.y - self.enemy.rect.centery) / HEIGHT,
-            (self.ball.x - self.player.rect.centerx) / WIDTH,
-            (self.ball.y - self.player.rect.centery) / HEIGHT,
-        ], dtype=np.float32)
+        ball = self.ball
+        player_cx = self.player.x + PLAYER_WIDTH//2
+        player_cy = self.player.y + PLAYER_HEIGHT//2
+        enemy_cx = self.enemy.x + PLAYER_WIDTH//2
+        enemy_cy = self.enemy.y + PLAYER_HEIGHT//2
+
+        # observation space, written into the preallocated buffer (column -1: not in the layout)
+        obs = self._obs_view
+        (player_x, player_y, enemy_x, enemy_y, ball_x, ball_y, ball_vx, ball_vy,
+         ball_enemy_dx, ball_enemy_dy, ball_player_dx, ball_player_dy,
+         ball_enemy_dist, ball_goal_dist, ball_own_goal_dist) = self.obs_columns
+
+        # player position (normalized to [0,1])
+        if player_x >= 0: obs[player_x] = player_cx / WIDTH
+        if player_y >= 0: obs[player_y] = player_cy / HEIGHT
+
+        # enemy position (normalized to [0,1])
+        if enemy_x >= 0: obs[enemy_x] = enemy_cx / WIDTH
+        if enemy_y >= 0: obs[enemy_y] = enemy_cy / HEIGHT
+
+        # ball state
+        if ball_x >= 0: obs[ball_x] = ball.x / WIDTH
+        if ball_y >= 0: obs[ball_y] = ball.y / HEIGHT
+        if ball_vx >= 0: obs[ball_vx] = ball.vx / MAX_BALL_SPEED
+        if ball_vy >= 0: obs[ball_vy] = ball.vy / MAX_BALL_SPEED
+
+        # relative position of ball to players and enemy
+        if ball_enemy_dx >= 0: obs[ball_enemy_dx] = (ball.x - enemy_cx) / WIDTH
+        if ball_enemy_dy >= 0: obs[ball_enemy_dy] = (ball.y - enemy_cy) / HEIGHT
+        if ball_player_dx >= 0: obs[ball_player_dx] = (ball.x - player_cx) / WIDTH
+        if ball_player_dy >= 0: obs[ball_player_dy] = (ball.y - player_cy) / HEIGHT
+
+        # distances of the ball to the enemy and to the goals
+        if ball_enemy_dist >= 0:
+            obs[ball_enemy_dist] = math.hypot(ball.x - enemy_cx, ball.y - enemy_cy) / FIELD_DIAGONAL
+        if ball_goal_dist >= 0:
+            obs[ball_goal_dist] = math.hypot(ball.x, ball.y - HEIGHT/2) / FIELD_DIAGONAL
+        if ball_own_goal_dist >= 0:
+            obs[ball_own_goal_dist] = math.hypot(WIDTH - ball.x, ball.y - HEIGHT/2) / FIELD_DIAGONAL
+
+        return self._obs if self.obs_views else self._obs.copy()
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         self.current_step = 0
 
+        # new random stream (first reset or new seed): drop the blocks drawn from the old one
+        if self._block_rng is not self.np_random:
+            self._block_rng = self.np_random
+            self._refill_noise()
+            self._refill_ball_resets()
+
         # reset all game objects
-        self.player.rect.center = (WIDTH//4, HEIGHT//2)
-        self.enemy.rect.center = (3*WIDTH//4, HEIGHT//2)
-        self.ball.reset()
+        self.player.set_center(WIDTH//4, HEIGHT//2)
+        self.enemy.set_center(3*WIDTH//4, HEIGHT//2)
+        self.ball.reset(*self._next_ball_reset())
 
         return self._get_obs(), {}
 
     def step(self, action):
+        if self.backend == "numba":
+            return self._kernel_step(action)
+
         self.current_step += 1
 
         # enemy actions
@@ -162,13 +346,260 @@ class FootballEnv(gym.Env):
 
         return self._get_obs(), reward, terminated, truncated, {}
 
-    def _enemy_kick(self):
-        if self.enemy.rect.colliderect(pygame.Rect(
-                self.ball.x - BALL_RADIUS, self.ball.y - BALL_RADIUS,
-                2*BALL_RADIUS, 2*BALL_RADIUS)):
+    def start_profiling(self):
+        # cumulative perf_counter_ns time and call count of every PROFILE_PHASES phase of step(). step is
+        # swapped for a timed version on this instance, without profiling the plain step runs (no flag test)
+        if self.backend != "python":
+            raise ValueError("step profiling needs the python backend, the numba kernel runs all phases at once")
+        self.reset_profile()
+        self._profiling = True
+        self._set_step()
+
+    def stop_profiling(self):
+        # the timers keep their values for get_profile()
+        if self._profiling:
+            self._profiling = False
+            self._set_step()
+
+    def reset_profile(self):
+        self._profile_ns[:] = [0] * len(PROFILE_PHASES)
+        self._profile_steps = 0
+
+    def get_profile(self):
+        return profile_report(self._profile_ns, [self._profile_steps] * len(PROFILE_PHASES))
+
+    def _profiled_step(self, action):
+        # step() with a perf_counter_ns timestamp after every phase
+        t0 = perf_counter_ns()
+        self.current_step += 1
 
-            dx = self.ball.x - self.enemy.rect.centerx
-            dy = self.ball.y - self.enemy.rect.centery
+        # enemy actions
+        if action in [0, 1, 2, 3]:
+            dx, dy = 0, 0
+            if action == 0: dy = -1
+            elif action == 1: dy = 1
+            elif action == 2: dx = -1
+            elif action == 3: dx = 1
+            self.enemy.move(dx, dy)
+        elif action == 4:
+            self._enemy_kick()
+        t1 = perf_counter_ns()
+        self._update_player()
+        t2 = perf_counter_ns()
+        self.ball.update()
+        t3 = perf_counter_ns()
+        goal_result = self._check_goal()
+        t4 = perf_counter_ns()
+        reward = self._calculate_reward(goal_result)
+        t5 = perf_counter_ns()
+        obs = self._get_obs()
+        t6 = perf_counter_ns()
+
+        ns = self._profile_ns
+        ns[0] += t1 - t0
+        ns[1] += t2 - t1
+        ns[2] += t3 - t2
+        ns[3] += t4 - t3
+        ns[4] += t5 - t4
+        ns[5] += t6 - t5
+        # every phase runs once per step
+        self._profile_steps += 1
+
+        terminated = goal_result is not None
+        truncated = self.current_step >= self.MAX_STEP
+        return obs, reward, terminated, truncated, {}
+
+    def _set_step(self):
+        # step of this instance for recording and profiling, the class step without either
+        if self._recording and self._profiling:
+            self.step = self._recorded_step(self._profiled_step)
+        elif self._recording:
+            self.step = self._recorded_step(self._kernel_step if self.backend == "numba" else
+                                            FootballEnv.step.__get__(self))
+        elif self._profiling:
+            self.step = self._profiled_step
+        else:
+            try:
+                del self.step
+            except AttributeError:
+                pass
+
+    def start_recording(self, path, **metadata):
+        # records every reset and step from the next reset on to a replay file (replay.py). only the actions
+        # are logged, a plain int appended per step, read_replay re-simulates the frames from the logged
+        # seeds (with the same physics_signature, else it refuses). reset and (from that reset on) step are
+        # swapped for recording versions on this instance, an env that does not record runs the plain
+        # methods. a first reset without seed draws one from the env's generator, so the recording starts
+        # from a known state
+        self.stop_recording()
+        self._recorder = ActionRecorder(path, source="FootballEnv", backend=self.backend,
+                                        max_steps=self.MAX_STEP, physics=physics_signature(), **metadata)
+        self._record_append = self._recorder.append
+        self.reset = self._recorded_reset
+        return self._recorder
+
+    def stop_recording(self):
+        recorder = self._recorder
+        if recorder is not None:
+            self._recorder = None
+            self._recording = False
+            del self.reset
+            self._set_step()
+            recorder.close()
+
+    def _recorded_reset(self, seed=None, options=None):
+        # the log is written out at every reset
+        recorder = self._recorder
+        recorder.flush()
+        if seed is None and not self._recording:
+            seed = int(self.np_random.integers(2**31))
+        recorder.add_reset(seed)
+        if not self._recording:
+            self._recording = True
+            self._set_step()
+        return FootballEnv.reset(self, seed=seed, options=options)
+
+    def _recorded_step(self, step):
+        # step with the action logged first. a closure, no attribute lookups per step on top of step's
+        append = self._record_append
+
+        def recorded_step(action):
+            append(action)
+            return step(action)
+        return recorded_step
+
+    def fast_forward(self, max_steps=None, reach=0):
+        # skip the steps of free ball flight while the enemy holds its position (kick without touching
+        # the ball) and the player chases the ball. stops right before the ball hits a wall or reaches a
+        # goal line, and right after it touches the enemy or comes within `reach` px of its center,
+        # so the next decision is taken with step() again. returns the observation after the skipped
+        # steps, their summed reward and info["skipped_steps"]
+        limit = self.MAX_STEP - self.current_step
+        if max_steps is not None:
+            limit = min(limit, max_steps)
+
+        skipped = 0
+        total_reward = 0.0
+        while skipped < limit:
+            horizon = min(FAST_FORWARD_CHUNK, limit - skipped)
+            n_steps, reward = self._free_flight(horizon, reach)
+            skipped += n_steps
+            total_reward += reward
+            if n_steps < horizon:
+                break
+
+        if self._recording:
+            self._recorder.add_fast_forward(skipped)
+
+        truncated = self.current_step >= self.MAX_STEP
+        return self._get_obs(), total_reward, False, truncated, {"skipped_steps": skipped}
+
+    def _free_flight(self, horizon, reach):
+        ball, enemy = self.ball, self.enemy
+        if self._ball_near_enemy(ball.x, ball.y, reach):
+            return 0, 0.0
+
+        # velocity at the start of steps 1..horizon+1: geometric friction decay along the
+        # current direction, clamped to the minimum ball speed
+        speed = math.hypot(ball.vx, ball.vy)
+        if speed > 0:
+            scale = np.maximum(speed * FRICTION ** np.arange(horizon + 1), MIN_BALL_SPEED) / speed
+        else:
+            scale = np.zeros(horizon + 1)
+        vx = ball.vx * scale
+        vy = ball.vy * scale
+
+        # ball position after steps 1..horizon, without wall reflections
+        x = ball.x + np.cumsum(vx[:-1])
+        y = ball.y + np.cumsum(vy[:-1])
+
+        # the first wall hit or goal line crossing is left to step()
+        in_goal = (HEIGHT//2 - GOAL_HEIGHT//2 < y) & (y < HEIGHT//2 + GOAL_HEIGHT//2)
+        blocked = ((x - BALL_RADIUS < 0) | (x + BALL_RADIUS > WIDTH) |
+                   (y - BALL_RADIUS < 0) | (y + BALL_RADIUS > HEIGHT) |
+                   in_goal & ((x - BALL_RADIUS < GOAL_WIDTH) | (x + BALL_RADIUS > WIDTH - GOAL_WIDTH)))
+        n_steps = int(np.argmax(blocked)) if blocked.any() else horizon
+
+        # the step where the ball reaches the enemy is still skipped, the decision comes after it
+        near = self._ball_near_enemy(x[:n_steps], y[:n_steps], reach)
+        if near.any():
+            n_steps = int(np.argmax(near)) + 1
+        if n_steps == 0:
+            return 0, 0.0
+
+        # the player keeps chasing the ball position before each step, with the same random moves as step()
+        for k in range(n_steps):
+            self._chase_ball(ball.x if k == 0 else float(x[k-1]), ball.y if k == 0 else float(y[k-1]),
+                             self._next_noise())
+
+        # shaped reward of the skipped steps (see _calculate_reward, no goal can happen)
+        x, y, vx = x[:n_steps], y[:n_steps], vx[1:n_steps+1]
+        enemy_to_ball = np.hypot(x - enemy.centerx, y - enemy.centery)
+        reward = np.where(vx < 0, 0.2 * np.abs(vx / MAX_BALL_SPEED), -0.15 * (vx / MAX_BALL_SPEED))
+        reward += 0.3 * np.exp(-enemy_to_ball / 200)
+        reward -= 0.1 * np.abs(x - WIDTH/2) / (WIDTH/2)
+
+        ball.x, ball.y = float(x[-1]), float(y[-1])
+        ball.vx, ball.vy = float(vx[-1]), float(vy[n_steps])
+        self.current_step += n_steps
+        return n_steps, float(reward.sum())
+
+    def _ball_near_enemy(self, ball_x, ball_y, reach):
+        # kick range of the enemy (the test of _enemy_kick), or ball center within `reach` px of its center
+        enemy = self.enemy
+        ball_left = np.trunc(ball_x - BALL_RADIUS)
+        ball_top = np.trunc(ball_y - BALL_RADIUS)
+        touching = ((enemy.x < ball_left + 2*BALL_RADIUS) & (ball_left < enemy.x + PLAYER_WIDTH) &
+                    (enemy.y < ball_top + 2*BALL_RADIUS) & (ball_top < enemy.y + PLAYER_HEIGHT))
+        return touching | (np.hypot(ball_x - enemy.centerx, ball_y - enemy.centery) <= reach)
+
+    def _init_kernel(self):
+        import football_kernel
+        self._kernel = football_kernel
+
+        # one match, one step buffers of the kernel
+        self._kernel_state = np.zeros((football_kernel.N_STATE, 1), dtype=np.float64)
+        self._kernel_current_step = np.zeros(1, dtype=np.int64)
+        self._kernel_action = np.zeros((1, 1), dtype=np.int64)
+        self._kernel_noise = np.zeros((1, 1), dtype=np.int64)
+        self._kernel_reward = np.zeros((1, 1), dtype=np.float64)
+        self._kernel_goal = np.zeros(1, dtype=np.int64)
+        self._kernel_n_steps = np.zeros(1, dtype=np.int64)
+
+    def _kernel_step(self, action):
+        player, enemy, ball = self.player, self.enemy, self.ball
+
+        # same random moves of the chasing player as _update_player
+        noise = self._next_noise()
+
+        self._kernel_state[:, 0] = (player.x, player.y, enemy.x, enemy.y, ball.x, ball.y, ball.vx, ball.vy)
+        self._kernel_current_step[0] = self.current_step
+        self._kernel_action[0, 0] = action
+        self._kernel_noise[0, 0] = noise
+        self._kernel.run_steps(self._kernel_state, self._kernel_current_step, self._kernel_action, self._kernel_noise,
+                                  self.MAX_STEP, self._kernel_reward, self._kernel_goal, self._kernel_n_steps)
+
+        px, py, ex, ey, ball.x, ball.y, ball.vx, ball.vy = self._kernel_state[:, 0].tolist()
+        player.x, player.y, enemy.x, enemy.y = int(px), int(py), int(ex), int(ey)
+        self.current_step += 1
+
+        terminated = self._kernel_goal[0] != self._kernel.GOAL_NONE
+        truncated = self.current_step >= self.MAX_STEP
+        return self._get_obs(), float(self._kernel_reward[0, 0]), bool(terminated), truncated, {}
+
+    def _enemy_touches_ball(self):
+        enemy = self.enemy
+        # enemy rect against the (int truncated) bounding rect of the ball, same test as pygame's colliderect
+        ball_left = int(self.ball.x - BALL_RADIUS)
+        ball_top = int(self.ball.y - BALL_RADIUS)
+        return (enemy.x < ball_left + 2*BALL_RADIUS and ball_left < enemy.x + PLAYER_WIDTH and
+                enemy.y < ball_top + 2*BALL_RADIUS and ball_top < enemy.y + PLAYER_HEIGHT)
+
+    def _enemy_kick(self):
+        enemy = self.enemy
+        if self._enemy_touches_ball():
+            dx = self.ball.x - enemy.centerx
+            dy = self.ball.y - enemy.centery
             dist = max(1.0, math.hypot(dx, dy))
 
             self.ball.vx += (dx / dist) * KICK_FORCE
@@ -181,19 +612,24 @@ class FootballEnv(gym.Env):
                 self.ball.vy = (self.ball.vy / speed) * MAX_BALL_SPEED
 
     def _update_player(self):
-        # player simply chase the ball
-        if random.random() < 0.1:
-            dx, dy = random.choice([(1,0), (-1,0), (0,1), (0,-1)])
+        self._chase_ball(self.ball.x, self.ball.y, self._next_noise())
+
+    def _chase_ball(self, ball_x, ball_y, noise):
+        # player simply chase the ball, unless it moves randomly this step
+        if noise != NO_NOISE:
+            dx, dy = NOISE_DIRECTIONS[noise]
         else:
-            dx = np.sign(self.ball.x - self.player.rect.centerx)
-            dy = np.sign(self.ball.y - self.player.rect.centery)
+            # sign of the distance to the ball
+            player_cx, player_cy = self.player.centerx, self.player.centery
+            dx = (ball_x > player_cx) - (ball_x < player_cx)
+            dy = (ball_y > player_cy) - (ball_y < player_cy)
         self.player.move(dx, dy)
 
     def _calculate_reward(self, goal_result=None):
         reward = 0.0
         enemy_to_ball = math.hypot(
-            self.ball.x - self.enemy.rect.centerx,
-            self.ball.y - self.enemy.rect.centery
+            self.ball.x - self.enemy.centerx,
+            self.ball.y - self.enemy.centery
         )
 
         # attacking reward
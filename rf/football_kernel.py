@@ -0,0 +1,187 @@
+import math
+
+from football_env_ppo import (
+    WIDTH, HEIGHT, PLAYER_WIDTH, PLAYER_HEIGHT, BALL_RADIUS, GOAL_WIDTH, GOAL_HEIGHT,
+    MAX_BALL_SPEED, MIN_BALL_SPEED, FRICTION, KICK_FORCE, PLAYER_SPEED, ENEMY_SPEED
+)
+
+# numba is optional, without it the same kernel runs as plain python
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# rows of the (N_STATE, N) state buffer (players are stored by rect left/top)
+PX, PY, EX, EY, BX, BY, BVX, BVY = range(8)
+N_STATE = 8
+
+# goal results
+GOAL_NONE, GOAL_ENEMY, GOAL_PLAYER = 0, 1, 2
+
+GOAL_TOP = HEIGHT // 2 - GOAL_HEIGHT // 2
+GOAL_BOTTOM = HEIGHT // 2 + GOAL_HEIGHT // 2
+
+
+@njit(cache=True)
+def _sign(value):
+    if value > 0:
+        return 1.0
+    if value < 0:
+        return -1.0
+    return 0.0
+
+
+@njit(cache=True)
+def _enemy_action(state, i, action):
+    # enemy actions: 0: up, 1: down, 2: left, 3: right, 4: kick
+    if action < 4:
+        dx, dy = 0, 0
+        if action == 0: dy = -1
+        elif action == 1: dy = 1
+        elif action == 2: dx = -1
+        else: dx = 1
+        x = state[EX, i] + dx * ENEMY_SPEED
+        y = state[EY, i] + dy * ENEMY_SPEED
+        state[EX, i] = min(max(WIDTH // 2, x), WIDTH - PLAYER_WIDTH)
+        state[EY, i] = min(max(0, y), HEIGHT - PLAYER_HEIGHT)
+        return
+
+    # kick: enemy rect against the (int truncated) bounding rect of the ball
+    ex, ey = state[EX, i], state[EY, i]
+    bx, by = state[BX, i], state[BY, i]
+    ball_left = float(int(bx - BALL_RADIUS))
+    ball_top = float(int(by - BALL_RADIUS))
+    if (ex < ball_left + 2 * BALL_RADIUS and ball_left < ex + PLAYER_WIDTH and
+            ey < ball_top + 2 * BALL_RADIUS and ball_top < ey + PLAYER_HEIGHT):
+        dx = bx - (ex + PLAYER_WIDTH // 2)
+        dy = by - (ey + PLAYER_HEIGHT // 2)
+        dist = max(1.0, math.hypot(dx, dy))
+
+        vx = state[BVX, i] + (dx / dist) * KICK_FORCE
+        vy = state[BVY, i] + (dy / dist) * KICK_FORCE
+
+        # speed limitation
+        speed = math.hypot(vx, vy)
+        if speed > MAX_BALL_SPEED:
+            vx = (vx / speed) * MAX_BALL_SPEED
+            vy = (vy / speed) * MAX_BALL_SPEED
+        state[BVX, i] = vx
+        state[BVY, i] = vy
+
+
+@njit(cache=True)
+def _update_player(state, i, noise):
+    # player simply chase the ball, unless this step is a random move
+    if noise == 0: dx, dy = 1.0, 0.0
+    elif noise == 1: dx, dy = -1.0, 0.0
+    elif noise == 2: dx, dy = 0.0, 1.0
+    elif noise == 3: dx, dy = 0.0, -1.0
+    else:
+        dx = _sign(state[BX, i] - (state[PX, i] + PLAYER_WIDTH // 2))
+        dy = _sign(state[BY, i] - (state[PY, i] + PLAYER_HEIGHT // 2))
+
+    x = state[PX, i] + dx * PLAYER_SPEED
+    y = state[PY, i] + dy * PLAYER_SPEED
+    state[PX, i] = min(max(0, x), WIDTH // 2 - PLAYER_WIDTH)
+    state[PY, i] = min(max(0, y), HEIGHT - PLAYER_HEIGHT)
+
+
+@njit(cache=True)
+def _update_ball(state, i):
+    x = state[BX, i] + state[BVX, i]
+    y = state[BY, i] + state[BVY, i]
+    vx, vy = state[BVX, i], state[BVY, i]
+
+    # ball speed decreases when colliding with bounds
+    if x - BALL_RADIUS < 0 or x + BALL_RADIUS > WIDTH:
+        vx *= -0.8
+        x = min(max(x, BALL_RADIUS), WIDTH - BALL_RADIUS)
+    if y - BALL_RADIUS < 0 or y + BALL_RADIUS > HEIGHT:
+        vy *= -0.8
+        y = min(max(y, BALL_RADIUS), HEIGHT - BALL_RADIUS)
+
+    # friction
+    vx *= FRICTION
+    vy *= FRICTION
+
+    # ensure the minimum ball speed
+    speed = math.hypot(vx, vy)
+    if 0 < speed < MIN_BALL_SPEED:
+        vx = (vx / speed) * MIN_BALL_SPEED
+        vy = (vy / speed) * MIN_BALL_SPEED
+
+    state[BX, i] = x
+    state[BY, i] = y
+    state[BVX, i] = vx
+    state[BVY, i] = vy
+
+
+@njit(cache=True)
+def _check_goal(state, i):
+    x, y = state[BX, i], state[BY, i]
+    if x - BALL_RADIUS < GOAL_WIDTH and GOAL_TOP < y < GOAL_BOTTOM:
+        return GOAL_ENEMY
+    if x + BALL_RADIUS > WIDTH - GOAL_WIDTH and GOAL_TOP < y < GOAL_BOTTOM:
+        return GOAL_PLAYER
+    return GOAL_NONE
+
+
+@njit(cache=True)
+def _calculate_reward(state, i, goal):
+    reward = 0.0
+    bx, bvx = state[BX, i], state[BVX, i]
+    enemy_to_ball = math.hypot(
+        bx - (state[EX, i] + PLAYER_WIDTH // 2),
+        state[BY, i] - (state[EY, i] + PLAYER_HEIGHT // 2)
+    )
+
+    # attacking reward / defending punishment
+    if bvx < 0:
+        reward += 0.2 * abs(bvx / MAX_BALL_SPEED)
+    else:
+        reward -= 0.15 * (bvx / MAX_BALL_SPEED)
+
+    # distance to ball reward (exponential decay)
+    reward += 0.3 * math.exp(-enemy_to_ball / 200)
+
+    # when the ball is in the left half (attacking the favorable area)
+    if bx < WIDTH / 2:
+        reward += 0.1 * (bx - WIDTH / 2) / (WIDTH / 2)
+    else:
+        reward -= 0.1 * (bx - WIDTH / 2) / (WIDTH / 2)
+
+    # goal reward
+    if goal == GOAL_PLAYER:
+        reward -= 2.0
+    elif goal == GOAL_ENEMY:
+        reward += 3.0
+    return reward
+
+
+@njit(cache=True)
+def run_steps(state, current_step, actions, noise, max_steps, rewards, goal_result, n_steps):
+    # runs up to K = len(actions) steps of N matches in one call, a match stops at its first
+    # goal or at max_steps. state: (N_STATE, N) float64, current_step: (N,) int64,
+    # actions / noise: (K, N) ints, outputs: rewards (K, N), goal_result (N,), n_steps (N,)
+    n_k, n_matches = actions.shape
+    for i in range(n_matches):
+        goal = GOAL_NONE
+        k = 0
+        while k < n_k:
+            current_step[i] += 1
+            _enemy_action(state, i, actions[k, i])
+            _update_player(state, i, noise[k, i])
+            _update_ball(state, i)
+            goal = _check_goal(state, i)
+            rewards[k, i] = _calculate_reward(state, i, goal)
+            k += 1
+            if goal != GOAL_NONE or current_step[i] >= max_steps:
+                break
+        goal_result[i] = goal
+        n_steps[i] = k
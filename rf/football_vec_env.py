@@ -0,0 +1,390 @@
+from time import perf_counter_ns
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from football_env_ppo import (
+    WIDTH, HEIGHT, PLAYER_WIDTH, PLAYER_HEIGHT, BALL_RADIUS, GOAL_WIDTH,
+    MAX_BALL_SPEED, MIN_BALL_SPEED, FRICTION, KICK_FORCE, PLAYER_SPEED, ENEMY_SPEED,
+    NO_NOISE, FIELD_DIAGONAL, PROFILE_PHASES, obs_layout_columns, profile_report
+)
+from football_kernel import (
+    PX, PY, EX, EY, BX, BY, BVX, BVY, N_STATE, GOAL_NONE, GOAL_ENEMY, GOAL_PLAYER, GOAL_TOP, GOAL_BOTTOM, run_steps
+)
+
+# action -> moving direction of the enemy, kick (4) does not move
+ACTION_DX = np.array([0, 0, -1, 1, 0], dtype=np.float64)
+ACTION_DY = np.array([-1, 1, 0, 0, 0], dtype=np.float64)
+
+# random moving direction of the chasing player
+NOISE_DX = np.array([1, -1, 0, 0], dtype=np.float64)
+NOISE_DY = np.array([0, 0, 1, -1], dtype=np.float64)
+
+# per-row constants for the (2, N) x/y and (4, N) player/enemy blocks
+FIELD_SIZE = np.array([[WIDTH], [HEIGHT]], dtype=np.float64)
+CENTER_OFFSET = np.array([[PLAYER_WIDTH // 2], [PLAYER_HEIGHT // 2]] * 2, dtype=np.float64)
+
+
+def _clip(a, low, high):
+    # in-place clip without the overhead of np.clip
+    np.maximum(a, low, out=a)
+    np.minimum(a, high, out=a)
+
+
+class FootballVecEnv(VecEnv):
+    # N matches of FootballEnv simulated at once, with automatic reset like the other sb3 VecEnvs
+    def __init__(self, num_envs, max_steps=3000, obs_layout="12d", seed=None, backend="numpy", obs_views=False):
+        # "numpy": array ops over all matches, "numba": compiled per-match step kernel
+        assert backend in ("numpy", "numba"), "backend must be 'numpy' or 'numba'"
+        self.backend = backend
+        self.render_mode = None
+        self.MAX_STEP = max_steps
+        # same observation layouts as FootballEnv, only the requested features are computed
+        self.obs_columns = obs_layout_columns(obs_layout)
+        obs_dim = sum(column >= 0 for column in self.obs_columns)
+        # obs_views=True returns the observation buffer itself instead of a copy (overwritten by the
+        # next step). sb3 algorithms keep the previous observation around, so they need the copies
+        self.obs_views = obs_views
+
+        observation_space = spaces.Box(low=-1.0, high=1.0, shape=(obs_dim,), dtype=np.float32)
+        action_space = spaces.Discrete(5)
+        super().__init__(num_envs, observation_space, action_space)
+
+        self.state = np.zeros((N_STATE, num_envs), dtype=np.float64)
+        self.current_step = np.zeros(num_envs, dtype=np.int64)
+        self.np_random = np.random.default_rng(seed)
+
+        # observations are written feature-major, self._obs is the (num_envs, obs_dim) view of it
+        self._obs_rows = np.zeros((obs_dim, num_envs), dtype=np.float32)
+        self._obs = self._obs_rows.T
+        self._centers = np.zeros((4, num_envs), dtype=np.float64)
+        self._tmp2 = np.zeros((2, num_envs), dtype=np.float64)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+
+        # outputs of the step kernel
+        self._kernel_rewards = np.zeros((1, num_envs), dtype=np.float64)
+        self._kernel_goal = np.zeros(num_envs, dtype=np.int64)
+        self._kernel_n_steps = np.zeros(num_envs, dtype=np.int64)
+
+        # phase timers of start_profiling, in PROFILE_PHASES order
+        self._profiling = False
+        self._profile_ns = [0] * len(PROFILE_PHASES)
+        self._profile_calls = [0] * len(PROFILE_PHASES)
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.np_random = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+
+        self.current_step[:] = 0
+        self._reset_matches(np.arange(self.num_envs))
+        self._get_obs()
+        return self._obs if self.obs_views else self._obs.copy()
+
+    def step_async(self, actions):
+        self._actions[:] = actions
+
+    def step_wait(self):
+        if self.backend == "numba":
+            goal_result, rewards = self._kernel_step()
+        else:
+            goal_result, rewards = self._numpy_step()
+
+        # terminated or truncated
+        terminated = goal_result != GOAL_NONE
+        truncated = self.current_step >= self.MAX_STEP
+        dones = terminated | truncated
+
+        self._get_obs()
+        infos = [{} for _ in range(self.num_envs)]
+
+        # automatic reset of the finished matches
+        if dones.any():
+            done_idx = np.flatnonzero(dones)
+            for i in done_idx:
+                infos[i]["terminal_observation"] = self._obs[i].copy()
+                infos[i]["TimeLimit.truncated"] = bool(truncated[i] and not terminated[i])
+            self.current_step[done_idx] = 0
+            self._reset_matches(done_idx)
+            self._get_obs()
+
+        obs = self._obs if self.obs_views else self._obs.copy()
+        return obs, rewards, dones, infos
+
+    def _numpy_step(self):
+        self.current_step += 1
+
+        # enemy actions
+        self._move_enemy(self._actions)
+        kick = self._actions == 4
+        if kick.any():
+            self._enemy_kick(kick)
+
+        # player simply chase the ball
+        self._update_player()
+
+        # update ball
+        self._update_ball()
+
+        # check goal
+        goal_result = self._check_goal()
+
+        # calculate reward
+        rewards = self._calculate_reward(goal_result)
+        return goal_result, rewards
+
+    def start_profiling(self):
+        # as FootballEnv.start_profiling: _numpy_step and _get_obs are swapped for timed versions on this
+        # instance. a phase is timed once per batched step (all matches), get_obs also after auto resets
+        if self.backend != "numpy":
+            raise ValueError("step profiling needs the numpy backend, the numba kernel runs all phases at once")
+        self.reset_profile()
+        self._profiling = True
+        self._numpy_step = self._profiled_numpy_step
+        self._get_obs = self._profiled_get_obs
+
+    def stop_profiling(self):
+        if self._profiling:
+            self._profiling = False
+            del self._numpy_step, self._get_obs
+
+    def reset_profile(self):
+        self._profile_ns[:] = [0] * len(PROFILE_PHASES)
+        self._profile_calls[:] = [0] * len(PROFILE_PHASES)
+
+    def get_profile(self):
+        return profile_report(self._profile_ns, self._profile_calls)
+
+    def _profiled_numpy_step(self):
+        # _numpy_step with a perf_counter_ns timestamp after every phase
+        t0 = perf_counter_ns()
+        self.current_step += 1
+        self._move_enemy(self._actions)
+        kick = self._actions == 4
+        if kick.any():
+            self._enemy_kick(kick)
+        t1 = perf_counter_ns()
+        self._update_player()
+        t2 = perf_counter_ns()
+        self._update_ball()
+        t3 = perf_counter_ns()
+        goal_result = self._check_goal()
+        t4 = perf_counter_ns()
+        rewards = self._calculate_reward(goal_result)
+        t5 = perf_counter_ns()
+
+        ns, calls = self._profile_ns, self._profile_calls
+        for i, elapsed in enumerate((t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+            ns[i] += elapsed
+            calls[i] += 1
+        return goal_result, rewards
+
+    def _profiled_get_obs(self):
+        start = perf_counter_ns()
+        obs = type(self)._get_obs(self)
+        self._profile_ns[-1] += perf_counter_ns() - start
+        self._profile_calls[-1] += 1
+        return obs
+
+    def _kernel_step(self):
+        # same random moves of the chasing player as _update_player
+        u = self.np_random.random(self.num_envs)
+        noise = np.where(u < 0.1, (u * 40).astype(np.intp) & 3, NO_NOISE)
+
+        run_steps(self.state, self.current_step, self._actions[None], noise[None], self.MAX_STEP,
+                  self._kernel_rewards, self._kernel_goal, self._kernel_n_steps)
+        return self._kernel_goal, self._kernel_rewards[0].astype(np.float32)
+
+    def _reset_matches(self, idx):
+        s = self.state
+        n = len(idx)
+
+        # players back to their start positions (rect.center = ...)
+        s[PX, idx] = WIDTH // 4 - PLAYER_WIDTH // 2
+        s[PY, idx] = HEIGHT // 2 - PLAYER_HEIGHT // 2
+        s[EX, idx] = 3 * WIDTH // 4 - PLAYER_WIDTH // 2
+        s[EY, idx] = HEIGHT // 2 - PLAYER_HEIGHT // 2
+
+        # the ball appears at random in the middle area
+        rng = self.np_random
+        s[BX, idx] = rng.integers(WIDTH // 4, 3 * WIDTH // 4, n, endpoint=True)
+        s[BY, idx] = rng.integers(HEIGHT // 4, 3 * HEIGHT // 4, n, endpoint=True)
+
+        angle = rng.uniform(0, 2 * np.pi, n)
+        speed = rng.uniform(MIN_BALL_SPEED, MIN_BALL_SPEED + 2, n)
+        s[BVX, idx] = np.cos(angle) * speed
+        s[BVY, idx] = np.sin(angle) * speed
+
+    def _move_enemy(self, actions):
+        s = self.state
+        s[EX] += ACTION_DX[actions] * ENEMY_SPEED
+        s[EY] += ACTION_DY[actions] * ENEMY_SPEED
+
+        # enemy cannot go out of bounds, and cannot cross the center line
+        _clip(s[EX], WIDTH // 2, WIDTH - PLAYER_WIDTH)
+        _clip(s[EY], 0, HEIGHT - PLAYER_HEIGHT)
+
+    def _enemy_kick(self, kick):
+        self._kick(kick, EX, EY)
+
+    def _kick(self, kick, x, y):
+        # kick of the side at state rows x, y where it touches the ball
+        s = self.state
+
+        # rect against the bounding rect of the ball (pygame truncates it to int)
+        ball_left = np.trunc(s[BX] - BALL_RADIUS)
+        ball_top = np.trunc(s[BY] - BALL_RADIUS)
+        kick = kick & (s[x] < ball_left + 2 * BALL_RADIUS) & (ball_left < s[x] + PLAYER_WIDTH) \
+                    & (s[y] < ball_top + 2 * BALL_RADIUS) & (ball_top < s[y] + PLAYER_HEIGHT)
+        if not kick.any():
+            return
+
+        idx = np.flatnonzero(kick)
+        bx, by = s[BX, idx], s[BY, idx]
+        dx = bx - (s[x, idx] + PLAYER_WIDTH // 2)
+        dy = by - (s[y, idx] + PLAYER_HEIGHT // 2)
+        dist = np.maximum(1.0, np.hypot(dx, dy))
+
+        vx = s[BVX, idx] + (dx / dist) * KICK_FORCE
+        vy = s[BVY, idx] + (dy / dist) * KICK_FORCE
+
+        # speed limitation
+        speed = np.hypot(vx, vy)
+        fast = speed > MAX_BALL_SPEED
+        s[BVX, idx] = np.where(fast, (vx / speed) * MAX_BALL_SPEED, vx)
+        s[BVY, idx] = np.where(fast, (vy / speed) * MAX_BALL_SPEED, vy)
+
+    def _update_player(self):
+        s = self.state
+
+        # player simply chase the ball, with 10% of random moves
+        # (u < 0.1 is uniform on [0, 0.1), so u * 40 also picks one of the 4 random directions)
+        u = self.np_random.random(self.num_envs)
+        noise = u < 0.1
+        direction = (u * 40).astype(np.intp) & 3
+        dx = np.where(noise, NOISE_DX[direction], np.sign(s[BX] - (s[PX] + PLAYER_WIDTH // 2)))
+        dy = np.where(noise, NOISE_DY[direction], np.sign(s[BY] - (s[PY] + PLAYER_HEIGHT // 2)))
+
+        s[PX] += dx * PLAYER_SPEED
+        s[PY] += dy * PLAYER_SPEED
+
+        # player cannot go out of bounds, and cannot cross the center line
+        _clip(s[PX], 0, WIDTH // 2 - PLAYER_WIDTH)
+        _clip(s[PY], 0, HEIGHT - PLAYER_HEIGHT)
+
+    def _update_ball(self):
+        # x and y are updated together as (2, N) rows
+        pos = self.state[BX:BY + 1]
+        vel = self.state[BVX:BVY + 1]
+        pos += vel
+
+        # ball speed decreases when colliding with bounds
+        hit = (pos - BALL_RADIUS < 0) | (pos + BALL_RADIUS > FIELD_SIZE)
+        vel *= np.where(hit, -0.8, 1.0)
+        _clip(pos, BALL_RADIUS, FIELD_SIZE - BALL_RADIUS)
+
+        # friction
+        vel *= FRICTION
+
+        # ensure the minimum ball speed
+        speed = np.hypot(vel[0], vel[1])
+        slow = (speed > 0) & (speed < MIN_BALL_SPEED)
+        if slow.any():
+            clamped = np.divide(vel, speed, where=slow, out=self._tmp2)
+            clamped *= MIN_BALL_SPEED
+            np.copyto(vel, clamped, where=slow)
+
+    def _check_goal(self):
+        s = self.state
+        in_goal = (GOAL_TOP < s[BY]) & (s[BY] < GOAL_BOTTOM)
+
+        # left goal (player's goal) is checked first, as in FootballEnv
+        goal_result = np.zeros(self.num_envs, dtype=np.int8)
+        goal_result[in_goal & (s[BX] + BALL_RADIUS > WIDTH - GOAL_WIDTH)] = GOAL_PLAYER
+        goal_result[in_goal & (s[BX] - BALL_RADIUS < GOAL_WIDTH)] = GOAL_ENEMY
+        return goal_result
+
+    def _calculate_reward(self, goal_result):
+        s = self.state
+
+        # attacking reward (0.2 * |vx|) / defending punishment (-0.15 * vx)
+        reward = s[BVX] / MAX_BALL_SPEED
+        reward *= np.where(s[BVX] < 0, -0.2, -0.15)
+
+        # distance to ball reward (exponential decay)
+        enemy_to_ball = np.hypot(s[BX] - (s[EX] + PLAYER_WIDTH // 2), s[BY] - (s[EY] + PLAYER_HEIGHT // 2))
+        enemy_to_ball /= -200
+        np.exp(enemy_to_ball, out=enemy_to_ball)
+        enemy_to_ball *= 0.3
+        reward += enemy_to_ball
+
+        # when the ball is in the left half (attacking the favorable area), -0.1 * |x - center| either way
+        half = np.abs(s[BX] - WIDTH / 2)
+        half *= 0.1
+        half /= WIDTH / 2
+        reward -= half
+
+        # goal reward
+        if goal_result.any():
+            reward[goal_result == GOAL_PLAYER] -= 2.0
+            reward[goal_result == GOAL_ENEMY] += 3.0
+
+        return reward.astype(np.float32)
+
+    def _get_obs(self):
+        self._write_obs(self.state, self._obs_rows)
+        return self._obs
+
+    def _write_obs(self, s, obs):
+        # observation features of the (N_STATE, num_envs) state s into the (obs_dim, num_envs) rows obs
+        (player_x, player_y, enemy_x, enemy_y, ball_x, ball_y, ball_vx, ball_vy,
+         ball_enemy_dx, ball_enemy_dy, ball_player_dx, ball_player_dy,
+         ball_enemy_dist, ball_goal_dist, ball_own_goal_dist) = self.obs_columns
+        centers = np.add(s[PX:EY + 1], CENTER_OFFSET, out=self._centers)
+        dx, dy = self._tmp2
+
+        # player position, enemy position and ball state (column -1: not in the layout)
+        for column, row, size in ((player_x, centers[0], WIDTH), (player_y, centers[1], HEIGHT),
+                                  (enemy_x, centers[2], WIDTH), (enemy_y, centers[3], HEIGHT),
+                                  (ball_x, s[BX], WIDTH), (ball_y, s[BY], HEIGHT),
+                                  (ball_vx, s[BVX], MAX_BALL_SPEED), (ball_vy, s[BVY], MAX_BALL_SPEED)):
+            if column >= 0:
+                np.divide(row, size, out=obs[column])
+
+        # relative position of ball to players and enemy
+        for column_x, column_y, cx, cy in ((ball_enemy_dx, ball_enemy_dy, centers[2], centers[3]),
+                                           (ball_player_dx, ball_player_dy, centers[0], centers[1])):
+            if column_x >= 0:
+                np.divide(np.subtract(s[BX], cx, out=dx), WIDTH, out=obs[column_x])
+            if column_y >= 0:
+                np.divide(np.subtract(s[BY], cy, out=dy), HEIGHT, out=obs[column_y])
+
+        # distances of the ball to the enemy and to the goals
+        if ball_enemy_dist >= 0:
+            np.subtract(s[BX], centers[2], out=dx)
+            np.subtract(s[BY], centers[3], out=dy)
+            np.divide(np.hypot(dx, dy, out=dx), FIELD_DIAGONAL, out=obs[ball_enemy_dist])
+        if ball_goal_dist >= 0:
+            np.subtract(s[BY], HEIGHT / 2, out=dy)
+            np.divide(np.hypot(s[BX], dy, out=dx), FIELD_DIAGONAL, out=obs[ball_goal_dist])
+        if ball_own_goal_dist >= 0:
+            np.subtract(WIDTH, s[BX], out=dx)
+            np.subtract(s[BY], HEIGHT / 2, out=dy)
+            np.divide(np.hypot(dx, dy, out=dx), FIELD_DIAGONAL, out=obs[ball_own_goal_dist])
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
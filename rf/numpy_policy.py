@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+import numpy as np
+from gymnasium import spaces
+
+# torch-free inference of trained PPO policies: export_policy() writes the actor of a stable-baselines3
+# MlpPolicy (mlp_extractor.policy_net + action_net) to a .npz, NumpyPolicy runs its forward pass with
+# NumPy matmuls and has the predict() interface of the sb3 model
+
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+}
+
+
+def export_policy(model_path, npz_path=None):
+    # best_model.zip -> best_model.npz (next to it by default), needs torch and stable-baselines3
+    from stable_baselines3 import PPO
+    from torch import nn
+
+    model = PPO.load(model_path, device="cpu")
+    policy = model.policy
+    activation = policy.activation_fn.__name__.lower()
+    if activation not in ACTIVATIONS:
+        raise ValueError(f"activation {policy.activation_fn.__name__} is not supported")
+
+    layers = [layer for layer in policy.mlp_extractor.policy_net if isinstance(layer, nn.Linear)]
+    layers.append(policy.action_net)
+    arrays = {}
+    for i, layer in enumerate(layers):
+        # stored as (in, out) so the forward pass is obs @ w + b
+        arrays[f"w{i}"] = layer.weight.detach().numpy().T.astype(np.float32)
+        arrays[f"b{i}"] = layer.bias.detach().numpy().astype(np.float32)
+
+    if npz_path is None:
+        npz_path = os.path.splitext(model_path)[0] + ".npz"
+    np.savez(
+        npz_path,
+        n_layers=len(layers),
+        activation=activation,
+        obs_low=model.observation_space.low,
+        obs_high=model.observation_space.high,
+        **arrays,
+    )
+    return npz_path
+
+
+class NumpyPolicy:
+    def __init__(self, npz_path, seed=None):
+        with np.load(npz_path) as data:
+            n_layers = int(data["n_layers"])
+            self.weights = [data[f"w{i}"] for i in range(n_layers)]
+            self.biases = [data[f"b{i}"] for i in range(n_layers)]
+            self.activation = ACTIVATIONS[str(data["activation"])]
+            obs_low, obs_high = data["obs_low"], data["obs_high"]
+        self.observation_space = spaces.Box(low=obs_low, high=obs_high, dtype=np.float32)
+        self.action_space = spaces.Discrete(len(self.biases[-1]))
+        # only used for stochastic actions (deterministic=False)
+        self.rng = np.random.default_rng(seed)
+
+    def action_logits(self, observation):
+        # (obs_dim,) or (N, obs_dim) float observations -> (N, n_actions) logits
+        x = np.asarray(observation, dtype=np.float32).reshape(-1, self.weights[0].shape[0])
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            x = self.activation(x @ w + b)
+        return x @ self.weights[-1] + self.biases[-1]
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        # same return values as the sb3 model: (actions, None), a 0-d action for a single observation
+        logits = self.action_logits(observation)
+        if deterministic:
+            actions = logits.argmax(axis=1)
+        else:
+            # sample from the softmax of the logits (gumbel-max)
+            actions = (logits - np.log(-np.log(self.rng.random(logits.shape)))).argmax(axis=1)
+        if np.ndim(observation) == 1:
+            actions = actions[0]
+        return actions, None
+
+
+def load_policy(model_path, device="auto"):
+    # .npz: NumpyPolicy. .onnx: OnnxPolicy (onnx_policy.py, needs onnxruntime). .npy: distilled TreePolicy
+    # (tree_policy.py). .zip: NumpyPolicy of the exported .npz next to it when that is up to date,
+    # otherwise the sb3 model itself (imports torch, device is only used for it)
+    npz_path = os.path.splitext(model_path)[0] + ".npz"
+    if model_path.endswith(".npz"):
+        return NumpyPolicy(model_path)
+    if model_path.endswith(".onnx"):
+        from onnx_policy import OnnxPolicy
+        return OnnxPolicy(model_path)
+    if model_path.endswith(".npy"):
+        from tree_policy import TreePolicy
+        return TreePolicy(model_path)
+    if os.path.exists(npz_path) and os.path.getmtime(npz_path) >= os.path.getmtime(model_path):
+        return NumpyPolicy(npz_path)
+    from stable_baselines3 import PPO
+    return PPO.load(model_path, device=device)
+
+
+class PolicyLoader:
+    # load_policy() on a daemon thread: policy is None until the model is ready and is then set in one
+    # assignment, so a game loop can start right away and switch over on the first frame it sees it
+    def __init__(self, model_path, device="auto"):
+        self.model_path = model_path
+        self.policy = None
+        self.error = None
+        self._thread = threading.Thread(target=self._load, args=(device,), daemon=True)
+        self._thread.start()
+
+    def _load(self, device):
+        try:
+            self.policy = load_policy(self.model_path, device=device)
+        except Exception as e:
+            # the caller keeps its fallback behaviour
+            self.error = e
+            print(f"could not load {self.model_path}: {e!r}")
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.policy
+
+
+if __name__ == "__main__":
+    # python numpy_policy.py ppo_football_logs/best_model.zip [...]
+    for path in sys.argv[1:]:
+        print(f"{path} -> {export_policy(path)}")
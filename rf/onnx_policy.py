@@ -0,0 +1,101 @@
+import os
+import sys
+import numpy as np
+from gymnasium import spaces
+
+# optional onnxruntime inference of trained PPO policies: export_onnx() writes the actor of a
+# stable-baselines3 MlpPolicy to an .onnx graph with a dynamic batch dimension, OnnxPolicy runs it on
+# the CPU with the predict() interface of the sb3 model (pip install onnx onnxruntime)
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ort = None
+    ONNXRUNTIME_AVAILABLE = False
+
+GRAPH_OPTIMIZATION_LEVELS = ("disable", "basic", "extended", "all")
+
+
+def export_onnx(model_path, onnx_path=None, opset_version=17):
+    # best_model.zip -> best_model.onnx (next to it by default), needs torch, onnx and stable-baselines3.
+    # inputs: obs (batch, obs_dim) float32, outputs: logits (batch, n_actions), actions (batch,) int64
+    import torch
+    from stable_baselines3 import PPO
+
+    class Actor(torch.nn.Module):
+        def __init__(self, policy):
+            super().__init__()
+            self.policy = policy
+
+        def forward(self, obs):
+            features = self.policy.extract_features(obs, self.policy.pi_features_extractor)
+            logits = self.policy.action_net(self.policy.mlp_extractor.forward_actor(features))
+            return logits, logits.argmax(dim=1)
+
+    model = PPO.load(model_path, device="cpu")
+    if onnx_path is None:
+        onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+    dummy_obs = torch.zeros((1, *model.observation_space.shape), dtype=torch.float32)
+    torch.onnx.export(
+        Actor(model.policy).eval(),
+        (dummy_obs,),
+        onnx_path,
+        input_names=["obs"],
+        output_names=["logits", "actions"],
+        dynamic_axes={"obs": {0: "batch"}, "logits": {0: "batch"}, "actions": {0: "batch"}},
+        opset_version=opset_version,
+        dynamo=False,
+    )
+    return onnx_path
+
+
+class OnnxPolicy:
+    def __init__(self, onnx_path, intra_op_threads=1, inter_op_threads=1, optimization_level="all", seed=None):
+        # intra_op_threads: threads of one matmul (0: onnxruntime default, one per core), optimization_level:
+        # one of GRAPH_OPTIMIZATION_LEVELS
+        if not ONNXRUNTIME_AVAILABLE:
+            raise ImportError("OnnxPolicy needs onnxruntime: pip install onnxruntime")
+        assert optimization_level in GRAPH_OPTIMIZATION_LEVELS, f"optimization_level must be one of {GRAPH_OPTIMIZATION_LEVELS}"
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.graph_optimization_level = {
+            "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }[optimization_level]
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+        obs_dim = self.session.get_inputs()[0].shape[1]
+        n_actions = self.session.get_outputs()[0].shape[1]
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(obs_dim,), dtype=np.float32)
+        self.action_space = spaces.Discrete(n_actions)
+        # only used for stochastic actions (deterministic=False)
+        self.rng = np.random.default_rng(seed)
+
+    def _batch(self, observation):
+        return np.asarray(observation, dtype=np.float32).reshape(-1, self.observation_space.shape[0])
+
+    def action_logits(self, observation):
+        # (obs_dim,) or (N, obs_dim) float observations -> (N, n_actions) logits
+        return self.session.run(["logits"], {"obs": self._batch(observation)})[0]
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        # same return values as the sb3 model: (actions, None), a 0-d action for a single observation
+        obs = self._batch(observation)
+        if deterministic:
+            actions = self.session.run(["actions"], {"obs": obs})[0]
+        else:
+            # sample from the softmax of the logits (gumbel-max)
+            logits = self.session.run(["logits"], {"obs": obs})[0]
+            actions = (logits - np.log(-np.log(self.rng.random(logits.shape)))).argmax(axis=1)
+        if np.ndim(observation) == 1:
+            actions = actions[0]
+        return actions, None
+
+
+if __name__ == "__main__":
+    # python onnx_policy.py ppo_football_logs/best_model.zip [...]
+    for path in sys.argv[1:]:
+        print(f"{path} -> {export_onnx(path)}")
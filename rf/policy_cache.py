@@ -0,0 +1,82 @@
+import time
+from collections import OrderedDict
+import numpy as np
+
+# decision cache for a policy with the sb3 predict() interface: observations are quantized to a grid of
+# 1 / resolution, the deterministic action of a grid cell is looked up in a bounded LRU cache and the
+# model only runs on a miss. the model sees the cell center, so the cached policy is a fixed function of
+# the cell (the same matches with and without batching, whatever the order of the lookups)
+
+
+class CachedPolicy:
+    def __init__(self, policy, resolution, max_size=65536, track_accuracy=False):
+        # resolution: grid cells per unit of the normalized observation, a number or one per feature.
+        # track_accuracy: also run the model on the exact observations and count the agreeing actions
+        # (for reports, costs a model call per predict)
+        self.policy = policy
+        self.observation_space = policy.observation_space
+        self.action_space = policy.action_space
+        self.resolution = np.broadcast_to(np.asarray(resolution, dtype=np.float32), self.observation_space.shape)
+        self.max_size = max_size
+        self.track_accuracy = track_accuracy
+        self._cache = OrderedDict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.decisions = self.hits = self.model_calls = self.agreements = 0
+        self.lookup_ns = self.model_ns = 0
+
+    def stats(self):
+        decisions = max(self.decisions, 1)
+        return {
+            "decisions": self.decisions,
+            "hit_rate": self.hits / decisions,
+            "model_calls": self.model_calls,
+            "cache_size": len(self._cache),
+            "lookup_us": self.lookup_ns / decisions / 1e3,  # per decision, without the model
+            "model_us": self.model_ns / max(self.model_calls, 1) / 1e3,  # per model call on misses
+            "accuracy": self.agreements / decisions if self.track_accuracy else None,
+        }
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        if not deterministic:
+            # sampled actions are not a function of the state
+            return self.policy.predict(observation, deterministic=False)
+        start = time.perf_counter_ns()
+        obs = np.asarray(observation, dtype=np.float32).reshape(-1, self.resolution.shape[0])
+        cells = np.rint(obs * self.resolution).astype(np.int32)
+        keys = [cell.tobytes() for cell in cells]
+        actions = np.empty(len(keys), dtype=np.int64)
+        cache = self._cache
+        misses = []
+        for i, key in enumerate(keys):
+            action = cache.get(key)
+            if action is None:
+                misses.append(i)
+            else:
+                cache.move_to_end(key)
+                actions[i] = action
+
+        model_ns = 0
+        if misses:
+            model_start = time.perf_counter_ns()
+            centers = cells[misses] / self.resolution
+            miss_actions, _ = self.policy.predict(centers.astype(np.float32), deterministic=True)
+            model_ns = time.perf_counter_ns() - model_start
+            self.model_calls += 1
+            for i, action in zip(misses, np.atleast_1d(miss_actions)):
+                actions[i] = cache[keys[i]] = int(action)
+            while len(cache) > self.max_size:
+                cache.popitem(last=False)
+
+        self.decisions += len(keys)
+        self.hits += len(keys) - len(misses)
+        self.model_ns += model_ns
+        self.lookup_ns += time.perf_counter_ns() - start - model_ns
+        if self.track_accuracy:
+            exact, _ = self.policy.predict(obs, deterministic=True)
+            self.agreements += int(np.count_nonzero(np.atleast_1d(exact) == actions))
+
+        if np.ndim(observation) == 1:
+            return actions[0], None
+        return actions, None
@@ -0,0 +1,52 @@
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+from football_env_ppo import PROFILE_PHASES, profile_report
+from football_vec_env import FootballVecEnv
+
+# step phase profiling of the training envs during PPO training: start_profiling() on the envs when
+# training starts, after every rollout the phase timers of that rollout are logged and reset:
+# profile/<phase>_us (mean time per call) and profile/<phase>_share (of the profiled step time).
+# they show up in tensorboard with the other scalars when the model has a tensorboard_log
+#
+# train_ppo.py --profile-env
+
+
+class ProfileCallback(BaseCallback):
+    def __init__(self, verbose=0):
+        super().__init__(verbose=verbose)
+        self._env = None
+
+    def _init_callback(self):
+        env = self.training_env.unwrapped
+        # FootballVecEnv (also SelfPlayVecEnv): one batched env. Dummy / SubprocVecEnv: one FootballEnv per
+        # match. shm workers keep their envs to themselves, they are not profiled
+        if isinstance(env, (FootballVecEnv, DummyVecEnv, SubprocVecEnv)):
+            self._env = env
+            self._call("start_profiling")
+        elif self.verbose >= 1:
+            print(f"ProfileCallback: {type(env).__name__} cannot be profiled")
+
+    def _call(self, method_name):
+        # results of the method of every profiled env
+        if isinstance(self._env, FootballVecEnv):
+            return [getattr(self._env, method_name)()]
+        return self._env.env_method(method_name)
+
+    def _on_step(self):
+        return True
+
+    def _on_rollout_end(self):
+        if self._env is None:
+            return
+        profiles = self._call("get_profile")
+        self._call("reset_profile")
+        total_ns = [sum(profile[phase]["total_ns"] for profile in profiles) for phase in PROFILE_PHASES]
+        calls = [sum(profile[phase]["calls"] for profile in profiles) for phase in PROFILE_PHASES]
+        for phase, stats in profile_report(total_ns, calls).items():
+            self.logger.record(f"profile/{phase}_us", stats["mean_ns"] / 1000)
+            self.logger.record(f"profile/{phase}_share", stats["share"])
+
+    def _on_training_end(self):
+        if self._env is not None:
+            self._call("stop_profiling")
@@ -0,0 +1,399 @@
+import json
+import os
+import struct
+import numpy as np
+
+# compact match recordings: one file per recording, a fixed size header (magic, length and a small JSON
+# object with the field geometry, frame rate and metadata) followed by the records. the games and test
+# scripts store one packed record per frame: the recorder appends frames to a list of packed bytes and
+# writes them out in chunks, the reader memory maps the frames as a numpy structured array (zero copy).
+# FootballEnv only stores its actions, resets and seeds (ActionRecorder), read_replay re-simulates the
+# frames from them with the same physics (or refuses to). convert_replay turns such a log into a frame
+# file once. match_stats recomputes the statistics of the test scripts from the frames, vectorized over
+# all matches of a recording
+#
+# python replay.py recording.replay [--frames out.replay]  ->  header, event counts and match statistics
+
+MAGIC = b"FBREPLAY"
+# version 2: "encoding" (frames or actions) and "records" in the header, version 1 files are frames.
+# version 3: an action log is a byte stream with its seeds in it, its metadata holds the physics
+VERSION = 3
+# magic, uint32 length of the JSON header, JSON padded with spaces. frames start at HEADER_SIZE
+HEADER_SIZE = 4096
+
+# player positions are the (integer) top left corners of their rects, sizes in the header. actions are
+# -1 where the side has no discrete action (rule-based or human)
+FRAME_DTYPE = np.dtype([
+    ("ball_x", "<f4"), ("ball_y", "<f4"), ("ball_vx", "<f4"), ("ball_vy", "<f4"),
+    ("left_x", "<i2"), ("left_y", "<i2"), ("right_x", "<i2"), ("right_y", "<i2"),
+    ("left_action", "i1"), ("right_action", "i1"), ("events", "u1"),
+])
+FRAME_STRUCT = struct.Struct("<4f4h2bB")
+assert FRAME_STRUCT.size == FRAME_DTYPE.itemsize
+
+# event bits of a frame: the frame a side scored (ball in the other goal), kicked the ball, a match
+# started (first frame after a reset) or ended without goal (truncated)
+EVENT_LEFT_GOAL = 1
+EVENT_RIGHT_GOAL = 2
+EVENT_LEFT_KICK = 4
+EVENT_RIGHT_KICK = 8
+EVENT_MATCH_START = 16
+EVENT_MATCH_END = 32
+
+EVENT_GOALS = EVENT_LEFT_GOAL | EVENT_RIGHT_GOAL
+
+# bytes of an action log: the action of a step (one byte), a reset, a reset with a new seed followed by
+# the seed (SEED_BYTES, little endian), or a fast_forward call followed by the number of steps it skipped
+# (SKIP_BYTES). the markers are above any action
+ENTRY_DTYPE = np.dtype("u1")
+ENTRY_RESET = 255
+ENTRY_SEEDED_RESET = 254
+ENTRY_FAST_FORWARD = 253
+SEED_BYTES = 8
+SKIP_BYTES = 4
+
+# frames written to the file at once
+CHUNK_FRAMES = 4096
+
+# kicks within this distance of the center line count as attacks, kicks more than this distance away
+# from the right goal line as defense (as in the test scripts)
+ATTACK_ZONE = 100
+
+# columns of match_stats, RESULT_COLUMNS of test/matchup.py and the changes of ball possession
+MATCH_STATS_COLUMNS = ("left_win", "right_win", "frames", "left_hold", "right_hold", "left_attack", "right_attack",
+                       "left_defense", "right_defense", "possession_changes")
+
+
+def _field_geometry():
+    # geometry of the training env, the games use the same field
+    from football_env_ppo import WIDTH, HEIGHT, PLAYER_WIDTH, PLAYER_HEIGHT, BALL_RADIUS, GOAL_WIDTH, GOAL_HEIGHT
+    return {"width": WIDTH, "height": HEIGHT, "player_size": [PLAYER_WIDTH, PLAYER_HEIGHT],
+            "ball_radius": BALL_RADIUS, "goal_size": [GOAL_WIDTH, GOAL_HEIGHT]}
+
+
+def _pack_header(header):
+    data = json.dumps(header).encode()
+    size = len(MAGIC) + 4 + len(data)
+    if size > HEADER_SIZE:
+        raise ValueError(f"replay header is {size} bytes, at most {HEADER_SIZE} fit (too much metadata)")
+    return MAGIC + struct.pack("<I", len(data)) + data + b" " * (HEADER_SIZE - size)
+
+
+class ReplayRecorder:
+    # records: frames packed with pack()
+    encoding = "frames"
+    dtype = FRAME_DTYPE
+
+    def __init__(self, path, frame_rate=60, seed=None, source=None, chunk_frames=CHUNK_FRAMES, **metadata):
+        # metadata: anything JSON serializable, e.g. the models of both sides
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.header = {
+            "format": "football-replay", "version": VERSION, "encoding": self.encoding, "dtype": self.dtype.descr,
+            "frame_rate": frame_rate, **_field_geometry(), "seed": seed, "source": source, "records": 0,
+            "metadata": metadata,
+        }
+        self.n_records = 0
+        self._chunk = []
+        # too much metadata fails here, before anything is recorded: the header close() writes with any
+        # record count still fits
+        _pack_header({**self.header, "records": 2**64})
+        self._file = open(path, "wb")
+        self._file.write(_pack_header(self.header))
+        # hot path of a caller that flushes on its own (e.g. at every reset): append(pack(...)) with the
+        # arguments of record(), no call of a recorder method and no chunk size test per frame
+        self.pack = FRAME_STRUCT.pack
+        self.append = self._chunk.append
+
+    def record(self, ball_x, ball_y, ball_vx, ball_vy, left_x, left_y, right_x, right_y,
+               left_action=-1, right_action=-1, events=0):
+        self.append(self.pack(ball_x, ball_y, ball_vx, ball_vy, left_x, left_y, right_x, right_y,
+                              left_action, right_action, events))
+        if len(self._chunk) >= self.chunk_frames:
+            self.flush()
+
+    def extend(self, packed_frames):
+        # frames packed with pack() elsewhere, e.g. a whole match buffered until it ended
+        self._chunk.extend(packed_frames)
+        if len(self._chunk) >= self.chunk_frames:
+            self.flush()
+
+    def write(self, records):
+        # records of self.dtype at once, e.g. the frames of another recording
+        self.flush()
+        self._file.write(np.ascontiguousarray(records, dtype=self.dtype).tobytes())
+        self.n_records += len(records)
+
+    def flush(self):
+        if self._chunk:
+            self._file.write(b"".join(self._chunk))
+            self.n_records += len(self._chunk)
+            self._chunk.clear()
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            self.flush()
+            # the record count is only known now, the header keeps its size
+            self.header["records"] = self.n_records
+            self._file.seek(0)
+            self._file.write(_pack_header(self.header))
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ActionRecorder(ReplayRecorder):
+    # action log of FootballEnv (start_recording): one byte per step instead of a frame, the env appends
+    # its action to a bytearray chunk (no packing or conversion per step). the frames are re-simulated on
+    # read, so the metadata has to hold the env's backend, max_steps and physics (physics_signature) and
+    # every match has to start with a reset. records: bytes of the log
+    encoding = "actions"
+    dtype = ENTRY_DTYPE
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self._chunk = bytearray()
+        self.append = self._chunk.append
+
+    def record(self, entry):
+        self.append(entry)
+        if len(self._chunk) >= self.chunk_frames:
+            self.flush()
+
+    def add_reset(self, seed=None):
+        # a reset, with the seed it sets (if any)
+        if seed is None:
+            self.append(ENTRY_RESET)
+        elif not 0 <= seed < 2**(8 * SEED_BYTES):
+            raise ValueError(f"action logs hold seeds in [0, 2**{8 * SEED_BYTES}), got {seed}")
+        else:
+            self.append(ENTRY_SEEDED_RESET)
+            self._chunk += seed.to_bytes(SEED_BYTES, "little")
+
+    def add_fast_forward(self, skipped):
+        self.append(ENTRY_FAST_FORWARD)
+        self._chunk += skipped.to_bytes(SKIP_BYTES, "little")
+
+    def flush(self):
+        if self._chunk:
+            self._file.write(self._chunk)
+            self.n_records += len(self._chunk)
+            self._chunk.clear()
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        data = f.read(HEADER_SIZE)
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a replay file")
+    (length,) = struct.unpack_from("<I", data, len(MAGIC))
+    header = json.loads(data[len(MAGIC) + 4:len(MAGIC) + 4 + length])
+    if header["version"] > VERSION:
+        raise ValueError(f"{path}: replay version {header['version']}, this reader knows up to {VERSION}")
+    return header
+
+
+def simulate_frames(header, entries):
+    # FRAME_DTYPE frames of an action log (entries: its bytes): a start frame per reset, a frame per step
+    # (kicks, goals and match ends as recorded by the games) and one after every fast_forward call (its
+    # skipped steps have no frames). same backend as the recording, the numba kernel rounds differently in
+    # the last bit. a log of other physics (or of version 2, without them) would play different matches,
+    # it is refused
+    from football_env_ppo import FootballEnv, physics_signature
+    metadata = header["metadata"]
+    physics = json.loads(json.dumps(physics_signature()))
+    if metadata.get("physics") != physics:
+        raise ValueError(f"action log recorded with physics {metadata.get('physics')}, this env has {physics}: "
+                         f"re-simulating it would play different matches")
+    env = FootballEnv(max_steps=metadata["max_steps"], backend=metadata["backend"])
+    pack = FRAME_STRUCT.pack
+    ball, player, enemy = env.ball, env.player, env.enemy
+    frames = []
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        if entry == ENTRY_RESET:
+            env.reset()
+            right_action, events = -1, EVENT_MATCH_START
+        elif entry == ENTRY_SEEDED_RESET:
+            env.reset(seed=int.from_bytes(entries[i + 1:i + 1 + SEED_BYTES], "little"))
+            i += SEED_BYTES
+            right_action, events = -1, EVENT_MATCH_START
+        elif entry == ENTRY_FAST_FORWARD:
+            # with the skipped steps as max_steps it stops where the recorded call stopped, whatever its reach
+            truncated = env.fast_forward(max_steps=int.from_bytes(entries[i + 1:i + 1 + SKIP_BYTES], "little"))[3]
+            i += SKIP_BYTES
+            right_action, events = 4, EVENT_MATCH_END if truncated else 0
+        else:
+            # the enemy kicks when it touches the ball before the step
+            events = EVENT_RIGHT_KICK if entry == 4 and env._enemy_touches_ball() else 0
+            _, _, terminated, truncated, _ = env.step(entry)
+            if terminated:
+                # ball in the left goal: the enemy (right side) scored
+                events |= EVENT_RIGHT_GOAL if env._check_goal() == "enemy" else EVENT_LEFT_GOAL
+            elif truncated:
+                events |= EVENT_MATCH_END
+            right_action = entry
+        frames.append(pack(ball.x, ball.y, ball.vx, ball.vy, player.x, player.y, enemy.x, enemy.y,
+                           -1, right_action, events))
+        i += 1
+    return np.frombuffer(b"".join(frames), dtype=FRAME_DTYPE)
+
+
+def read_replay(path):
+    # (header, frames), frames is a read-only memory map of FRAME_DTYPE records (re-simulated for an action
+    # log). the number of records comes from the file size, so a recording that is still written (or was
+    # not closed) can be read
+    header = read_header(path)
+    if header.get("encoding", "frames") == "actions":
+        with open(path, "rb") as f:
+            f.seek(HEADER_SIZE)
+            return header, simulate_frames(header, f.read())
+    n_frames = (os.path.getsize(path) - HEADER_SIZE) // FRAME_DTYPE.itemsize
+    if n_frames == 0:
+        return header, np.zeros(0, dtype=FRAME_DTYPE)
+    return header, np.memmap(path, dtype=FRAME_DTYPE, mode="r", offset=HEADER_SIZE, shape=(n_frames,))
+
+
+def convert_replay(path, out):
+    # frame file of a recording, e.g. of an action log re-simulated once: read zero copy from then on and
+    # no longer tied to the physics it was recorded with
+    header, frames = read_replay(path)
+    with ReplayRecorder(out, header["frame_rate"], header["seed"], header["source"], **header["metadata"]) as recorder:
+        recorder.write(frames)
+    return len(frames)
+
+
+class ReplayReader:
+    # frames of a replay file with an index of the match starts and goals (one vectorized pass over the
+    # event column on open), so seeking to a frame, match or goal is O(1). stream() yields the frames
+    # from the current position on, the pages of a frame file are only read when they are reached
+    def __init__(self, path):
+        self.path = path
+        self.header, frames = read_replay(path)
+        # plain ndarray view of the memory map, indexing it is cheaper
+        self.frames = np.asarray(frames)
+        events = self.frames["events"]
+        self.match_starts = np.flatnonzero(events & EVENT_MATCH_START)
+        self.goals = np.flatnonzero(events & EVENT_GOALS)
+        self.position = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def seek(self, frame):
+        # clamped to the recording, len(self) is the end of the stream
+        self.position = min(max(int(frame), 0), len(self.frames))
+        return self.position
+
+    def seek_match(self, match):
+        return self.seek(self.match_starts[match])
+
+    def seek_goal(self, goal, lead=0):
+        # `lead` frames before the goal-th goal (negative: counted from the last one)
+        return self.seek(self.goals[goal] - lead)
+
+    def goal_index(self, frame):
+        # number of goals before frame, for the next / previous goal from a position
+        return int(np.searchsorted(self.goals, frame))
+
+    def stream(self, step=1):
+        # generator of FRAME_DTYPE records from the current position, `step` frames apart (negative:
+        # backwards). the position follows the stream, seek() between two frames continues from there.
+        # the frames are iterated in slices of CHUNK_FRAMES, cheaper than indexing each one
+        frames = self.frames
+        n = len(frames)
+        position = self.position
+        while 0 <= position < n:
+            stop = position + step * CHUNK_FRAMES
+            for frame in frames[position:stop if stop >= 0 else None:step]:
+                position += step
+                self.position = position
+                yield frame
+                if self.position != position:
+                    break
+            position = self.position
+
+
+def match_stats(frames, width=800):
+    # one MATCH_STATS_COLUMNS row per match of the frames (FRAME_DTYPE records). a match starts at a
+    # start frame (a reset, not counted as a frame) or with the frame after a goal (the games play on after
+    # a goal), and ends with a goal or a match end event. a last match without end is left out.
+    # the side of the last kick holds the ball from that frame on, a kick of both sides in the same frame
+    # counts for the left side (as in the test scripts)
+    events = np.asarray(frames["events"])
+    n = len(events)
+    if n == 0:
+        return np.zeros((0, len(MATCH_STATS_COLUMNS)), dtype=np.int64)
+    ball_x = np.asarray(frames["ball_x"])
+    reset = (events & EVENT_MATCH_START) != 0
+    ended = (events & (EVENT_GOALS | EVENT_MATCH_END)) != 0
+    starts = reset.copy()
+    starts[0] = True
+    starts[1:] |= ended[:-1]
+    match = np.cumsum(starts) - 1
+    n_matches = int(match[-1]) + 1
+
+    left_kick = (events & EVENT_LEFT_KICK) != 0
+    right_kick = ((events & EVENT_RIGHT_KICK) != 0) & ~left_kick
+    kicker = np.where(left_kick, 1, np.where(right_kick, 2, 0))
+    # holder: kicker of the last frame with a kick since the match started (0: nobody yet)
+    last = np.where((kicker > 0) | starts, np.arange(n), 0)
+    np.maximum.accumulate(last, out=last)
+    holder = kicker[last]
+    previous_holder = np.zeros(n, dtype=holder.dtype)
+    previous_holder[1:] = holder[:-1]
+    previous_holder[starts] = 0
+
+    center_distance = np.abs(ball_x - width // 2)
+    columns = (
+        (events & EVENT_LEFT_GOAL) != 0,
+        (events & EVENT_RIGHT_GOAL) != 0,
+        ~reset,
+        (holder == 1) & ~reset,
+        (holder == 2) & ~reset,
+        left_kick & (center_distance < ATTACK_ZONE),
+        right_kick & (center_distance < ATTACK_ZONE),
+        left_kick & (ball_x < width - ATTACK_ZONE),
+        right_kick & (ball_x > width - ATTACK_ZONE),
+        (kicker > 0) & (previous_holder > 0) & (kicker != previous_holder),
+    )
+    stats = np.stack([np.bincount(match, column, n_matches) for column in columns], axis=1).astype(np.int64)
+    return stats if ended[-1] else stats[:-1]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="summary of a replay file")
+    parser.add_argument("path")
+    parser.add_argument("--frames", default=None, help="also write the frames to this frame file (convert_replay)")
+    args = parser.parse_args()
+
+    if args.frames:
+        n_frames = convert_replay(args.path, args.frames)
+        print(f"{n_frames} frames written to {args.frames}")
+    # the frame file if there is one, no second re-simulation
+    header, frames = read_replay(args.frames or args.path)
+    for key, value in header.items():
+        if key != "dtype":
+            print(f"{key}: {value}")
+    events = frames["events"]
+    for name, bit in (("match starts", EVENT_MATCH_START), ("left goals", EVENT_LEFT_GOAL),
+                      ("right goals", EVENT_RIGHT_GOAL), ("left kicks", EVENT_LEFT_KICK),
+                      ("right kicks", EVENT_RIGHT_KICK)):
+        print(f"{name}: {np.count_nonzero(events & bit)}")
+    # statistics of the test scripts, totals over the finished matches
+    stats = match_stats(frames, header["width"])
+    print(f"{len(stats)} matches: " + ", ".join(f"{name} {total}" for name, total in zip(MATCH_STATS_COLUMNS, stats.sum(0))))
+    print(f"{len(frames)} frames, {os.path.getsize(args.path) / 1024:.1f} KiB ({header.get('encoding', 'frames')})")
+
+if __name__ == "__main__":
+    main()
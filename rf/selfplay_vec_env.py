@@ -0,0 +1,143 @@
+import os
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+from football_env_ppo import WIDTH, HEIGHT, PLAYER_WIDTH, PLAYER_HEIGHT, PLAYER_SPEED
+from football_vec_env import FootballVecEnv, ACTION_DX, ACTION_DY
+from football_kernel import PX, PY, EX, EY, BX, BY, BVX, BVY, N_STATE
+from numpy_policy import export_policy, load_policy
+
+# self-play: the left player of a FootballVecEnv match is either the scripted chaser or a frozen
+# checkpoint of the learner, drawn per match from a pool when the match starts. a checkpoint sees the
+# mirrored field (it plays the right side it was trained on) and its mirrored action is mapped back
+# (left / right swapped, kick with the player's rect). per step all opponent actions come from one
+# batched predict per checkpoint over the matches it plays, on .npz exports (NumpyPolicy) when available
+#
+# train_ppo.py --self-play  ->  the current model joins the pool every --self-play-freq steps
+
+# matches against the scripted chaser
+CHASER = -1
+
+# mirrored action -> moving direction of the left player
+PLAYER_ACTION_DX = -ACTION_DX
+PLAYER_ACTION_DY = ACTION_DY
+
+
+class SelfPlayVecEnv(FootballVecEnv):
+    # FootballVecEnv with an opponent pool. pool_size: checkpoints kept (the oldest one is replaced),
+    # chaser_prob: share of matches that still start against the scripted chaser. without checkpoints
+    # the matches are those of FootballVecEnv (same random stream). numpy backend only, the numba kernel
+    # has the chaser built in
+    def __init__(self, num_envs, pool_size=8, chaser_prob=0.2, max_steps=3000, obs_layout="12d", seed=None,
+                 obs_views=False):
+        super().__init__(num_envs, max_steps=max_steps, obs_layout=obs_layout, seed=seed, obs_views=obs_views)
+        self.pool_size = pool_size
+        self.chaser_prob = chaser_prob
+        self.pool = []
+        self.pool_names = []
+        self._oldest = 0
+        # pool slot of the opponent of every match
+        self.opponent = np.full(num_envs, CHASER, dtype=np.int64)
+        # (slot, match indices) of the checkpoints with matches and all those matches, set on changes
+        self._groups = []
+        self._checkpoint_matches = np.zeros(0, dtype=np.intp)
+        self._mirrored = np.zeros((N_STATE, num_envs), dtype=np.float64)
+        self._mirrored_obs_rows = np.zeros_like(self._obs_rows)
+        self._player_actions = np.zeros(num_envs, dtype=np.int64)
+
+    def add_opponent(self, model, name=None):
+        # model: a load_policy path (a .zip with an up to date .npz runs without torch) or a policy with
+        # predict(). a .zip without .npz export plays as the torch model, over ten times slower: a pool of
+        # those takes more than half of a training step (56-75%) instead of 12-17% (benchmark_selfplay.py).
+        # a full pool replaces its oldest checkpoint, the matches playing it go on against the new one
+        if isinstance(model, str):
+            name = name or model
+            model = load_policy(model, device="cpu")
+        if model.observation_space.shape != self.observation_space.shape:
+            raise ValueError(f"opponent takes observations of shape {model.observation_space.shape}, "
+                             f"the env has {self.observation_space.shape}")
+        if len(self.pool) < self.pool_size:
+            self.pool.append(model)
+            self.pool_names.append(name)
+        else:
+            self.pool[self._oldest] = model
+            self.pool_names[self._oldest] = name
+            self._oldest = (self._oldest + 1) % self.pool_size
+
+    def step_async(self, actions):
+        self._actions[:] = actions
+        # both sides act on the state at the start of the step
+        if len(self._checkpoint_matches):
+            self._opponent_actions()
+
+    def _reset_matches(self, idx):
+        super()._reset_matches(idx)
+        if not self.pool:
+            return
+        n = len(idx)
+        rng = self.np_random
+        against_pool = rng.random(n) >= self.chaser_prob
+        self.opponent[idx] = np.where(against_pool, rng.integers(len(self.pool), size=n), CHASER)
+        self._groups = [(slot, np.flatnonzero(self.opponent == slot)) for slot in range(len(self.pool))]
+        self._groups = [(slot, matches) for slot, matches in self._groups if len(matches)]
+        self._checkpoint_matches = np.flatnonzero(self.opponent != CHASER)
+
+    def _opponent_actions(self):
+        # observations of the left player: the field mirrored, the left player in the enemy's place
+        s, m = self.state, self._mirrored
+        m[PX] = WIDTH - PLAYER_WIDTH - s[EX]
+        m[PY] = s[EY]
+        m[EX] = WIDTH - PLAYER_WIDTH - s[PX]
+        m[EY] = s[PY]
+        m[BX] = WIDTH - s[BX]
+        m[BY] = s[BY]
+        m[BVX] = -s[BVX]
+        m[BVY] = s[BVY]
+        self._write_obs(m, self._mirrored_obs_rows)
+        obs = self._mirrored_obs_rows.T
+        for slot, matches in self._groups:
+            self._player_actions[matches], _ = self.pool[slot].predict(obs[matches], deterministic=True)
+
+    def _update_player(self):
+        # the chaser moves in every match (its random stream stays the same), the checkpoints' matches
+        # are then set from where their player was
+        matches = self._checkpoint_matches
+        if not len(matches):
+            return super()._update_player()
+        s = self.state
+        x, y = s[PX, matches], s[PY, matches]
+        super()._update_player()
+
+        actions = self._player_actions[matches]
+        s[PX, matches] = np.clip(x + PLAYER_ACTION_DX[actions] * PLAYER_SPEED, 0, WIDTH // 2 - PLAYER_WIDTH)
+        s[PY, matches] = np.clip(y + PLAYER_ACTION_DY[actions] * PLAYER_SPEED, 0, HEIGHT - PLAYER_HEIGHT)
+        kick = np.zeros(self.num_envs, dtype=bool)
+        kick[matches] = actions == 4
+        if kick.any():
+            self._kick(kick, PX, PY)
+
+
+class SelfPlayCallback(BaseCallback):
+    # every save_freq env steps the current model is saved to pool_dir, exported to .npz and added to the
+    # opponent pool of the training env (a SelfPlayVecEnv, also inside VecMonitor)
+    def __init__(self, save_freq, pool_dir, verbose=1):
+        super().__init__(verbose=verbose)
+        self.save_freq = save_freq
+        self.pool_dir = pool_dir
+        self._next_save = save_freq
+
+    def _init_callback(self):
+        os.makedirs(self.pool_dir, exist_ok=True)
+
+    def _on_step(self):
+        if self.num_timesteps >= self._next_save:
+            self._next_save = self.num_timesteps + self.save_freq
+            path = os.path.join(self.pool_dir, f"checkpoint_{self.num_timesteps}.zip")
+            self.model.save(path)
+            export_policy(path)
+            env = self.training_env.unwrapped
+            env.add_opponent(path)
+            self.logger.record("selfplay/pool_size", len(env.pool))
+            if self.verbose >= 1:
+                print(f"Self-play: {os.path.basename(path)} joins the opponent pool ({len(env.pool)} checkpoints)")
+        return True
@@ -0,0 +1,183 @@
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from football_env_ppo import spawn_seeds, obs_layout_columns
+from football_vec_env import FootballVecEnv
+
+
+def _block_fields(num_envs, obs_dim):
+    # layout of the shared block: actions, obs, terminal obs, rewards, dones, truncated
+    return (
+        ("actions", (num_envs,), np.int64),
+        ("obs", (num_envs, obs_dim), np.float32),
+        ("terminal_obs", (num_envs, obs_dim), np.float32),
+        ("rewards", (num_envs,), np.float32),
+        ("dones", (num_envs,), np.bool_),
+        ("truncated", (num_envs,), np.bool_),
+    )
+
+
+def _block_size(num_envs, obs_dim):
+    return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in _block_fields(num_envs, obs_dim))
+
+
+def _shared_arrays(buf, num_envs, obs_dim):
+    arrays = {}
+    offset = 0
+    for name, shape, dtype in _block_fields(num_envs, obs_dim):
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+        offset += arrays[name].nbytes
+    return arrays
+
+
+def _worker(remote, shm_name, num_envs, lo, hi, env_kwargs, seed):
+    # runs matches lo:hi of the batch in one FootballVecEnv and writes the results into the shared block,
+    # the pipe only carries the commands and an acknowledgement
+    # the workers share the resource tracker of the parent, which unlinks the block in close()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    env = FootballVecEnv(hi - lo, seed=seed, obs_views=True, **env_kwargs)
+    arrays = _shared_arrays(shm.buf, num_envs, env.observation_space.shape[0])
+    actions, obs, terminal_obs = arrays["actions"][lo:hi], arrays["obs"][lo:hi], arrays["terminal_obs"][lo:hi]
+    rewards, dones, truncated = arrays["rewards"][lo:hi], arrays["dones"][lo:hi], arrays["truncated"][lo:hi]
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                env.step_async(actions)
+                new_obs, new_rewards, new_dones, infos = env.step_wait()
+                obs[:] = new_obs
+                rewards[:] = new_rewards
+                dones[:] = new_dones
+                for i in np.flatnonzero(new_dones):
+                    terminal_obs[i] = infos[i]["terminal_observation"]
+                    truncated[i] = infos[i]["TimeLimit.truncated"]
+                remote.send(None)
+            elif cmd == "reset":
+                if data is not None:
+                    env.seed(data)
+                obs[:] = env.reset()
+                remote.send(None)
+            elif cmd == "close":
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        del actions, obs, terminal_obs, rewards, dones, truncated, arrays
+        shm.close()
+        remote.close()
+
+
+class ShmVecEnv(VecEnv):
+    # FootballVecEnv batches split over worker processes, observations, rewards and dones are written
+    # into one multiprocessing.shared_memory block instead of being pickled through the pipes
+    def __init__(self, num_envs, n_workers=None, max_steps=3000, obs_layout="12d", seed=None,
+                 backend="numpy", start_method=None):
+        self.render_mode = None
+        self.MAX_STEP = max_steps
+        n_workers = min(num_envs, n_workers or os.cpu_count())
+        obs_dim = sum(column >= 0 for column in obs_layout_columns(obs_layout))
+
+        observation_space = spaces.Box(low=-1.0, high=1.0, shape=(obs_dim,), dtype=np.float32)
+        action_space = spaces.Discrete(5)
+        super().__init__(num_envs, observation_space, action_space)
+
+        self._shm = shared_memory.SharedMemory(create=True, size=_block_size(num_envs, obs_dim))
+        arrays = _shared_arrays(self._shm.buf, num_envs, obs_dim)
+        self._actions = arrays["actions"]
+        self._obs = arrays["obs"]
+        self._terminal_obs = arrays["terminal_obs"]
+        self._rewards = arrays["rewards"]
+        self._dones = arrays["dones"]
+        self._truncated = arrays["truncated"]
+
+        # contiguous slices of the batch, one per worker
+        bounds = np.linspace(0, num_envs, n_workers + 1).astype(int)
+        self._slices = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        seeds = spawn_seeds(seed, n_workers) if seed is not None else [None] * n_workers
+        env_kwargs = {"max_steps": max_steps, "obs_layout": obs_layout, "backend": backend}
+
+        # forkserver like SubprocVecEnv when available, the workers only need the block name
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+        self.remotes, self.processes = [], []
+        for (lo, hi), worker_seed in zip(self._slices, seeds):
+            remote, work_remote = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(work_remote, self._shm.name, num_envs, lo, hi, env_kwargs, worker_seed),
+                daemon=True,
+            )
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+        self.waiting = False
+        self.closed = False
+
+    def reset(self):
+        # seeds set with seed() apply to this reset, split into independent worker seeds
+        worker_seeds = [None] * len(self.remotes)
+        if self._seeds[0] is not None:
+            worker_seeds = spawn_seeds(self._seeds[0], len(self.remotes))
+        self._reset_seeds()
+        self._reset_options()
+
+        for remote, worker_seed in zip(self.remotes, worker_seeds):
+            remote.send(("reset", worker_seed))
+        for remote in self.remotes:
+            remote.recv()
+        return self._obs.copy()
+
+    def step_async(self, actions):
+        self._actions[:] = actions
+        self._truncated[:] = False
+        for remote in self.remotes:
+            remote.send(("step", None))
+        self.waiting = True
+
+    def step_wait(self):
+        for remote in self.remotes:
+            remote.recv()
+        self.waiting = False
+
+        infos = [{} for _ in range(self.num_envs)]
+        for i in np.flatnonzero(self._dones):
+            infos[i]["terminal_observation"] = self._terminal_obs[i].copy()
+            infos[i]["TimeLimit.truncated"] = bool(self._truncated[i])
+        return self._obs.copy(), self._rewards.copy(), self._dones.copy(), infos
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+        # drop the views into the block before releasing it
+        del self._actions, self._obs, self._terminal_obs, self._rewards, self._dones, self._truncated
+        self._shm.close()
+        self._shm.unlink()
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
@@ -0,0 +1,92 @@
+import argparse
+import os
+from functools import partial
+
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecMonitor
+
+from football_env_ppo import FootballEnv
+from football_vec_env import FootballVecEnv
+from shm_vec_env import ShmVecEnv
+
+# batched: FootballVecEnv in this process, dummy / subproc: one FootballEnv per env (sb3 VecEnvs),
+# shm: FootballVecEnv slices in worker processes that share their results through shared memory
+VEC_ENV_BACKENDS = ("batched", "dummy", "subproc", "shm")
+
+
+def parse_train_args(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--n-envs", type=int, default=16, help="number of matches simulated per step")
+    parser.add_argument("--backend", choices=VEC_ENV_BACKENDS, default="batched",
+                        help="how the training matches are simulated")
+    parser.add_argument("--n-workers", type=int, default=None,
+                        help="worker processes of the shm backend (default: one per core)")
+    parser.add_argument("--eval-workers", type=int, default=1,
+                        help="processes running the evaluation episodes in the background")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--bc-dataset", default=None,
+                        help="warm start: behaviour cloning on this dataset of trajectory_dataset.py before PPO "
+                             "(generated with the rule-based AI if the directory has no manifest.json)")
+    parser.add_argument("--bc-transitions", type=int, default=1_000_000,
+                        help="transitions of a generated warm start dataset")
+    parser.add_argument("--bc-epochs", type=int, default=5, help="behaviour cloning epochs over the dataset")
+    parser.add_argument("--self-play", action="store_true",
+                        help="opponents drawn from a pool of past checkpoints (batched backend only)")
+    parser.add_argument("--self-play-freq", type=int, default=50_000, help="env steps between pool checkpoints")
+    parser.add_argument("--pool-size", type=int, default=8, help="checkpoints kept in the opponent pool")
+    parser.add_argument("--chaser-prob", type=float, default=0.2,
+                        help="share of self-play matches against the scripted chaser")
+    parser.add_argument("--opponents", nargs="*", default=[],
+                        help="models the opponent pool starts with (export them to .npz with numpy_policy.py, "
+                             "as torch models they take more than half of the training step)")
+    parser.add_argument("--profile-env", action="store_true",
+                        help="log the time of every env step phase per rollout (profile/ in tensorboard)")
+    args = parser.parse_args()
+    if args.self_play and args.backend != "batched":
+        parser.error("--self-play needs --backend batched")
+    return args
+
+
+def make_train_env(backend, n_envs, obs_layout="12d", n_workers=None, seed=None, args=None):
+    # args: parse_train_args() options, for self-play
+    if args is not None and args.self_play:
+        from selfplay_vec_env import SelfPlayVecEnv
+        env = SelfPlayVecEnv(n_envs, pool_size=args.pool_size, chaser_prob=args.chaser_prob,
+                             obs_layout=obs_layout, seed=seed)
+        for path in args.opponents:
+            env.add_opponent(path)
+    elif backend == "batched":
+        env = FootballVecEnv(n_envs, obs_layout=obs_layout, seed=seed)
+    elif backend == "shm":
+        env = ShmVecEnv(n_envs, n_workers=n_workers, obs_layout=obs_layout, seed=seed)
+    else:
+        env_fns = [partial(FootballEnv, obs_layout=obs_layout) for _ in range(n_envs)]
+        env = DummyVecEnv(env_fns) if backend == "dummy" else SubprocVecEnv(env_fns)
+        if seed is not None:
+            env.seed(seed)
+    return VecMonitor(env)
+
+
+def warm_start(model, args, obs_layout="12d"):
+    # behaviour cloning of the actor on --bc-dataset before PPO.learn (see bc_pretrain.py)
+    if args.bc_dataset is None:
+        return
+    from bc_pretrain import pretrain_policy
+    from trajectory_dataset import generate_dataset
+    if not os.path.exists(os.path.join(args.bc_dataset, "manifest.json")):
+        print(f"generating {args.bc_transitions} transitions of the rule-based AI in {args.bc_dataset}")
+        generate_dataset(args.bc_dataset, "rule", args.bc_transitions, n_workers=args.n_workers,
+                         obs_layout=obs_layout, seed=args.seed)
+    pretrain_policy(model, args.bc_dataset, epochs=args.bc_epochs, seed=args.seed)
+
+
+def train_callbacks(args, log_dir):
+    # callbacks of the options besides the evaluation: self-play (the current model joins the opponent
+    # pool every --self-play-freq steps, checkpoints in log_dir/pool) and env profiling
+    callbacks = []
+    if args.self_play:
+        from selfplay_vec_env import SelfPlayCallback
+        callbacks.append(SelfPlayCallback(args.self_play_freq, os.path.join(log_dir, "pool")))
+    if args.profile_env:
+        from profile_callback import ProfileCallback
+        callbacks.append(ProfileCallback(verbose=1))
+    return callbacks
@@ -1,49 +1,71 @@
 import os
 from stable_baselines3 import PPO
-from stable_baselines3.common.callbacks import EvalCallback
-from stable_baselines3.common.monitor import Monitor
-from football_env_ppo_8d import FootballEnv
-
-# create log and save directory
-log_dir = "ppo_football_logs2/"
-os.makedirs(log_dir, exist_ok=True)
-
-# creating training and evaluation environments
-train_env = Monitor(FootballEnv())
-eval_env = Monitor(FootballEnv())
-
-# create evaluation callback: evaluate every 10000 steps and save the optimal model
-eval_callback = EvalCallback(
-    eval_env,
-    best_model_save_path=log_dir,
-    log_path=log_dir,
-    eval_freq=10000,
-    deterministic=True,
-    render=False
-)
-
-# initialize PPO model
-model = PPO(
-    policy="MlpPolicy",
-    env=train_env,
-    verbose=1,
-    tensorboard_log=os.path.join(log_dir, "tensorboard"),
-    learning_rate=1e-4,
-    n_steps=2048,  # steps per update cycle
-    batch_size=128,
-    n_epochs=10,  # number of updates per training cycle
-    gamma=0.99,
-    gae_lambda=0.95,
-    clip_range=0.2,  # PPO specific clip range
-    ent_coef=0.005  # entropy reward, encouraging exploration
-)
-
-# start training
-model.learn(total_timesteps=500000, callback=eval_callback)
-
-# save best model
-model.save(os.path.join(log_dir, "ppo_football_final"))
-
-print("Training complete. Best model saved at: ", os.path.join(log_dir, "ppo_football_final.zip"))
+from async_eval import AsyncEvalCallback
+from numpy_policy import export_policy
+from train_common import parse_train_args, make_train_env, warm_start, train_callbacks
+
+
+# subproc / shm workers re-import this module, so training only runs as a script
+def main():
+    # create log and save directory
+    log_dir = "ppo_football_logs2/"
+    os.makedirs(log_dir, exist_ok=True)
+
+    # number of matches simulated together and how they are simulated (see train_common.py)
+    args = parse_train_args("train PPO with 8d observation space")
+    N_ENVS = args.n_envs
+
+    # creating training environment
+    train_env = make_train_env(args.backend, N_ENVS, obs_layout="8d", n_workers=args.n_workers, seed=args.seed, args=args)
+
+    # create evaluation callback: evaluate every 10000 steps and save the optimal model
+    # (eval_freq counts vectorized steps, each one is N_ENVS env steps). the episodes run in
+    # worker processes on a snapshot of the model, training does not wait for them
+    eval_callback = AsyncEvalCallback(
+        eval_freq=max(10000 // N_ENVS, 1),
+        best_model_save_path=log_dir,
+        log_path=log_dir,
+        obs_layout="8d",
+        n_workers=args.eval_workers,
+        deterministic=True
+    )
+
+    # initialize PPO model
+    model = PPO(
+        policy="MlpPolicy",
+        env=train_env,
+        verbose=1,
+        tensorboard_log=os.path.join(log_dir, "tensorboard"),
+        learning_rate=1e-4,
+        n_steps=max(2048 // N_ENVS, 1),  # steps per env per update cycle
+        batch_size=128,
+        n_epochs=10,  # number of updates per training cycle
+        gamma=0.99,
+        gae_lambda=0.95,
+        clip_range=0.2,  # PPO specific clip range
+        ent_coef=0.005,  # entropy reward, encouraging exploration
+        seed=args.seed
+    )
+
+    # optional behaviour cloning of the actor before PPO (--bc-dataset)
+    warm_start(model, args, obs_layout="8d")
+
+    # start training
+    model.learn(total_timesteps=500000, callback=[eval_callback, *train_callbacks(args, log_dir)])
+
+    # save best model
+    model.save(os.path.join(log_dir, "ppo_football_final"))
+
+    train_env.close()
+
+    # torch-free copy of the best model for the games and test scripts (see numpy_policy.py)
+    best_model_path = os.path.join(log_dir, "best_model.zip")
+    if os.path.exists(best_model_path):
+        export_policy(best_model_path)
+    print("Training complete. Best model saved at: ", os.path.join(log_dir, "ppo_football_final.zip"))
+
+
+if __name__ == "__main__":
+    main()
 
 # tensorboard --logdir ppo_football_logs2/tensorboard
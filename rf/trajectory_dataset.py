@@ -0,0 +1,309 @@
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from football_env_ppo import FootballEnv, OBS_LAYOUTS, spawn_seeds
+
+# (obs, action, reward, done) datasets of scripted demonstrators playing the enemy side of FootballEnv,
+# for offline RL and behaviour cloning. worker processes play their own matches and stream transitions
+# into fixed size shards (compressed .npz, one preallocated shard buffer per worker), a manifest.json
+# lists the shards. ShardLoader serves shuffled batches and loads the next shards on a background thread
+#
+# python trajectory_dataset.py --agent rule --transitions 10000000 --out datasets/rule
+
+SHARD_SIZE = 65536
+SHARD_COLUMNS = ("obs", "action", "reward", "done")
+
+
+def _toward(enemy, x, y):
+    # discrete move along the axis of the larger distance to (x, y): 0 up, 1 down, 2 left, 3 right
+    dx = x - enemy.centerx
+    dy = y - enemy.centery
+    if abs(dx) >= abs(dy):
+        return 3 if dx > 0 else 2
+    return 1 if dy > 0 else 0
+
+
+# demonstrators: act(env, obs) -> action of the enemy, from the env state (and the observation)
+class RuleDemonstrator:
+    # EnemyAI of game_rule_based.py: straight to the ball (one axis per step, the env moves the enemy
+    # along one axis), kicks when it touches the ball (the games kick on every touch), 2% random moves
+    jitter = 0.02
+
+    def __init__(self, rng, model=None):
+        self.rng = rng
+
+    def act(self, env, obs):
+        if self.jitter and self.rng.random() < self.jitter:
+            return int(self.rng.integers(4))
+        if env._enemy_touches_ball():
+            return 4
+        return _toward(env.enemy, env.ball.x, env.ball.y)
+
+
+class HybridDemonstrator(RuleDemonstrator):
+    # hybrid agents of the games and test scripts: the model decides within USE_PPO_DISTANCE of the
+    # ball, the rule (with 2% random moves) further away
+    USE_PPO_DISTANCE = 150
+
+    def __init__(self, rng, model=None):
+        if model is None:
+            raise ValueError("the hybrid demonstrator needs a model")
+        self.rng = rng
+        self.model = model
+
+    def act(self, env, obs):
+        enemy, ball = env.enemy, env.ball
+        if math.hypot(ball.x - enemy.centerx, ball.y - enemy.centery) < self.USE_PPO_DISTANCE:
+            action, _ = self.model.predict(obs, deterministic=True)
+            return int(action)
+        return RuleDemonstrator.act(self, env, obs)
+
+
+class ChaserDemonstrator(RuleDemonstrator):
+    # scripted chaser of FootballEnv._update_player on the enemy side: towards the ball, a random
+    # direction 10% of the time, never kicks
+    noise = 0.1
+
+    def act(self, env, obs):
+        if self.rng.random() < self.noise:
+            return int(self.rng.integers(4))
+        return _toward(env.enemy, env.ball.x, env.ball.y)
+
+
+DEMONSTRATORS = {
+    "rule": RuleDemonstrator,
+    "hybrid": HybridDemonstrator,
+    "chaser": ChaserDemonstrator,
+}
+
+
+class ShardWriter:
+    # transitions go into a preallocated shard, written out (compressed, under a temporary name that is
+    # renamed when complete) when it is full. memory stays at one shard, whatever the dataset size
+    def __init__(self, directory, prefix, obs_dim, shard_size=SHARD_SIZE):
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.obs = np.empty((shard_size, obs_dim), dtype=np.float32)
+        self.action = np.empty(shard_size, dtype=np.int8)
+        self.reward = np.empty(shard_size, dtype=np.float32)
+        self.done = np.empty(shard_size, dtype=np.bool_)
+        self.n = 0
+        self.shards = []
+
+    def add(self, obs, action, reward, done):
+        i = self.n
+        self.obs[i] = obs
+        self.action[i] = action
+        self.reward[i] = reward
+        self.done[i] = done
+        self.n = i + 1
+        if self.n == self.shard_size:
+            self.flush()
+
+    def flush(self):
+        if self.n == 0:
+            return
+        name = f"{self.prefix}_{len(self.shards):05d}.npz"
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "wb") as f:
+            np.savez_compressed(f, obs=self.obs[:self.n], action=self.action[:self.n], reward=self.reward[:self.n],
+                                done=self.done[:self.n])
+        os.replace(path + ".tmp", path)
+        self.shards.append((name, self.n))
+        self.n = 0
+
+    def close(self):
+        self.flush()
+        return self.shards
+
+
+def _init_worker():
+    # one process per core already, torch (models without .npz export) must not add its own threads
+    os.environ["OMP_NUM_THREADS"] = "1"
+
+
+def _generate_shards(directory, prefix, agent, n_transitions, shard_size, obs_layout, model_path, max_steps, seed):
+    # one worker: its own env and demonstrator, returns [(shard name, transitions)]
+    model = None
+    if model_path is not None:
+        from numpy_policy import load_policy
+        model = load_policy(model_path, device="cpu")
+    env = FootballEnv(max_steps=max_steps, obs_layout=obs_layout)
+    if model is not None and model.observation_space.shape != env.observation_space.shape:
+        raise ValueError(f"{model_path} takes observations of shape {model.observation_space.shape}, "
+                         f"obs_layout {obs_layout!r} has {env.observation_space.shape}")
+    demonstrator = DEMONSTRATORS[agent](np.random.default_rng(seed), model)
+    writer = ShardWriter(directory, prefix, env.observation_space.shape[0], shard_size)
+    obs, _ = env.reset(seed=seed)
+    for _ in range(n_transitions):
+        action = demonstrator.act(env, obs)
+        next_obs, reward, terminated, truncated, _ = env.step(action)
+        done = terminated or truncated
+        writer.add(obs, action, reward, done)
+        obs = env.reset()[0] if done else next_obs
+    return writer.close()
+
+
+def generate_dataset(directory, agent="rule", n_transitions=1_000_000, shard_size=SHARD_SIZE, n_workers=None,
+                     obs_layout="12d", model_path=None, max_steps=3000, seed=None):
+    # n_transitions split over n_workers processes (default: one per core), every worker writes its own
+    # shards. returns the manifest, also saved as <directory>/manifest.json
+    if agent not in DEMONSTRATORS:
+        raise ValueError(f"agent must be one of {list(DEMONSTRATORS)}, got {agent!r}")
+    os.makedirs(directory, exist_ok=True)
+    n_workers = max(1, min(n_workers or os.cpu_count(), n_transitions))
+    counts = [len(part) for part in np.array_split(np.arange(n_transitions), n_workers)]
+    seeds = spawn_seeds(seed, n_workers)
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context("spawn"), initializer=_init_worker) as pool:
+        futures = [pool.submit(_generate_shards, directory, f"{agent}_w{worker:03d}", agent, count, shard_size,
+                               obs_layout, model_path, max_steps, worker_seed)
+                   for worker, (count, worker_seed) in enumerate(zip(counts, seeds))]
+        shards = [shard for future in futures for shard in future.result()]
+
+    obs_dim = len(OBS_LAYOUTS[obs_layout]) if isinstance(obs_layout, str) else len(obs_layout)
+    manifest = {
+        "agent": agent, "obs_layout": obs_layout, "obs_dim": obs_dim, "model": model_path, "seed": seed,
+        "columns": list(SHARD_COLUMNS), "transitions": sum(n for _, n in shards),
+        "shards": [{"file": name, "transitions": n} for name, n in shards],
+    }
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def shard_paths(directory):
+    # the shards listed in the manifest of a dataset directory
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    return [os.path.join(directory, shard["file"]) for shard in manifest["shards"]]
+
+
+def load_shard(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in SHARD_COLUMNS}
+
+
+class ShardLoader:
+    # shuffled batches (dicts of SHARD_COLUMNS arrays) of the transitions of a dataset. the shard order is
+    # shuffled every epoch, shuffle_shards loaded shards are mixed and their transitions permuted. a
+    # background thread decompresses up to `prefetch` shards ahead, at most prefetch + shuffle_shards
+    # shards are in memory
+    def __init__(self, paths, batch_size=256, shuffle=True, shuffle_shards=4, prefetch=2, epochs=1, seed=None,
+                 drop_last=False):
+        # paths: shard files or a dataset directory
+        self.paths = shard_paths(paths) if isinstance(paths, str) else list(paths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.shuffle_shards = shuffle_shards if shuffle else 1
+        self.prefetch = prefetch
+        self.epochs = epochs
+        self.drop_last = drop_last
+        self.rng = np.random.default_rng(seed)
+
+    def _put(self, shards, item, stop):
+        # False once the consumer has stopped
+        while not stop.is_set():
+            try:
+                shards.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _load(self, order, shards, stop):
+        # the shards, then None. an error of load_shard is passed on to the consumer, which raises it
+        for path in order:
+            try:
+                shard = load_shard(path)
+            except Exception as e:
+                self._put(shards, e, stop)
+                return
+            if not self._put(shards, shard, stop):
+                return
+        self._put(shards, None, stop)
+
+    def _epoch(self):
+        order = [self.paths[i] for i in (self.rng.permutation(len(self.paths)) if self.shuffle else range(len(self.paths)))]
+        shards = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        loader = threading.Thread(target=self._load, args=(order, shards, stop), daemon=True)
+        loader.start()
+        try:
+            rest = None
+            finished = False
+            while not finished:
+                group = [] if rest is None else [rest]
+                while len(group) < self.shuffle_shards + (rest is not None):
+                    shard = shards.get()
+                    if shard is None:
+                        finished = True
+                        break
+                    if isinstance(shard, Exception):
+                        raise shard
+                    group.append(shard)
+                if not group:
+                    break
+                data = {name: np.concatenate([shard[name] for shard in group]) for name in SHARD_COLUMNS}
+                n = len(data["action"])
+                index = self.rng.permutation(n) if self.shuffle else np.arange(n)
+                # a last incomplete batch is carried over to the next group
+                n_full = n - n % self.batch_size
+                for start in range(0, n_full, self.batch_size):
+                    batch = index[start:start + self.batch_size]
+                    yield {name: values[batch] for name, values in data.items()}
+                rest = {name: values[index[n_full:]] for name, values in data.items()} if n_full < n else None
+            if rest is not None and not self.drop_last:
+                yield rest
+        finally:
+            stop.set()
+
+    def __iter__(self):
+        for _ in range(self.epochs):
+            yield from self._epoch()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="(obs, action, reward, done) dataset of a scripted demonstrator")
+    parser.add_argument("--agent", choices=list(DEMONSTRATORS), default="rule")
+    parser.add_argument("--transitions", type=int, default=1_000_000)
+    parser.add_argument("--out", default=None, help="dataset directory (default: datasets/<agent>)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="transitions per shard")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--obs-layout", choices=list(OBS_LAYOUTS), default="12d")
+    parser.add_argument("--model", default="ppo_football_logs/best_model.zip", help="model of the hybrid demonstrator")
+    parser.add_argument("--max-steps", type=int, default=3000, help="steps until a match without goal is truncated")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    out = args.out or os.path.join("datasets", args.agent)
+
+    start = time.perf_counter()
+    manifest = generate_dataset(out, args.agent, args.transitions, args.shard_size, args.workers, args.obs_layout,
+                                args.model if args.agent == "hybrid" else None, args.max_steps, args.seed)
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(path) for path in shard_paths(out))
+    print(f"{manifest['transitions']:,} transitions in {len(manifest['shards'])} shards ({size / 2**20:.1f} MiB) "
+          f"written in {elapsed:.1f}s: {manifest['transitions'] / elapsed * 3600 / 1e6:.1f}M transitions per hour")
+
+    # read back once with the loader
+    start = time.perf_counter()
+    loader = ShardLoader(out, batch_size=4096, seed=args.seed)
+    n, actions = 0, np.zeros(5, dtype=np.int64)
+    for batch in loader:
+        n += len(batch["action"])
+        actions += np.bincount(batch["action"], minlength=5)
+    elapsed = time.perf_counter() - start
+    print(f"read back {n:,} transitions in {elapsed:.1f}s ({n / elapsed / 1e6:.1f}M per second), "
+          f"actions {np.round(actions / max(n, 1), 3).tolist()}")
+
+
+if __name__ == "__main__":
+    main()
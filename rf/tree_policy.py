@@ -0,0 +1,173 @@
+import argparse
+import os
+import numpy as np
+from gymnasium import spaces
+
+from football_env_ppo import OBS_LAYOUTS
+
+# a trained policy distilled into a shallow decision tree: states of FootballEnv are sampled by playing
+# the policy (with some random actions for coverage), labeled with its deterministic action, and a CART
+# tree (gini) is fit on them. the tree is one structured array saved with np.save, TreePolicy memory
+# maps it and has the predict() interface of the sb3 model
+#
+# python tree_policy.py ppo_football_logs/best_model.zip  ->  ppo_football_logs/best_model_tree.npy
+
+# record 0 is a header (feature: obs_dim, left: n_actions, right: depth), the root is record 1.
+# leaves have feature -1, action is the majority action of the node's samples
+NODE_DTYPE = np.dtype([
+    ("feature", np.int32), ("threshold", np.float32), ("left", np.int32), ("right", np.int32), ("action", np.int32),
+])
+
+
+def sample_states(policy, n_samples, obs_layout="12d", n_envs=64, epsilon=0.1, seed=None):
+    # observations of the matches the policy plays, and its deterministic action for each of them.
+    # epsilon: share of random actions taken (not labeled) to also reach states next to its own path
+    from football_vec_env import FootballVecEnv  # sb3 VecEnv, not needed to play a tree
+
+    env = FootballVecEnv(n_envs, obs_layout=obs_layout, seed=seed)
+    rng = np.random.default_rng(seed)
+    observations, labels = [], []
+    obs = env.reset()
+    for _ in range(-(-n_samples // n_envs)):
+        actions, _ = policy.predict(obs, deterministic=True)
+        observations.append(obs)
+        labels.append(actions)
+        explore = rng.random(n_envs) < epsilon
+        obs, _, _, _ = env.step(np.where(explore, rng.integers(0, 5, n_envs), actions))
+    env.close()
+    return np.concatenate(observations)[:n_samples], np.concatenate(labels)[:n_samples].astype(np.int64)
+
+
+def _best_split(x, y, n_actions, min_samples_leaf):
+    # (feature, threshold) with the lowest weighted gini impurity, None if no split is allowed
+    n = len(y)
+    best_impurity, best = np.inf, None
+    one_hot = np.eye(n_actions)
+    sizes = np.arange(1, n)
+    allowed = (sizes >= min_samples_leaf) & (n - sizes >= min_samples_leaf)
+    for feature in range(x.shape[1]):
+        order = np.argsort(x[:, feature], kind="stable")
+        values = x[order, feature]
+        left_counts = np.cumsum(one_hot[y[order]], axis=0)[:-1]
+        right_counts = left_counts[-1] + one_hot[y[order[-1]]] - left_counts
+        # n * weighted gini = n_left - sum(left_counts^2) / n_left + (same for the right side)
+        impurity = (sizes - (left_counts ** 2).sum(1) / sizes) + ((n - sizes) - (right_counts ** 2).sum(1) / (n - sizes))
+        candidates = allowed & (values[:-1] < values[1:])
+        if not candidates.any():
+            continue
+        i = np.flatnonzero(candidates)[impurity[candidates].argmin()]
+        if impurity[i] < best_impurity:
+            threshold = np.float32((values[i] + values[i + 1]) / 2)
+            if threshold >= values[i + 1]:
+                threshold = values[i]
+            best_impurity, best = impurity[i], (feature, threshold)
+    return best
+
+
+def fit_tree(observations, actions, n_actions=5, max_depth=12, min_samples_leaf=10):
+    x = np.asarray(observations, dtype=np.float32)
+    y = np.asarray(actions, dtype=np.int64)
+    nodes = [(x.shape[1], 0.0, n_actions, max_depth, -1)]
+    # nodes are numbered in creation order, (node, sample indices, depth) waiting to be split
+    stack = [(1, np.arange(len(y)), 0)]
+    nodes.append(None)
+    while stack:
+        node, index, depth = stack.pop()
+        counts = np.bincount(y[index], minlength=n_actions)
+        action = int(counts.argmax())
+        split = None
+        if depth < max_depth and counts.max() < len(index) and len(index) >= 2 * min_samples_leaf:
+            split = _best_split(x[index], y[index], n_actions, min_samples_leaf)
+        if split is None:
+            nodes[node] = (-1, 0.0, -1, -1, action)
+            continue
+        feature, threshold = split
+        goes_left = x[index, feature] <= threshold
+        left, right = len(nodes), len(nodes) + 1
+        nodes.extend((None, None))
+        nodes[node] = (feature, threshold, left, right, action)
+        stack.append((right, index[~goes_left], depth + 1))
+        stack.append((left, index[goes_left], depth + 1))
+    return np.array(nodes, dtype=NODE_DTYPE)
+
+
+def distill_policy(model_path, tree_path=None, n_samples=200000, max_depth=12, min_samples_leaf=10, seed=None):
+    # best_model.zip -> best_model_tree.npy (next to it by default), returns the path and the obs layout
+    from numpy_policy import load_policy
+
+    policy = load_policy(model_path, device="cpu")
+    obs_dim = policy.observation_space.shape[0]
+    obs_layout = next(name for name, features in OBS_LAYOUTS.items() if len(features) == obs_dim)
+    observations, actions = sample_states(policy, n_samples, obs_layout, seed=seed)
+    tree = fit_tree(observations, actions, policy.action_space.n, max_depth, min_samples_leaf)
+    if tree_path is None:
+        tree_path = os.path.splitext(model_path)[0] + "_tree.npy"
+    np.save(tree_path, tree)
+    return tree_path, obs_layout
+
+
+class TreePolicy:
+    def __init__(self, tree_path):
+        # memory mapped, processes loading the same tree share its pages
+        self.nodes = np.load(tree_path, mmap_mode="r")
+        header = self.nodes[0]
+        self.max_depth = int(header["right"])
+        self.observation_space = spaces.Box(low=-1.0, high=1.0, shape=(int(header["feature"]),), dtype=np.float32)
+        self.action_space = spaces.Discrete(int(header["left"]))
+        # decisions go through the tree compiled to nested python ifs, a few float comparisons per
+        # observation instead of numpy calls
+        self._predict_one = self._compile()
+
+    def _compile(self):
+        feature, threshold, left, right, action = (self.nodes[name].tolist() for name in NODE_DTYPE.names)
+        lines = ["def predict_one(obs):"]
+        stack = [(1, 1)]
+        while stack:
+            node, indent = stack.pop()
+            pad = "    " * indent
+            if node == "else":
+                lines.append(pad + "else:")
+                continue
+            if feature[node] < 0:
+                lines.append(f"{pad}return {action[node]}")
+                continue
+            lines.append(f"{pad}if obs[{feature[node]}] <= {threshold[node]!r}:")
+            stack.extend(((right[node], indent + 1), ("else", indent), (left[node], indent + 1)))
+        namespace = {}
+        exec(compile("\n".join(lines), "<tree_policy>", "exec"), namespace)
+        return namespace["predict_one"]
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        # deterministic only, same return values as the sb3 model
+        obs = np.asarray(observation, dtype=np.float32)
+        if obs.ndim == 1:
+            return np.int64(self._predict_one(obs.tolist())), None
+        return np.fromiter(map(self._predict_one, obs.tolist()), dtype=np.int64, count=len(obs)), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="distill a trained policy into a decision tree")
+    parser.add_argument("model_path", nargs="?", default="ppo_football_logs/best_model.zip")
+    parser.add_argument("--out", default=None, help="tree file (default: <model>_tree.npy)")
+    parser.add_argument("--samples", type=int, default=200000, help="sampled states to fit the tree on")
+    parser.add_argument("--max-depth", type=int, default=12)
+    parser.add_argument("--min-samples-leaf", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from numpy_policy import load_policy
+
+    tree_path, obs_layout = distill_policy(args.model_path, args.out, args.samples, args.max_depth,
+                                           args.min_samples_leaf, args.seed)
+    tree = TreePolicy(tree_path)
+    # agreement on states of other matches than the ones the tree was fit on
+    observations, expected = sample_states(load_policy(args.model_path, device="cpu"), args.samples // 4,
+                                           obs_layout, seed=args.seed + 1)
+    actions, _ = tree.predict(observations)
+    n_leaves = int((tree.nodes["feature"][1:] < 0).sum())
+    print(f"{tree_path}: {len(tree.nodes) - 1} nodes, {n_leaves} leaves, {os.path.getsize(tree_path) / 1024:.1f} KiB")
+    print(f"agreement with {args.model_path} on {len(observations)} held-out states: {np.mean(actions == expected):.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append("../rf")
+from replay import ReplayReader, match_stats
+from matchup import AGENTS
+from tournament import print_results
+
+# statistics of the test scripts recomputed from replay files (tournament.py --record-dir, the games
+# with --record) instead of inside the match loop: wins, hold time, attack, defense and ball possession
+# changes per pairing, one vectorized pass over the frames of each file
+# python analyze_replays.py replays/  (directories and / or .replay files)
+
+AGENT_NAMES = {spec: name for name, spec in AGENTS.items()}
+
+
+def pairing_name(header):
+    # AGENTS names of the sides of a matchup recording, else the recording's source
+    metadata = header["metadata"]
+    if "left" not in metadata:
+        return header["source"] or "unknown", "right"
+    names = []
+    for kind, model_path in (metadata["left"], metadata["right"]):
+        names.append(AGENT_NAMES.get((kind, model_path), f"{kind}:{model_path}" if model_path else kind))
+    return tuple(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="test statistics recomputed from replay files")
+    parser.add_argument("paths", nargs="+", help="replay files or directories of them")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        paths.extend(sorted(glob.glob(os.path.join(path, "*.replay"))) if os.path.isdir(path) else [path])
+
+    start = time.perf_counter()
+    results, n_frames = {}, 0
+    for path in paths:
+        reader = ReplayReader(path)
+        n_frames += len(reader)
+        results.setdefault(pairing_name(reader.header), []).append(match_stats(reader.frames, reader.header["width"]))
+    elapsed = time.perf_counter() - start
+
+    n_matches = 0
+    for (left, right), chunks in results.items():
+        stats = np.concatenate(chunks)
+        n_matches += len(stats)
+        if len(stats):
+            print_results(left, right, stats)
+    print(f"{n_matches} matches ({n_frames} frames, {len(paths)} files) analysed in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
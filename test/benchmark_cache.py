@@ -0,0 +1,66 @@
+import argparse
+import time
+
+from matchup import AGENTS, DEFAULT_PAIRINGS, load_model, play_matches_batched, set_cache_resolution
+from tournament import wilson_interval
+
+# accuracy vs resolution of the decision cache (rf/policy_cache.py): the pairings of the test scripts are
+# played with the same seeds without cache and with each grid resolution. per resolution: cache hit rate
+# (share of model calls saved), agreement of the cached actions with the exact model actions, lookup cost,
+# and the match outcomes compared to the uncached run
+RESOLUTIONS = (400, 200, 100, 50, 25, 10)
+N_FIELDS = 64
+
+
+def run(resolution, n_matches, seed, max_frames):
+    set_cache_resolution(resolution, track_accuracy=True)
+    outcomes, totals = {}, {"decisions": 0, "hits": 0, "agreements": 0, "lookup_ns": 0}
+    for left, right in DEFAULT_PAIRINGS:
+        results = play_matches_batched(AGENTS[left], AGENTS[right], n_matches, N_FIELDS, seed, max_frames)
+        outcomes[(left, right)] = results
+        if resolution is not None:
+            for path in {AGENTS[left][1], AGENTS[right][1]} - {None}:
+                model = load_model(path)
+                for key in totals:
+                    totals[key] += getattr(model, key)
+        # fresh caches for the next pairing
+        set_cache_resolution(resolution, track_accuracy=True)
+    return outcomes, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="decision cache accuracy vs grid resolution")
+    parser.add_argument("--matches", type=int, default=100, help="matches per pairing and resolution")
+    parser.add_argument("--max-frames", type=int, default=3000, help="a match without goal is a draw after this many frames")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    baseline, _ = run(None, args.matches, args.seed, args.max_frames)
+    baseline_time = time.perf_counter() - start
+    print(f"no cache: {baseline_time:.1f}s")
+    for (left, right), results in baseline.items():
+        n = len(results)
+        low, high = wilson_interval(results[:, 0].sum(), n)
+        print(f"  {left} vs {right}: {left} wins {results[:, 0].mean():.1%} (95% CI {low:.1%} - {high:.1%}), "
+              f"{right} wins {results[:, 1].mean():.1%}, {results[:, 2].mean():.0f} frames per match")
+    print()
+
+    print(f"{'resolution':>10} {'hit rate':>9} {'accuracy':>9} {'lookup us':>10} {'max win diff':>13} {'outside CI':>11}")
+    for resolution in RESOLUTIONS:
+        outcomes, totals = run(resolution, args.matches, args.seed, args.max_frames)
+        decisions = max(totals["decisions"], 1)
+        # largest change of a win rate, and how many of them left the 95% interval of the uncached run
+        diffs, outside = [], 0
+        for pairing, results in outcomes.items():
+            for column in (0, 1):
+                wins, reference = results[:, column].sum(), baseline[pairing][:, column]
+                low, high = wilson_interval(reference.sum(), len(reference))
+                diffs.append(abs(wins / len(results) - reference.mean()))
+                outside += not low <= wins / len(results) <= high
+        print(f"{resolution:>10} {totals['hits'] / decisions:>9.1%} {totals['agreements'] / decisions:>9.2%} "
+              f"{totals['lookup_ns'] / decisions / 1e3:>10.1f} {max(diffs):>13.1%} {outside:>7d} / {len(diffs)}")
+
+
+if __name__ == "__main__":
+    main()
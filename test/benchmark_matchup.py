@@ -0,0 +1,33 @@
+import time
+import numpy as np
+from matchup import AGENTS, load_model, play_matches, play_matches_batched
+
+# model decisions per second: raw predict throughput by batch size, and one predict call per decision
+# vs lockstep matches with one batched predict call per side and frame (ppo12d vs ppo8d, both sides
+# decide every frame)
+MAX_FRAMES = 500
+SEED = 0
+
+model = load_model(AGENTS["ppo12d"][1])
+obs = np.random.default_rng(SEED).random((1024, 12), dtype=np.float32)
+print("predict throughput by batch size:")
+for batch_size in (1, 8, 64, 256, 1024):
+    n_calls = max(20, 2000 // batch_size)
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        model.predict(obs[:batch_size], deterministic=True)
+    elapsed = time.perf_counter() - start
+    print(f"  batch {batch_size:5d}: {n_calls * batch_size / elapsed:12,.0f} decisions/sec")
+
+
+def decisions_per_sec(play, n_matches, **kwargs):
+    start = time.perf_counter()
+    results = play(AGENTS["ppo12d"], AGENTS["ppo8d"], n_matches, seed=SEED, max_frames=MAX_FRAMES, **kwargs)
+    return 2 * results[:, 2].sum() / (time.perf_counter() - start)
+
+
+sequential = decisions_per_sec(play_matches, 4)
+print(f"one predict per decision: {sequential:,.0f} decisions/sec")
+for n_fields in (8, 64, 256):
+    batched = decisions_per_sec(play_matches_batched, n_fields, n_fields=n_fields)
+    print(f"{n_fields} fields in lockstep: {batched:,.0f} decisions/sec ({batched / sequential:.1f}x)")
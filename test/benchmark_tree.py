@@ -0,0 +1,60 @@
+import argparse
+import os
+import time
+import numpy as np
+
+from matchup import PPO_12D, load_model, play_matches_batched
+from tournament import wilson_interval
+from football_env_ppo import OBS_LAYOUTS
+from tree_policy import sample_states
+
+# a distilled decision tree (rf/tree_policy.py) against the policy it was distilled from: agreement on
+# held-out states, time per decision, and the win rates of the two head to head (both sides) and
+# against the rule-based agent
+N_FIELDS = 64
+N_LATENCY = 20000
+
+
+def print_pairing(left, right, results):
+    n = len(results)
+    line = []
+    for name, column in ((left, 0), (right, 1)):
+        wins = int(results[:, column].sum())
+        low, high = wilson_interval(wins, n)
+        line.append(f"{name} wins {wins / n:.1%} (95% CI {low:.1%} - {high:.1%})")
+    print(f"{left} vs {right}: " + ", ".join(line) + f", draws {1 - results[:, :2].sum() / n:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="distilled decision tree vs its source policy")
+    parser.add_argument("--model", default=PPO_12D, help="source model")
+    parser.add_argument("--tree", default=None, help="distilled tree (default: <model>_tree.npy)")
+    parser.add_argument("--matches", type=int, default=200, help="matches per pairing")
+    parser.add_argument("--max-frames", type=int, default=3000, help="a match without goal is a draw after this many frames")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    tree_path = args.tree or os.path.splitext(args.model)[0] + "_tree.npy"
+
+    model, tree = load_model(args.model), load_model(tree_path)
+    obs_dim = model.observation_space.shape[0]
+    obs_layout = next(name for name, features in OBS_LAYOUTS.items() if len(features) == obs_dim)
+    observations, expected = sample_states(model, N_LATENCY, obs_layout, seed=args.seed + 1000)
+    actions, _ = tree.predict(observations)
+    print(f"agreement on {len(observations)} held-out states: {np.mean(actions == expected):.2%}")
+
+    for name, policy in (("model", model), ("tree", tree)):
+        start = time.perf_counter()
+        for obs in observations:
+            policy.predict(obs, deterministic=True)
+        print(f"{name}: {(time.perf_counter() - start) / len(observations) * 1e6:.2f} us per single decision")
+    print()
+
+    source, distilled = ("ppo", args.model), ("ppo", tree_path)
+    names = {source: "model", distilled: "tree", ("rule", None): "rule"}
+    for left, right in ((distilled, source), (source, distilled), (distilled, ("rule", None)), (source, ("rule", None))):
+        results = play_matches_batched(left, right, args.matches, N_FIELDS, args.seed, args.max_frames)
+        print_pairing(names[left], names[right], results)
+
+
+if __name__ == "__main__":
+    main()
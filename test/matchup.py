@@ -0,0 +1,468 @@
+import math
+import sys
+import numpy as np
+import pygame
+
+sys.path.append("../rf")
+from numpy_policy import load_policy
+from policy_cache import CachedPolicy
+from replay import ReplayRecorder, EVENT_LEFT_GOAL, EVENT_RIGHT_GOAL, EVENT_LEFT_KICK, EVENT_RIGHT_KICK, EVENT_MATCH_START, EVENT_MATCH_END
+
+# headless version of the agents and the match loop of the test_*.py scripts, used by tournament.py
+# (same physics, agent logic and statistics, without window, drawing and frame cap)
+
+# game constants
+WIDTH, HEIGHT = 800, 600
+PLAYER_WIDTH, PLAYER_HEIGHT = 30, 50
+BALL_RADIUS = 15
+GOAL_WIDTH, GOAL_HEIGHT = 20, 150
+MAX_BALL_SPEED = 15
+MIN_BALL_SPEED = 2
+FRICTION = 0.99
+KICK_FORCE = 5
+PLAYER_SPEED = 5
+ENEMY_SPEED = 5
+USE_PPO_DISTANCE = 150
+
+PPO_12D = "../rf/ppo_football_logs/best_model.zip"
+PPO_8D = "../rf/ppo_football_logs2/best_model.zip"
+
+# agent specs (kind, model path) by name, the agents of the four test scripts
+AGENTS = {
+    "rule": ("rule", None),
+    "ppo12d": ("ppo", PPO_12D),
+    "ppo8d": ("ppo", PPO_8D),
+    "hybrid": ("hybrid", PPO_12D),
+    "original_hybrid": ("original_hybrid", PPO_12D),
+    "new_hybrid": ("new_hybrid", PPO_12D),
+}
+
+# left (player) vs right (enemy) side of test_ruleBased_ppo, test_hybrid_ppo, test_ppo_ppo and test_hybrid_hybrid
+DEFAULT_PAIRINGS = [
+    ("ppo12d", "rule"),
+    ("ppo12d", "hybrid"),
+    ("ppo12d", "ppo8d"),
+    ("original_hybrid", "new_hybrid"),
+]
+
+# columns of the per match results
+RESULT_COLUMNS = ("left_win", "right_win", "frames", "left_hold", "right_hold", "left_attack", "right_attack",
+                  "left_defense", "right_defense")
+
+
+def parse_agent_spec(spec):
+    # a name of AGENTS, or "kind:model path" (e.g. "ppo:../rf/ppo_football_logs/best_model.zip")
+    if spec in AGENTS:
+        return AGENTS[spec]
+    kind, _, model_path = spec.partition(":")
+    if kind not in AGENT_CLASSES or (kind != "rule" and not model_path):
+        raise ValueError(f"unknown agent spec {spec!r}, use one of {list(AGENTS)} or kind:model_path "
+                         f"with kind in {list(AGENT_CLASSES)}")
+    return kind, model_path or None
+
+
+# models are loaded once per process, as NumpyPolicy when an up to date .npz export exists,
+# and wrapped in a CachedPolicy after set_cache_resolution()
+_models = {}
+_cache_settings = None
+
+
+def set_cache_resolution(resolution, max_size=65536, track_accuracy=False):
+    # opt-in decision cache (rf/policy_cache.py) for the models of this process, None: no cache
+    global _cache_settings
+    _cache_settings = None if resolution is None else (resolution, max_size, track_accuracy)
+    _models.clear()
+
+
+def load_model(path):
+    if path not in _models:
+        model = load_policy(path, device="cpu")
+        if _cache_settings is not None:
+            model = CachedPolicy(model, *_cache_settings)
+        _models[path] = model
+    return _models[path]
+
+
+# game objects
+class Player:
+    def __init__(self, x, y, left, speed):
+        self.rect = pygame.Rect(x, y, PLAYER_WIDTH, PLAYER_HEIGHT)
+        self.left = left
+        self.speed = speed
+
+    def move(self, dx, dy):
+        new_rect = self.rect.move(dx * self.speed, dy * self.speed)
+
+        if self.left:
+            if new_rect.left < 0:
+                new_rect.left = 0
+            if new_rect.right > WIDTH // 2:
+                new_rect.right = WIDTH // 2
+        else:
+            if new_rect.left < WIDTH // 2:
+                new_rect.left = WIDTH // 2
+            if new_rect.right > WIDTH:
+                new_rect.right = WIDTH
+
+        if new_rect.top < 0:
+            new_rect.top = 0
+        if new_rect.bottom > HEIGHT:
+            new_rect.bottom = HEIGHT
+
+        self.rect = new_rect
+
+    def kick(self, ball):
+        if self.rect.colliderect(pygame.Rect(ball.x - BALL_RADIUS, ball.y - BALL_RADIUS, BALL_RADIUS * 2, BALL_RADIUS * 2)):
+            dx = ball.x - self.rect.centerx
+            dy = ball.y - self.rect.centery
+            distance = max(1.0, math.sqrt(dx * dx + dy * dy))
+            ball.vx += (dx / distance) * KICK_FORCE
+            ball.vy += (dy / distance) * KICK_FORCE
+
+            speed = math.sqrt(ball.vx ** 2 + ball.vy ** 2)
+            if speed > MAX_BALL_SPEED:
+                ball.vx = (ball.vx / speed) * MAX_BALL_SPEED
+                ball.vy = (ball.vy / speed) * MAX_BALL_SPEED
+
+            return True
+        return False
+
+class Ball:
+    def __init__(self, rng):
+        self.rng = rng
+        self.reset()
+
+    def reset(self):
+        rng = self.rng
+        self.x = int(rng.integers(WIDTH // 4, 3 * WIDTH // 4, endpoint=True))
+        self.y = int(rng.integers(HEIGHT // 4, 3 * HEIGHT // 4, endpoint=True))
+        angle = rng.uniform(0, 2 * math.pi)
+        speed = rng.uniform(MIN_BALL_SPEED, MIN_BALL_SPEED + 2)
+        self.vx = math.cos(angle) * speed
+        self.vy = math.sin(angle) * speed
+
+    def update(self):
+        self.x += self.vx
+        self.y += self.vy
+
+        if self.x - BALL_RADIUS < 0 or self.x + BALL_RADIUS > WIDTH:
+            self.vx = -self.vx * 0.8
+            self.x = max(BALL_RADIUS, min(self.x, WIDTH - BALL_RADIUS))
+
+        if self.y - BALL_RADIUS < 0 or self.y + BALL_RADIUS > HEIGHT:
+            self.vy = -self.vy * 0.8
+            self.y = max(BALL_RADIUS, min(self.y, HEIGHT - BALL_RADIUS))
+
+        self.vx *= FRICTION
+        self.vy *= FRICTION
+
+        speed = math.sqrt(self.vx ** 2 + self.vy ** 2)
+        if 0 < speed < MIN_BALL_SPEED:
+            self.vx = (self.vx / speed) * MIN_BALL_SPEED
+            self.vy = (self.vy / speed) * MIN_BALL_SPEED
+
+    def check_goals(self):
+        if self.x - BALL_RADIUS < GOAL_WIDTH and HEIGHT // 2 - GOAL_HEIGHT // 2 < self.y < HEIGHT // 2 + GOAL_HEIGHT // 2:
+            return "enemy"
+        if self.x + BALL_RADIUS > WIDTH - GOAL_WIDTH and HEIGHT // 2 - GOAL_HEIGHT // 2 < self.y < HEIGHT // 2 + GOAL_HEIGHT // 2:
+            return "player"
+        return None
+
+# agents, update(ball, enemy) moves self.player (enemy is the opponent's Player). update is split in
+# decide(), which moves right away or writes self.state and returns True when it needs a model action,
+# and act(ball, action), so the lockstep matches can evaluate the states of all matches in one batch
+class RuleAgent:
+    model = None
+    # model action of the current frame for replays, -1 when it moved rule-based
+    action = -1
+
+    def __init__(self, player, model, rng):
+        self.player = player
+
+    def update(self, ball, enemy):
+        if self.decide(ball, enemy):
+            action, _ = self.model.predict(self.state, deterministic=True)
+            self.act(ball, action)
+
+    def decide(self, ball, enemy):
+        self.move_to_ball(ball)
+        return False
+
+    def move_to_ball(self, ball):
+        dx = ball.x - self.player.rect.centerx
+        dy = ball.y - self.player.rect.centery
+        dist = max(1.0, math.sqrt(dx * dx + dy * dy))
+        self.player.move(dx / dist, dy / dist)
+
+class PPOAgent(RuleAgent):
+    def __init__(self, player, model, rng):
+        self.player = player
+        self.model = model
+        self.rng = rng
+        self.set_state_buffer(np.zeros(model.observation_space.shape[0], dtype=np.float32))
+
+    def set_state_buffer(self, state):
+        # the preallocated state buffer, a row of the batch in lockstep matches
+        self.state = state
+        # item assignment through a memoryview is much cheaper than through the ndarray
+        self._state_view = memoryview(state)
+
+    def get_state(self, ball, enemy):
+        # written into the state buffer, the 8d models use the first 8 features
+        state = self._state_view
+        state[0] = self.player.rect.centerx / WIDTH
+        state[1] = self.player.rect.centery / HEIGHT
+        state[2] = enemy.rect.centerx / WIDTH
+        state[3] = enemy.rect.centery / HEIGHT
+        state[4] = ball.x / WIDTH
+        state[5] = ball.y / HEIGHT
+        state[6] = ball.vx / MAX_BALL_SPEED
+        state[7] = ball.vy / MAX_BALL_SPEED
+        if len(state) == 12:
+            state[8] = (ball.x - self.player.rect.centerx) / WIDTH
+            state[9] = (ball.y - self.player.rect.centery) / HEIGHT
+            state[10] = (ball.x - enemy.rect.centerx) / WIDTH
+            state[11] = (ball.y - enemy.rect.centery) / HEIGHT
+        return self.state
+
+    def decide(self, ball, enemy):
+        self.get_state(ball, enemy)
+        return True
+
+    def act(self, ball, action):
+        self.ppo_move(ball, action)
+
+    def ppo_move(self, ball, action):
+        self.action = action
+        if action == 4:
+            self.move_to_ball(ball)
+            return
+        dx, dy = 0, 0
+        if action == 0:
+            dy = -1
+        elif action == 1:
+            dy = 1
+        elif action == 2:
+            dx = -1
+        elif action == 3:
+            dx = 1
+        self.player.move(dx, dy)
+
+class HybridAgent(PPOAgent):
+    # rule-based while the ball is far from the opponent, PPO otherwise (test_hybrid_ppo)
+    jitter = 0.0
+
+    def decide(self, ball, enemy):
+        dx = ball.x - enemy.rect.centerx
+        dy = ball.y - enemy.rect.centery
+        if math.sqrt(dx * dx + dy * dy) >= USE_PPO_DISTANCE:
+            self.move_to_ball(ball)
+            self.random_move()
+            return False
+        self.get_state(ball, enemy)
+        return True
+
+    def act(self, ball, action):
+        self.ppo_move(ball, action)
+        self.random_move()
+
+    def random_move(self):
+        # randomly change direction (simulate wall impact behavior)
+        if self.jitter and self.rng.random() < self.jitter:
+            self.player.move(self.rng.uniform(-1, 1), self.rng.uniform(-1, 1))
+
+class OriginalHybridAgent(HybridAgent):
+    # hybrid with 2% random moves (original hybrid of test_hybrid_hybrid)
+    jitter = 0.02
+
+class NewHybridAgent(HybridAgent):
+    # 50% rule-based, 50% PPO, with 2% random moves (new hybrid of test_hybrid_hybrid)
+    jitter = 0.02
+
+    def decide(self, ball, enemy):
+        if self.rng.random() < 0.5:
+            self.move_to_ball(ball)
+            self.random_move()
+            return False
+        self.get_state(ball, enemy)
+        return True
+
+AGENT_CLASSES = {
+    "rule": RuleAgent,
+    "ppo": PPOAgent,
+    "hybrid": HybridAgent,
+    "original_hybrid": OriginalHybridAgent,
+    "new_hybrid": NewHybridAgent,
+}
+
+
+def make_agent(spec, player, rng):
+    kind, model_path = spec
+    model = load_model(model_path) if model_path is not None else None
+    return AGENT_CLASSES[kind](player, model, rng)
+
+
+class Match:
+    # one pairing on one field, played match after match. a match lasts until the first goal, or is a
+    # draw after max_frames (None: no limit, like the test scripts). recorder: ReplayRecorder the frames
+    # of every finished match are written to (rf/replay.py), a match is buffered until it ends
+    def __init__(self, left_spec, right_spec, rng, max_frames=None, recorder=None):
+        self.max_frames = max_frames
+        self.recorder = recorder
+        self.record_frames = []
+        self.player = Player(WIDTH // 4, HEIGHT // 2, True, PLAYER_SPEED)
+        self.enemy = Player(3 * WIDTH // 4, HEIGHT // 2, False, ENEMY_SPEED)
+        self.ball = Ball(rng)
+        self.left_agent = make_agent(left_spec, self.player, rng)
+        self.right_agent = make_agent(right_spec, self.enemy, rng)
+        self.new_match()
+
+    def new_match(self):
+        self.frames = self.left_hold = self.right_hold = 0
+        self.left_attack = self.right_attack = self.left_defense = self.right_defense = 0
+        self.ball_holder = None
+        if self.recorder is not None:
+            self.record_frames.clear()
+            self.record_frame(EVENT_MATCH_START)
+
+    def record_frame(self, events):
+        ball, left_agent, right_agent = self.ball, self.left_agent, self.right_agent
+        self.record_frames.append(self.recorder.pack(ball.x, ball.y, ball.vx, ball.vy, *self.player.rect.topleft,
+                                                     *self.enemy.rect.topleft, left_agent.action,
+                                                     right_agent.action, events))
+        left_agent.action = right_agent.action = -1
+
+    def end_frame(self):
+        # kicks, statistics and goal check after both agents moved, returns the RESULT_COLUMNS row
+        # when the match ended (and sets up the next one)
+        ball, player, enemy = self.ball, self.player, self.enemy
+        self.frames += 1
+
+        # kicking detection
+        player_kicked = player.kick(ball)
+        enemy_kicked = enemy.kick(ball)
+
+        # identify who holds the ball, attack / defense counted like in the test scripts
+        if player_kicked:
+            self.ball_holder = "left"
+            if abs(ball.x - WIDTH // 2) < 100:
+                self.left_attack += 1
+            if ball.x < WIDTH - 100:
+                self.left_defense += 1
+        elif enemy_kicked:
+            self.ball_holder = "right"
+            if abs(ball.x - WIDTH // 2) < 100:
+                self.right_attack += 1
+            if ball.x > WIDTH - 100:
+                self.right_defense += 1
+
+        # calculate ball hold time
+        if self.ball_holder == "left":
+            self.left_hold += 1
+        elif self.ball_holder == "right":
+            self.right_hold += 1
+
+        goal = ball.check_goals()
+        ended = goal or (self.max_frames is not None and self.frames >= self.max_frames)
+        if self.recorder is not None:
+            events = (EVENT_LEFT_KICK if player_kicked else 0) | (EVENT_RIGHT_KICK if enemy_kicked else 0)
+            if goal:
+                events |= EVENT_LEFT_GOAL if goal == "player" else EVENT_RIGHT_GOAL
+            elif ended:
+                events |= EVENT_MATCH_END
+            self.record_frame(events)
+            if ended:
+                self.recorder.extend(self.record_frames)
+        if not ended:
+            return None
+        result = (goal == "player", goal == "enemy", self.frames, self.left_hold, self.right_hold, self.left_attack,
+                  self.right_attack, self.left_defense, self.right_defense)
+        ball.reset()
+        player.rect.center = (WIDTH // 4, HEIGHT // 2)
+        enemy.rect.center = (3 * WIDTH // 4, HEIGHT // 2)
+        self.new_match()
+        return result
+
+
+def open_recorder(record_path, left_spec, right_spec, seed):
+    # replay file of the matches of one play_matches* call, the agent specs go into the header
+    if record_path is None:
+        return None
+    if isinstance(seed, np.random.SeedSequence):
+        seed = seed.entropy if not seed.spawn_key else [seed.entropy, *seed.spawn_key]
+    return ReplayRecorder(record_path, seed=seed, source="matchup", left=list(left_spec), right=list(right_spec))
+
+
+def play_matches(left_spec, right_spec, n_matches, seed=None, max_frames=None, record_path=None):
+    # plays n_matches one after the other, one model call per agent decision,
+    # returns one row of RESULT_COLUMNS per match. record_path: replay file of all matches
+    recorder = open_recorder(record_path, left_spec, right_spec, seed)
+    match = Match(left_spec, right_spec, np.random.default_rng(seed), max_frames, recorder)
+    results = []
+    while len(results) < n_matches:
+        match.ball.update()
+        match.left_agent.update(match.ball, match.enemy)
+        match.right_agent.update(match.ball, match.player)
+        result = match.end_frame()
+        if result is not None:
+            results.append(result)
+    if recorder is not None:
+        recorder.close()
+    return np.array(results, dtype=np.int64).reshape(n_matches, len(RESULT_COLUMNS))
+
+
+def _side_batch(agents):
+    # the states of one side's agents become rows of one (n_fields, obs_dim) batch
+    model = agents[0].model
+    if model is None:
+        return None
+    batch = np.zeros((len(agents), model.observation_space.shape[0]), dtype=np.float32)
+    for agent, row in zip(agents, batch):
+        agent.set_state_buffer(row)
+    return batch
+
+
+def play_matches_batched(left_spec, right_spec, n_matches, n_fields=64, seed=None, max_frames=None, record_path=None):
+    # plays n_matches on n_fields fields in lockstep: each frame the model decisions of one side are
+    # evaluated for all fields with a single predict call. every field has its own random generator
+    # (spawned from seed) and gives the same matches as play_matches with that generator.
+    # returns one row of RESULT_COLUMNS per match, field after field. record_path: replay file of all
+    # matches, in the order they end
+    n_fields = max(1, min(n_fields, n_matches))
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    recorder = open_recorder(record_path, left_spec, right_spec, seed)
+    seeds = seed.spawn(n_fields)
+    fields = [Match(left_spec, right_spec, np.random.default_rng(field_seed), max_frames, recorder)
+              for field_seed in seeds]
+    quotas = [len(part) for part in np.array_split(np.arange(n_matches), n_fields)]
+    results = [[] for _ in fields]
+
+    sides = []
+    for side in ("left_agent", "right_agent"):
+        agents = [getattr(field, side) for field in fields]
+        sides.append((agents, _side_batch(agents)))
+
+    active = list(range(n_fields))
+    while active:
+        for i in active:
+            fields[i].ball.update()
+
+        # left side decides and moves first, then the right side sees its new position
+        for (agents, batch), opponent in zip(sides, ("enemy", "player")):
+            pending = [i for i in active if agents[i].decide(fields[i].ball, getattr(fields[i], opponent))]
+            if pending:
+                actions, _ = agents[pending[0]].model.predict(batch[pending], deterministic=True)
+                for i, action in zip(pending, actions):
+                    agents[i].act(fields[i].ball, action)
+
+        for i in active:
+            result = fields[i].end_frame()
+            if result is not None:
+                results[i].append(result)
+        active = [i for i in active if len(results[i]) < quotas[i]]
+
+    if recorder is not None:
+        recorder.close()
+    rows = [row for field_results in results for row in field_results]
+    return np.array(rows, dtype=np.int64).reshape(n_matches, len(RESULT_COLUMNS))
@@ -1,16 +1,20 @@
 import pygame
 import sys
-import random
+import argparse
 import math
 import numpy as np
-from stable_baselines3 import PPO
 
-# load PPO models
-model1 = PPO.load("../rf/ppo_football_logs/best_model.zip")
-model2 = PPO.load("../rf/ppo_football_logs/best_model.zip")
+# numpy_policy.py of the training code: the exported .npz of a model runs without torch
+sys.path.append("../rf")
+from numpy_policy import load_policy
+
+# field, text cache and dirty rect updates shared with the games
+sys.path.append("../game")
+from renderer import Renderer
 
-# initialize pygame
-pygame.init()
+# load PPO models
+model1 = load_policy("../rf/ppo_football_logs/best_model.zip")
+model2 = load_policy("../rf/ppo_football_logs/best_model.zip")
 
 # game constants
 WIDTH, HEIGHT = 800, 600
@@ -33,12 +37,28 @@ RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 BLACK = (0, 0, 0)
 
+# random generator, set SEED to an int to reproduce a run
+SEED = None
+
+# command line options: --headless plays without window, drawing and frame cap, as fast as the CPU allows
+parser = argparse.ArgumentParser()
+parser.add_argument("--headless", action="store_true", help="no window, no drawing and no frame cap")
+parser.add_argument("--matches", type=int, default=TARGET_MATCH_COUNT, help="number of matches to play")
+parser.add_argument("--seed", type=int, default=SEED, help="seed of the random generator")
+args = parser.parse_args()
+HEADLESS = args.headless
+TARGET_MATCH_COUNT = args.matches
+
+rng = np.random.default_rng(args.seed)
+
 USE_PPO_DISTANCE = 150
 
-# create screen
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Football Game Auto Play")
-clock = pygame.time.Clock()
+# initialize pygame and create screen (not needed headless)
+if not HEADLESS:
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Football Game Auto Play")
+    clock = pygame.time.Clock()
 
 # game objects
 class Player:
@@ -69,7 +89,7 @@ class Player:
         self.rect = new_rect
 
     def draw(self):
-        pygame.draw.rect(screen, self.color, self.rect)
+        renderer.draw_rect(self.color, self.rect)
 
     def kick(self, ball):
         if self.rect.colliderect(pygame.Rect(ball.x - BALL_RADIUS, ball.y - BALL_RADIUS, BALL_RADIUS * 2, BALL_RADIUS * 2)):
@@ -92,10 +112,10 @@ class Ball:
         self.reset()
 
     def reset(self):
-        self.x = random.randint(WIDTH // 4, 3 * WIDTH // 4)
-        self.y = random.randint(HEIGHT // 4, 3 * HEIGHT // 4)
-        angle = random.uniform(0, 2 * math.pi)
-        speed = random.uniform(MIN_BALL_SPEED, MIN_BALL_SPEED + 2)
+        self.x = int(rng.integers(WIDTH // 4, 3 * WIDTH // 4, endpoint=True))
+        self.y = int(rng.integers(HEIGHT // 4, 3 * HEIGHT // 4, endpoint=True))
+        angle = rng.uniform(0, 2 * math.pi)
+        speed = rng.uniform(MIN_BALL_SPEED, MIN_BALL_SPEED + 2)
         self.vx = math.cos(angle) * speed
         self.vy = math.sin(angle) * speed
 
@@ -120,7 +140,7 @@ class Ball:
             self.vy = (self.vy / speed) * MIN_BALL_SPEED
 
     def draw(self):
-        pygame.draw.circle(screen, WHITE, (int(self.x), int(self.y)), BALL_RADIUS)
+        renderer.draw_circle(WHITE, (int(self.x), int(self.y)), BALL_RADIUS)
 
     def check_goals(self):
         if self.x - BALL_RADIUS < GOAL_WIDTH and HEIGHT // 2 - GOAL_HEIGHT // 2 < self.y < HEIGHT // 2 + GOAL_HEIGHT // 2:
@@ -132,22 +152,24 @@ class Ball:
 class PPOAgent:
     def __init__(self, player):
         self.player = player
+        self.state = np.zeros(12, dtype=np.float32)
 
     def get_state(self, ball, enemy):
-        return np.array([
-            self.player.rect.centerx / WIDTH,
-            self.player.rect.centery / HEIGHT,
-            enemy.rect.centerx / WIDTH,
-            enemy.rect.centery / HEIGHT,
-            ball.x / WIDTH,
-            ball.y / HEIGHT,
-            ball.vx / MAX_BALL_SPEED,
-            ball.vy / MAX_BALL_SPEED,
-            (ball.x - self.player.rect.centerx) / WIDTH,
-            (ball.y - self.player.rect.centery) / HEIGHT,
-            (ball.x - enemy.rect.centerx) / WIDTH,
-            (ball.y - enemy.rect.centery) / HEIGHT,
-            ], dtype=np.float32)
+        # written into the preallocated state buffer, no new array per frame
+        state = self.state
+        state[0] = self.player.rect.centerx / WIDTH
+        state[1] = self.player.rect.centery / HEIGHT
+        state[2] = enemy.rect.centerx / WIDTH
+        state[3] = enemy.rect.centery / HEIGHT
+        state[4] = ball.x / WIDTH
+        state[5] = ball.y / HEIGHT
+        state[6] = ball.vx / MAX_BALL_SPEED
+        state[7] = ball.vy / MAX_BALL_SPEED
+        state[8] = (ball.x - self.player.rect.centerx) / WIDTH
+        state[9] = (ball.y - self.player.rect.centery) / HEIGHT
+        state[10] = (ball.x - enemy.rect.centerx) / WIDTH
+        state[11] = (ball.y - enemy.rect.centery) / HEIGHT
+        return state
 
     def update(self, ball, enemy):
         state = self.get_state(ball, enemy)
@@ -173,22 +195,24 @@ class PPOAgent:
 class HybridEnemy:
     def __init__(self, player):
         self.player = player
+        self.state = np.zeros(12, dtype=np.float32)
 
     def get_state(self, ball, enemy):
-        return np.array([
-            self.player.rect.centerx / WIDTH,
-            self.player.rect.centery / HEIGHT,
-            enemy.rect.centerx / WIDTH,
-            enemy.rect.centery / HEIGHT,
-            ball.x / WIDTH,
-            ball.y / HEIGHT,
-            ball.vx / MAX_BALL_SPEED,
-            ball.vy / MAX_BALL_SPEED,
-            (ball.x - self.player.rect.centerx) / WIDTH,
-            (ball.y - self.player.rect.centery) / HEIGHT,
-            (ball.x - enemy.rect.centerx) / WIDTH,
-            (ball.y - enemy.rect.centery) / HEIGHT,
-            ], dtype=np.float32)
+        # written into the preallocated state buffer, no new array per frame
+        state = self.state
+        state[0] = self.player.rect.centerx / WIDTH
+        state[1] = self.player.rect.centery / HEIGHT
+        state[2] = enemy.rect.centerx / WIDTH
+        state[3] = enemy.rect.centery / HEIGHT
+        state[4] = ball.x / WIDTH
+        state[5] = ball.y / HEIGHT
+        state[6] = ball.vx / MAX_BALL_SPEED
+        state[7] = ball.vy / MAX_BALL_SPEED
+        state[8] = (ball.x - self.player.rect.centerx) / WIDTH
+        state[9] = (ball.y - self.player.rect.centery) / HEIGHT
+        state[10] = (ball.x - enemy.rect.centerx) / WIDTH
+        state[11] = (ball.y - enemy.rect.centery) / HEIGHT
+        return state
 
     def update(self, ball, enemy):
         # calculate distance between ball and enemy
@@ -250,12 +274,14 @@ hybrid_defense_count = 0
 # who holds th ball
 ball_holder = None  # "ppo" / "hybrid"
 
-font = pygame.font.Font(None, 36)
+if not HEADLESS:
+    renderer = Renderer(screen)
 
 # automatic play
 running = True
 while running and matches_played < TARGET_MATCH_COUNT:
-    clock.tick(60)
+    if not HEADLESS:
+        clock.tick(60)
 
     # update game objects
     ball.update()
@@ -300,24 +326,18 @@ while running and matches_played < TARGET_MATCH_COUNT:
         ball_holder = None
 
     # draw game scene
-    screen.fill(GREEN)
-    pygame.draw.line(screen, WHITE, (WIDTH // 2, 0), (WIDTH // 2, HEIGHT), 2)
-    pygame.draw.rect(screen, WHITE, (0, HEIGHT // 2 - GOAL_HEIGHT // 2, GOAL_WIDTH, GOAL_HEIGHT))
-    pygame.draw.rect(screen, WHITE, (WIDTH - GOAL_WIDTH, HEIGHT // 2 - GOAL_HEIGHT // 2, GOAL_WIDTH, GOAL_HEIGHT))
-
-    player.draw()
-    enemy.draw()
-    ball.draw()
+    if not HEADLESS:
+        renderer.begin_frame()
 
-    player_text = font.render(f"PPO: {player_score}", True, WHITE)
-    enemy_text = font.render(f"Hybrid: {enemy_score}", True, WHITE)
-    match_text = font.render(f"Match {matches_played}/{TARGET_MATCH_COUNT}", True, WHITE)
+        player.draw()
+        enemy.draw()
+        ball.draw()
 
-    screen.blit(player_text, (20, 20))
-    screen.blit(enemy_text, (WIDTH - 200, 20))
-    screen.blit(match_text, (WIDTH // 2 - 80, 20))
+        renderer.draw_text(f"PPO: {player_score}", WHITE, (20, 20))
+        renderer.draw_text(f"Hybrid: {enemy_score}", WHITE, (WIDTH - 200, 20))
+        renderer.draw_text(f"Match {matches_played}/{TARGET_MATCH_COUNT}", WHITE, (WIDTH // 2 - 80, 20))
 
-    pygame.display.flip()
+        renderer.end_frame()
 
 # print final result
 print("========== Battle Result ==========")
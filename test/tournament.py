@@ -0,0 +1,140 @@
+import argparse
+import math
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from matchup import AGENTS, DEFAULT_PAIRINGS, RESULT_COLUMNS, parse_agent_spec, play_matches_batched, set_cache_resolution
+
+# headless matches of agent pairings spread over a process pool, wins and the statistics of the test
+# scripts aggregated with 95% confidence intervals
+Z = 1.96
+
+
+def wilson_interval(wins, n):
+    # 95% Wilson score interval of a win rate
+    if n == 0:
+        return 0.0, 1.0
+    p = wins / n
+    center = (p + Z * Z / (2 * n)) / (1 + Z * Z / n)
+    half = Z * math.sqrt(p * (1 - p) / n + Z * Z / (4 * n * n)) / (1 + Z * Z / n)
+    # clamped, rounding can put a bound of 0 or n wins just outside [0, 1]
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def mean_interval(values):
+    # mean and 95% normal interval half width
+    if len(values) < 2:
+        return float(np.mean(values)), 0.0
+    return float(np.mean(values)), Z * float(np.std(values, ddof=1)) / math.sqrt(len(values))
+
+
+def _init_worker(cache_resolution, cache_size):
+    # one process per core already, torch (only imported for models without .npz export) must not
+    # spawn its own threads on top
+    os.environ["OMP_NUM_THREADS"] = "1"
+    set_cache_resolution(cache_resolution, cache_size)
+
+
+def run_tournament(pairings, n_matches, n_workers=None, chunk_size=64, seed=None, max_frames=None,
+                   cache_resolution=None, cache_size=65536, record_dir=None):
+    # pairings: [(left spec, right spec)] of AGENTS names or "kind:model path" specs, the matches of a
+    # chunk are played in lockstep (one batched model call per side and frame). cache_resolution: model
+    # decisions go through a quantized decision cache per worker (rf/policy_cache.py). record_dir: every
+    # task writes the replay of its matches to <record_dir>/pairing<i>_<chunk>.replay
+    # returns {(left, right): (n_matches, len(RESULT_COLUMNS)) int array}
+    tasks, record_paths = [], []
+    if record_dir is not None:
+        os.makedirs(record_dir, exist_ok=True)
+    for i, (left, right) in enumerate(pairings):
+        for start in range(0, n_matches, chunk_size):
+            tasks.append((left, right, min(chunk_size, n_matches - start)))
+            record_paths.append(None if record_dir is None else
+                                os.path.join(record_dir, f"pairing{i}_{start // chunk_size:05d}.replay"))
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+
+    results = {pairing: [] for pairing in pairings}
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count(), mp_context=ctx, initializer=_init_worker,
+                             initargs=(cache_resolution, cache_size)) as pool:
+        futures = [
+            pool.submit(play_matches_batched, parse_agent_spec(left), parse_agent_spec(right), n, n, task_seed, max_frames,
+                        record_path)
+            for (left, right, n), task_seed, record_path in zip(tasks, seeds, record_paths)
+        ]
+        for (left, right, _), future in zip(tasks, futures):
+            results[(left, right)].append(future.result())
+    return {pairing: np.concatenate(chunks) for pairing, chunks in results.items()}
+
+
+def print_results(left, right, results):
+    n = len(results)
+    left_wins, right_wins = int(results[:, 0].sum()), int(results[:, 1].sum())
+    print(f"========== {left} vs {right}: {n} matches ==========")
+    for name, wins in ((left, left_wins), (right, right_wins), ("Draws (frame limit)", n - left_wins - right_wins)):
+        low, high = wilson_interval(wins, n)
+        label = name if name.startswith("Draws") else f"{name} Wins"
+        print(f"{label}: {wins} ({wins / n:.1%}, 95% CI {low:.1%} - {high:.1%})")
+
+    print("---------- Statistics (total, per match mean +/- 95% CI) ----------")
+    frames, frames_ci = mean_interval(results[:, 2])
+    print(f"Match length (frames): {frames:.1f} +/- {frames_ci:.1f}")
+    for label, column in (("Hold Time (frames)", 3), ("attack", 5), ("defense", 7)):
+        for name, values in ((left, results[:, column]), (right, results[:, column + 1])):
+            mean, ci = mean_interval(values)
+            print(f"{name} {label}: {int(values.sum())} ({mean:.2f} +/- {ci:.2f})")
+    # the statistics of replays (analyze_replays.py) also count the changes of ball possession
+    if results.shape[1] > len(RESULT_COLUMNS):
+        mean, ci = mean_interval(results[:, len(RESULT_COLUMNS)])
+        print(f"Possession changes: {int(results[:, len(RESULT_COLUMNS)].sum())} ({mean:.2f} +/- {ci:.2f})")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="headless tournament of the test agents")
+    parser.add_argument("--agents", nargs="+", default=None,
+                        help=f"round robin of these agents, names of {list(AGENTS)} or kind:model_path "
+                             "(default: the pairings of the four test scripts)")
+    parser.add_argument("--matches", type=int, default=1000, help="matches per pairing")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=64,
+                        help="matches per task sent to a worker, played in lockstep with batched model calls")
+    parser.add_argument("--max-frames", type=int, default=10000,
+                        help="a match without goal is a draw after this many frames (0: no limit)")
+    parser.add_argument("--cache-resolution", type=float, default=None,
+                        help="cache model decisions on a grid of 1/resolution of the normalized observations "
+                             "(default: no cache, see benchmark_cache.py)")
+    parser.add_argument("--cache-size", type=int, default=65536, help="decision cache entries per worker and model")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default=None, help="save the per match results to this .npz file")
+    parser.add_argument("--record-dir", default=None,
+                        help="record the matches to replay files in this directory (see analyze_replays.py)")
+    args = parser.parse_args()
+
+    if args.agents:
+        pairings = [(left, right) for i, left in enumerate(args.agents) for right in args.agents[i + 1:]]
+    else:
+        pairings = DEFAULT_PAIRINGS
+    # fail on a bad spec before starting the workers
+    for spec in {spec for pairing in pairings for spec in pairing}:
+        parse_agent_spec(spec)
+
+    start = time.perf_counter()
+    results = run_tournament(pairings, args.matches, args.workers, args.chunk_size, args.seed, args.max_frames or None,
+                             args.cache_resolution, args.cache_size, args.record_dir)
+    elapsed = time.perf_counter() - start
+
+    for (left, right), pairing_results in results.items():
+        print_results(left, right, pairing_results)
+    print(f"{len(pairings) * args.matches} matches in {elapsed:.1f}s")
+
+    if args.out:
+        np.savez(args.out, columns=np.array(RESULT_COLUMNS),
+                 **{f"{left}__vs__{right}": r for (left, right), r in results.items()})
+
+
+if __name__ == "__main__":
+    main()